@@ -1,10 +1,54 @@
 from django.contrib import admin
-from .models import Country, RedditPost, FetchQueue, FetchStatus, UserMood, UserComment
+from .fetch_runs import subreddit_stats
+from .jobs import requeue
+from .models import Country, RedditPost, EmotionSnapshot, EmotionRollup, FetchJob, FetchRun, UserMood, UserMoodBucket, UserComment, ScoreCacheEntry, ScoreCacheStats
 
 # Register your models here.
 admin.site.register(Country)
 admin.site.register(RedditPost)
-admin.site.register(FetchQueue)
-admin.site.register(FetchStatus)
+admin.site.register(EmotionSnapshot)
+admin.site.register(EmotionRollup)
 admin.site.register(UserMood)
+admin.site.register(UserMoodBucket)
 admin.site.register(UserComment)
+admin.site.register(ScoreCacheEntry)
+admin.site.register(ScoreCacheStats)
+
+
+@admin.register(FetchRun)
+class FetchRunAdmin(admin.ModelAdmin):
+    """Fetch traces, with per-subreddit throughput and latency above the list.
+
+    The dashboard covers the runs matched by the current filters and date.
+    """
+    list_display = ['subreddit', 'country', 'started_at', 'outcome', 'error_class', 'post_count',
+                    'llm_tokens', 'listing_seconds', 'scoring_seconds', 'persist_seconds']
+    list_filter = ['outcome', 'error_class', 'subreddit']
+    date_hierarchy = 'started_at'
+    list_select_related = ['country']
+    search_fields = ['subreddit', 'country__name']
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context=extra_context)
+        changelist = getattr(response, 'context_data', {}).get('cl')
+        if changelist is not None:
+            response.context_data['subreddit_stats'] = subreddit_stats(changelist.queryset)
+        return response
+
+
+@admin.register(FetchJob)
+class FetchJobAdmin(admin.ModelAdmin):
+    list_display = ['country', 'state', 'failures', 'lease_owner', 'lease_expires_at', 'heartbeat_at', 'last_error']
+    list_filter = ['state']
+    list_select_related = ['country']
+    search_fields = ['country__name', 'country__subreddit']
+    actions = ['requeue_jobs']
+
+    @admin.display(description='Failures in a row', ordering='country__consecutive_failures')
+    def failures(self, job):
+        return job.country.consecutive_failures
+
+    @admin.action(description='Requeue selected jobs, due now')
+    def requeue_jobs(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f'Requeued {count} jobs')
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class MoodappConfig(AppConfig):
     name = 'moodapp'
+
+    def ready(self):
+        # Keeps the user mood aggregates on Country in step with UserMood,
+        # and times the queries of each request
+        from . import signals  # noqa: F401
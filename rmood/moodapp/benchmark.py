@@ -0,0 +1,413 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from .fetch_runs import percentile
+
+
+def stable_score(text):
+    """Deterministic pseudo-score in 1..10 so runs are comparable"""
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest(), 16) % 10 + 1
+
+
+class FakeServer(ABC):
+    """Local HTTP server in a background thread with injected latency and errors.
+
+    `latency` is the mean added delay in seconds (exponentially distributed
+    so there is a tail), `error_rate` the share of requests answered with 503.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def next_delay_and_failure(self):
+        with self.lock:
+            self.requests += 1
+            delay = self.random.expovariate(1 / self.latency) if self.latency else 0.0
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    @abstractmethod
+    def respond(self, method, path, body):
+        """(status, JSON payload) answering a request that wasn't failed on purpose"""
+
+    def handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle_request(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                delay, failed = fake.next_delay_and_failure()
+                time.sleep(delay)
+
+                if failed:
+                    status, payload = 503, {'error': 'injected failure'}
+                else:
+                    status, payload = fake.respond(method, self.path, body)
+
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.handle_request('GET')
+
+            def do_POST(self):
+                self.handle_request('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        return {'requests': self.requests, 'errors': self.errors}
+
+
+class FakeReddit(FakeServer):
+    """Answers the OAuth token request and /r/<name>/hot listings like Reddit"""
+
+    def __init__(self, posts_per_listing=50, **kwargs):
+        super().__init__(**kwargs)
+        self.posts_per_listing = posts_per_listing
+
+    def respond(self, method, path, body):
+        if path.startswith('/api/v1/access_token'):
+            return 200, {'access_token': 'benchmark', 'token_type': 'bearer', 'expires_in': 3600, 'scope': '*'}
+
+        match = re.match(r'/r/([^/]+)/hot', path)
+        if not match:
+            return 404, {'error': 404}
+
+        subreddit = match.group(1)
+        now = time.time()
+        children = []
+        for i in range(self.posts_per_listing):
+            post_id = hashlib.md5(f'{subreddit}:{i}'.encode('utf-8')).hexdigest()[:7]
+            children.append({'kind': 't3', 'data': {
+                'id': post_id,
+                'name': f't3_{post_id}',
+                'title': f'{subreddit} headline number {i} is {("great", "terrible", "calm", "angry")[i % 4]}',
+                'score': i * 7,
+                'permalink': f'/r/{subreddit}/comments/{post_id}/post_{i}/',
+                'num_comments': i,
+                'author': f'user{i}',
+                'created_utc': now - i * 600,
+                'url': f'https://example.com/{post_id}',
+            }})
+        return 200, {'kind': 'Listing', 'data': {'after': None, 'children': children}}
+
+
+class FakeOpenRouter(FakeServer):
+    """Answers chat completions with scores in whichever format the prompt asks for"""
+
+    def respond(self, method, path, body):
+        request = json.loads(body or b'{}')
+        prompt = request['messages'][0]['content']
+
+        countries = re.findall(r'^COUNTRY: (.+)$', prompt, re.MULTILINE)
+        numbered = re.findall(r'^\d+\. (.+)$', prompt, re.MULTILINE)
+        if countries:
+            content = json.dumps({country: stable_score(country) for country in countries})
+        elif numbered:
+            content = json.dumps([stable_score(title) for title in numbered])
+        else:
+            content = str(stable_score(prompt))
+
+        return 200, {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+
+
+def latency_summary(samples, elapsed):
+    """Latency percentiles and throughput of (seconds, status) samples; status 0 is a failed connection"""
+    latencies = sorted(seconds for seconds, status in samples)
+    statuses = {}
+    for seconds, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for seconds, status in samples if status >= 500 or status == 0),
+        'statuses': statuses,
+        'rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles, throughput and query counts of (seconds, status, queries) samples"""
+    queries = [queries for seconds, status, queries in samples]
+    return {
+        **latency_summary([(seconds, status) for seconds, status, queries in samples], elapsed),
+        'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def timed_request(client, method, path, **kwargs):
+    # The query log is a bounded deque; start each request from an empty one
+    connection.queries_log.clear()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(path, **kwargs)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+    return time.perf_counter() - started, response.status_code, len(queries)
+
+
+def endpoint_scenarios(country_names):
+    """Request builders for each benchmarked endpoint, keyed by name"""
+    counter = iter(range(10 ** 9))
+
+    def submit_mood():
+        n = next(counter)
+        # A fresh address per request so the per-IP rate limit measures the happy path
+        return 'post', '/submit-user-mood/', {
+            'data': json.dumps({'country': country_names[n % len(country_names)], 'mood': n % 10 + 1}),
+            'content_type': 'application/json',
+            'REMOTE_ADDR': f'10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}',
+        }
+
+    return {
+        'globe': lambda: ('get', '/', {}),
+        'get_country_data': lambda: ('get', '/get-country-data/', {'data': {'country': random.choice(country_names)}}),
+        'world_snapshot': lambda: ('get', '/world-snapshot/', {}),
+        'fetch_next_country': lambda: ('get', '/fetch-next-country/', {}),
+        'submit_user_mood': submit_mood,
+        'get_comments': lambda: ('get', '/get-comments/', {}),
+    }
+
+
+def drive(build_request, requests, concurrency):
+    """Send `requests` requests from `concurrency` threads; returns the samples and wall time"""
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        method, path, kwargs = build_request()
+        return timed_request(local.client, method, path, **kwargs)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(requests)))
+    return samples, time.perf_counter() - started
+
+
+# Seconds a polled request may take before it counts as failed
+POLL_TIMEOUT = 30
+
+
+@contextmanager
+def serve(interface, threads=32, keep_alive=5):
+    """Serve the project with uvicorn from a background thread; yields the port.
+
+    'asgi' runs the ASGI application natively. 'wsgi' runs the WSGI one on a
+    pool of `threads` threads, the way gunicorn's gthread worker does, so
+    both are compared behind the same HTTP server.
+    """
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+
+    if interface == 'asgi':
+        app = get_asgi_application()
+    else:
+        app = WSGIMiddleware(get_wsgi_application(), workers=threads)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    # log_config=None leaves the project's LOGGING alone
+    server = uvicorn.Server(uvicorn.Config(
+        app, interface='asgi3', lifespan='off', log_config=None, access_log=False,
+        timeout_keep_alive=keep_alive, backlog=4096,
+    ))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"{interface} server failed to start")
+        time.sleep(0.01)
+
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+def poll_paths(country_names):
+    """Paths the globe page polls, with a country for get_country_data"""
+    return [
+        '/get-fetch-status/',
+        '/fetch-next-country/',
+        '/get-comments/',
+        '/world-snapshot/',
+        *(f'/get-country-data/?country={quote(name)}' for name in country_names[:20]),
+    ]
+
+
+async def read_head(reader):
+    """Status code and lower-cased headers of an HTTP/1.1 response"""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = {}
+    for line in head[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return int(head[0].split()[1]), headers
+
+
+async def read_body(reader, headers):
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    body = b''
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        body += (await reader.readexactly(size + 2))[:-2]
+        if not size:
+            return body
+
+
+async def poller(port, paths, interval, deadline, samples):
+    """One client polling `paths` in turn every `interval` seconds over a keep-alive connection"""
+    reader = writer = None
+    turn = random.randrange(len(paths))
+    # Spread the clients over the interval rather than polling in lockstep
+    await asyncio.sleep(random.uniform(0, interval))
+
+    while time.monotonic() < deadline:
+        path = paths[turn % len(paths)]
+        turn += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: testserver\r\n\r\n'.encode('latin-1'))
+            status, headers = await asyncio.wait_for(read_head(reader), POLL_TIMEOUT)
+            await asyncio.wait_for(read_body(reader, headers), POLL_TIMEOUT)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            status = 0
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+        elapsed = time.perf_counter() - started
+        samples.append((elapsed, status))
+        await asyncio.sleep(max(0.0, interval - elapsed))
+
+    if writer is not None:
+        writer.close()
+
+
+async def listener(port, interval, deadline, results):
+    """One EventSource client: time to its first event, and whether the stream is still open at the end"""
+    await asyncio.sleep(random.uniform(0, interval))
+    started = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /fetch-status-stream/ HTTP/1.1\r\nHost: testserver\r\nAccept: text/event-stream\r\n\r\n')
+        status, headers = await asyncio.wait_for(read_head(reader), POLL_TIMEOUT)
+        while not (await asyncio.wait_for(reader.readline(), POLL_TIMEOUT)).startswith(b'event:'):
+            pass
+        first_event = time.perf_counter() - started
+        # A snapshot answer (WSGI) has a length and ends; a stream has neither
+        streaming = 'content-length' not in headers
+        while streaming and time.monotonic() < deadline:
+            try:
+                if not await asyncio.wait_for(reader.read(4096), deadline - time.monotonic()):
+                    streaming = False
+            except asyncio.TimeoutError:
+                break
+        results.append((first_event, status, streaming))
+    except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        results.append((time.perf_counter() - started, 0, False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def drive_clients(port, paths, pollers, interval, seconds, streams):
+    samples = []
+    stream_results = []
+    deadline = time.monotonic() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(poller(port, paths, interval, deadline, samples) for _ in range(pollers)),
+        *(listener(port, interval, deadline, stream_results) for _ in range(streams)),
+    )
+    return samples, stream_results, time.perf_counter() - started
+
+
+def drive_server(interface, paths, pollers, interval, seconds, streams=0, threads=32):
+    """Serve the project over `interface` and hold `pollers` polling clients and `streams` open streams against it.
+
+    The clients run on an event loop in this process, so they share the GIL
+    with the server; compare interfaces against each other, not against a
+    dedicated load generator.
+    """
+    with serve(interface, threads=threads, keep_alive=int(interval) + 5) as port:
+        samples, stream_results, elapsed = asyncio.run(
+            drive_clients(port, paths, pollers, interval, seconds, streams)
+        )
+
+    result = {'polling': latency_summary(samples, elapsed)}
+    if streams:
+        first_events = sorted(seconds for seconds, status, streaming in stream_results if status == 200)
+        result['streams'] = {
+            'opened': len(first_events),
+            'held_to_end': sum(1 for seconds, status, streaming in stream_results if streaming),
+            'first_event_p50_ms': round(percentile(first_events, 50) * 1000, 2) if first_events else None,
+            'first_event_p95_ms': round(percentile(first_events, 95) * 1000, 2) if first_events else None,
+        }
+    return result
@@ -0,0 +1,175 @@
+import queue
+import threading
+from contextlib import contextmanager
+import praw
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class PooledSession(requests.Session):
+    """Keep-alive session with explicit (connect, read) timeouts and a request counter"""
+
+    def __init__(self, timeout, pool_size):
+        super().__init__()
+        self.timeout = timeout
+        self.requests_sent = 0
+        self._count_lock = threading.Lock()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        # prawcore always passes its own single-number timeout; ours wins
+        kwargs['timeout'] = self.timeout
+        with self._count_lock:
+            self.requests_sent += 1
+        return super().request(method, url, **kwargs)
+
+    def pool_stats(self):
+        """Connections opened and requests served per host by the keep-alive pools"""
+        hosts = {}
+        for adapter in set(self.adapters.values()):
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools[key]
+                hosts[pool.host] = {
+                    'connections_opened': pool.num_connections,
+                    'requests': pool.num_requests,
+                }
+        return {'requests_sent': self.requests_sent, 'hosts': hosts}
+
+
+class RedditPool:
+    """Long-lived praw.Reddit clients handed out to one thread at a time.
+
+    praw.Reddit is not thread-safe, so each caller checks a client out and
+    gives it back. Clients outlive the threads that use them, which keeps
+    their OAuth token (prawcore renews it when it expires) and their
+    keep-alive connections across fetch cycles. At most `size` clients are
+    created; extra callers wait for one to be returned.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.clients = []
+        self.sessions = []
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+
+    def _new_client(self):
+        session = PooledSession(
+            (settings.REDDIT_CONNECT_TIMEOUT, settings.REDDIT_READ_TIMEOUT), pool_size=2
+        )
+        self.sessions.append(session)
+        return praw.Reddit(
+            client_id=settings.REDDIT_CLIENT_ID,
+            client_secret=settings.REDDIT_CLIENT_SECRET,
+            user_agent=settings.REDDIT_USER_AGENT,
+            check_for_async=False,
+            oauth_url=settings.REDDIT_OAUTH_URL,
+            reddit_url=settings.REDDIT_URL,
+            requestor_kwargs={'session': session},
+        )
+
+    def acquire(self):
+        try:
+            client = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                client = None
+                if len(self.clients) < self.size:
+                    client = self._new_client()
+                    self.clients.append(client)
+            if client is None:
+                with self.lock:
+                    self.waits += 1
+                client = self.idle.get()
+
+        with self.lock:
+            self.checkouts += 1
+        return client
+
+    def release(self, client):
+        self.idle.put(client)
+
+    @contextmanager
+    def client(self):
+        reddit = self.acquire()
+        try:
+            yield reddit
+        finally:
+            self.release(reddit)
+
+    def stats(self):
+        with self.lock:
+            stats = {
+                'size': self.size,
+                'created': len(self.clients),
+                'in_use': len(self.clients) - self.idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+            }
+            sessions = [session.pool_stats() for session in self.sessions]
+        stats['requests_sent'] = sum(session['requests_sent'] for session in sessions)
+        stats['connections_opened'] = sum(
+            host['connections_opened'] for session in sessions for host in session['hosts'].values()
+        )
+        return stats
+
+
+_reddit_pool = None
+_openrouter_session = None
+_registry_lock = threading.Lock()
+
+
+def reddit_pool():
+    """Process-wide pool of Reddit clients, sized for the fetch workers"""
+    global _reddit_pool
+    with _registry_lock:
+        if _reddit_pool is None:
+            _reddit_pool = RedditPool(settings.REDDIT_FETCH_WORKERS)
+        return _reddit_pool
+
+
+def reddit():
+    """Context manager lending a pooled praw.Reddit client to the calling thread"""
+    return reddit_pool().client()
+
+
+def openrouter_session():
+    """Process-wide keep-alive session for OpenRouter; requests sessions can be shared by threads"""
+    global _openrouter_session
+    with _registry_lock:
+        if _openrouter_session is None:
+            _openrouter_session = PooledSession(
+                (settings.OPENROUTER_CONNECT_TIMEOUT, settings.OPENROUTER_READ_TIMEOUT),
+                pool_size=settings.OPENROUTER_POOL_SIZE,
+            )
+            _openrouter_session.headers.update({
+                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+                "HTTP-Referer": "http://localhost:8000",  # Optional: your site URL
+                "X-Title": "Reddit Mood Analyzer",  # Optional: your app name
+            })
+        return _openrouter_session
+
+
+def reset_clients():
+    """Forget every client so the next ones are built from the current settings"""
+    global _reddit_pool, _openrouter_session
+    with _registry_lock:
+        if _openrouter_session is not None:
+            _openrouter_session.close()
+        _reddit_pool = None
+        _openrouter_session = None
+
+
+def pool_stats():
+    """Usage of every client created so far in this process"""
+    with _registry_lock:
+        pool, session = _reddit_pool, _openrouter_session
+    return {
+        'reddit': pool.stats() if pool else None,
+        'openrouter': session.pool_stats() if session else None,
+    }
@@ -0,0 +1,329 @@
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import requests
+from django.conf import settings
+from . import clients, metrics
+from .prompts import (
+    build_batch_prompt, build_listing_prompt, build_titles_prompt, chunk_titles, estimate_tokens,
+    listing_tokens, pack_batches,
+)
+from .resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyTracker, hedged_call
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_MODEL = "google/gemini-2.5-flash-lite"  # Free Gemini model via OpenRouter
+
+# Failures of OpenRouter itself; only these count towards the circuit breaker
+TRANSPORT_ERRORS = (requests.exceptions.RequestException, DeadlineExceeded)
+
+# Ways an OpenRouter call can fail without saying anything about the titles
+PROVIDER_ERRORS = TRANSPORT_ERRORS + (CircuitOpenError,)
+
+openrouter_breaker = CircuitBreaker(
+    'openrouter', settings.EMOTION_BREAKER_FAILURES, settings.EMOTION_BREAKER_RESET,
+    failure_types=TRANSPORT_ERRORS,
+)
+openrouter_latency = LatencyTracker()
+
+# Meter of the innermost count_tokens() block, if any
+_token_meter = contextvars.ContextVar('token_meter', default=None)
+
+# Score used whenever a listing cannot be scored
+NEUTRAL_SCORE = 5
+
+class TokenMeter:
+    def __init__(self):
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def add(self, tokens):
+        with self.lock:
+            self.tokens += tokens
+
+
+@contextmanager
+def count_tokens():
+    """Meter the OpenRouter tokens used by completions made inside the block.
+
+    Unlike the process-wide metric, this only counts the caller's own calls,
+    so concurrent scoring batches each get their own total.
+    """
+    meter = TokenMeter()
+    token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(token)
+
+
+def post_completion(model, prompt, max_tokens, country):
+    data = {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.7,
+        "max_tokens": max_tokens,
+    }
+
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = clients.openrouter_session().post(settings.OPENROUTER_URL, json=data)
+        response_json = response.json()
+        outcome = 'error' if "error" in response_json else str(response.status_code)
+    finally:
+        metrics.openrouter_request_duration.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+    # Full responses are large; keep a sample of them
+    logger.debug("OpenRouter response", extra={'country': country, 'model': model, 'response': response_json})
+
+    if "error" in response_json:
+        raise requests.exceptions.HTTPError(f"OpenRouter API error: {response_json['error']}", response=response)
+
+    if "choices" not in response_json or not response_json["choices"]:
+        raise ValueError(f"No choices in OpenRouter response for {country}")
+
+    content = response_json["choices"][0]["message"]["content"].strip()
+    usage = response_json.get("usage") or {}
+    tokens = usage.get("total_tokens") or estimate_tokens(prompt) + estimate_tokens(content)
+    metrics.openrouter_tokens.inc(tokens, model=model)
+    meter = _token_meter.get()
+    if meter is not None:
+        meter.add(tokens)
+    return content
+
+
+def hedge_delay():
+    """Seconds to wait for the primary model before also asking the hedge model"""
+    observed = openrouter_latency.percentile(settings.EMOTION_HEDGE_PERCENTILE)
+    return settings.EMOTION_HEDGE_AFTER if observed is None else observed
+
+
+def call_openrouter(prompt, max_tokens, country):
+    """Send a single-message chat completion and return the reply text.
+
+    The call gives up after EMOTION_DEADLINE seconds. When EMOTION_HEDGE_MODEL
+    is set and the primary model is slower than its usual
+    EMOTION_HEDGE_PERCENTILE latency, the hedge model is asked too and the
+    first reply wins. Repeated failures open a circuit breaker so the
+    provider is skipped (and the fallback scorer used) for a while.
+    """
+
+    def primary():
+        started = time.monotonic()
+        text = post_completion(OPENROUTER_MODEL, prompt, max_tokens, country)
+        openrouter_latency.record(time.monotonic() - started)
+        return text
+
+    hedge = None
+    if settings.EMOTION_HEDGE_MODEL:
+        def hedge():
+            return post_completion(settings.EMOTION_HEDGE_MODEL, prompt, max_tokens, f"{country} (hedged)")
+
+    return openrouter_breaker.call(
+        hedged_call, primary, settings.EMOTION_DEADLINE, hedge=hedge, hedge_after=hedge_delay()
+    )
+
+
+def clamp_score(value):
+    return max(1, min(10, int(value)))
+
+
+def in_parallel(func, calls):
+    """Run func(*args) for every args in `calls` at once; results come back in order.
+
+    The calls see the caller's context variables, so count_tokens() still
+    meters them.
+    """
+    if len(calls) == 1:
+        return [func(*calls[0])]
+    with ThreadPoolExecutor(max_workers=min(len(calls), settings.EMOTION_CHUNK_WORKERS)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, func, *args) for args in calls]
+        return [future.result() for future in futures]
+
+
+def request_emotion(titles, country):
+    """Score one listing; None when it cannot be scored.
+
+    Listings over EMOTION_CHUNK_TOKEN_BUDGET are split into chunks scored in
+    parallel, and the chunk scores averaged weighted by their number of
+    titles. Chunks that fail are left out.
+    """
+    chunks = chunk_titles(titles)
+    if len(chunks) == 1:
+        return request_chunk_emotion(titles, country)
+
+    scores = in_parallel(request_chunk_emotion, [
+        (chunk, f"{country} part {i + 1}/{len(chunks)}") for i, chunk in enumerate(chunks)
+    ])
+    scored = [(score, len(chunk)) for score, chunk in zip(scores, chunks) if score is not None]
+    if not scored:
+        return None
+    return clamp_score(round(sum(score * weight for score, weight in scored) / sum(weight for score, weight in scored)))
+
+
+def request_chunk_emotion(titles, country):
+    """Score titles with one completion; None when the API call fails or the reply has no number"""
+    prompt = build_listing_prompt(titles)
+
+    try:
+        # We only need a single number
+        text_output = call_openrouter(prompt, 10, country)
+
+        # Try to extract just the number
+        numbers = re.findall(r'\d+', text_output)
+        if numbers:
+            return clamp_score(numbers[0])
+        else:
+            logger.warning("Could not parse a score", extra={'country': country, 'reply': text_output})
+            return None
+
+    except PROVIDER_ERRORS as e:
+        logger.warning("OpenRouter API unavailable", extra={'country': country, 'error': str(e)})
+        return None
+    except (KeyError, IndexError, ValueError) as e:
+        logger.warning("Could not read OpenRouter response", extra={'country': country, 'error': str(e)})
+        return None
+    except Exception:
+        logger.exception("Unexpected error scoring a listing", extra={'country': country})
+        return None
+
+
+def parse_batch_scores(text, countries):
+    """Pull per-country scores out of a batch reply.
+
+    Accepts a JSON object (optionally wrapped in a code fence or prose) and
+    falls back to scanning `name: number` pairs. Countries that cannot be
+    matched are left out of the result.
+    """
+    by_key = {country.casefold(): country for country in countries}
+    scores = {}
+
+    def add(name, value):
+        country = by_key.get(str(name).strip().strip('"\'').casefold())
+        if country is None or country in scores:
+            return
+        try:
+            scores[country] = clamp_score(float(value))
+        except (TypeError, ValueError):
+            pass
+
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict):
+            for name, value in parsed.items():
+                add(name, value)
+
+    for name, value in re.findall(r'["\']?([^"\'{},:\n]+)["\']?\s*:\s*(\d+(?:\.\d+)?)', text):
+        add(name, value)
+
+    return scores
+
+
+def check_emotions_batch(title_sets, default=NEUTRAL_SCORE):
+    """Score many countries with as few completions as the token budget allows.
+
+    `title_sets` maps country name to its list of titles. Returns a dict of
+    country name to score; countries missing from a malformed batch reply
+    are scored one by one, and countries that still cannot be scored (or
+    have no titles) get `default`. Listings too large for one prompt chunk
+    are scored on their own, in chunks, instead of being packed.
+    """
+    scores = {country: default for country, titles in title_sets.items() if not titles}
+    title_sets = {country: titles for country, titles in title_sets.items() if titles}
+
+    large = {
+        country: titles for country, titles in title_sets.items()
+        if listing_tokens(titles) > settings.EMOTION_CHUNK_TOKEN_BUDGET
+    }
+    for country, titles in large.items():
+        score = request_emotion(titles, country)
+        scores[country] = default if score is None else score
+    title_sets = {country: titles for country, titles in title_sets.items() if country not in large}
+
+    for batch in pack_batches(title_sets, settings.EMOTION_BATCH_TOKEN_BUDGET):
+        if len(batch) == 1:
+            country, titles = next(iter(batch.items()))
+            score = request_emotion(titles, country)
+            scores[country] = default if score is None else score
+            continue
+
+        label = f"batch of {len(batch)} countries"
+        try:
+            text_output = call_openrouter(build_batch_prompt(batch), 12 * len(batch) + 20, label)
+            batch_scores = parse_batch_scores(text_output, batch)
+        except PROVIDER_ERRORS as e:
+            # Retrying item by item would only hit the same network failure
+            logger.warning("OpenRouter API unavailable", extra={'batch': label, 'error': str(e)})
+            scores.update({country: default for country in batch})
+            continue
+        except Exception as e:
+            logger.warning("Batch scoring failed", extra={'batch': label, 'error': str(e)})
+            batch_scores = {}
+
+        scores.update(batch_scores)
+        for country, titles in batch.items():
+            if country not in batch_scores:
+                logger.info("No batch score, scoring on its own", extra={'country': country})
+                score = request_emotion(titles, country)
+                scores[country] = default if score is None else score
+
+    return scores
+
+
+def parse_title_scores(text, count):
+    """Read a JSON array of `count` scores; None when the reply does not match"""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group(0))
+        scores = [clamp_score(float(value)) for value in parsed]
+    except (TypeError, ValueError):
+        return None
+    return scores if len(scores) == count else None
+
+
+def score_titles(titles):
+    """Score each title on its own.
+
+    Returns a list of scores in the same order as `titles`, or None when a
+    request fails or a reply cannot be read. More titles than fit in one
+    EMOTION_CHUNK_TOKEN_BUDGET prompt are sent as chunks in parallel.
+    """
+    if not titles:
+        return []
+
+    chunks = chunk_titles(titles)
+    if len(chunks) > 1:
+        results = in_parallel(score_titles, [(chunk,) for chunk in chunks])
+        if any(scores is None for scores in results):
+            return None
+        return [score for scores in results for score in scores]
+
+    prompt = build_titles_prompt(titles)
+
+    try:
+        text_output = call_openrouter(prompt, 4 * len(titles) + 20, f"{len(titles)} titles")
+    except Exception as e:
+        logger.warning("Title scoring failed", extra={'titles': len(titles), 'error': str(e)})
+        return None
+
+    scores = parse_title_scores(text_output, len(titles))
+    if scores is None:
+        logger.warning("Could not parse title scores", extra={'titles': len(titles), 'reply': text_output})
+    return scores
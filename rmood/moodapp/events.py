@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from django.conf import settings
+from django.db.models import Max, Q
+from django.db.models.functions import Coalesce, Greatest
+from .models import Country
+from .state import IDLE_STATUS, fetch_state
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def country_payload(country):
+    if country is None:
+        return None
+    return {
+        'country': country.name,
+        'subreddit': country.subreddit,
+        'total_posts': country.post_count,
+        'emotion_score': country.emotion_score,
+        'last_updated': country.last_updated.isoformat(),
+        'scored_at': country.scored_at.isoformat() if country.scored_at else None,
+    }
+
+
+async def read_status():
+    return await fetch_state.aget_status()
+
+
+async def read_latest_country():
+    return country_payload(
+        await Country.objects.filter(last_updated__isnull=False).order_by('-last_updated').afirst()
+    )
+
+
+async def read_change_watermark():
+    """Time of the latest listing stored or scored, None before the first"""
+    latest = await Country.objects.aaggregate(stored=Max('last_updated'), scored=Max('scored_at'))
+    return max((moment for moment in latest.values() if moment is not None), default=None)
+
+
+async def read_changed_countries(since):
+    """Countries stored or scored after `since`, as (time of the change, payload), oldest first"""
+    changed = Country.objects.filter(
+        Q(last_updated__gt=since) | Q(scored_at__gt=since), last_updated__isnull=False
+    ).annotate(
+        changed_at=Greatest('last_updated', Coalesce('scored_at', 'last_updated'))
+    ).order_by('changed_at')
+    return [(country.changed_at, country_payload(country)) async for country in changed]
+
+
+class StatusBroadcaster:
+    """Watches the fetch status once per process and fans changes out to every stream.
+
+    A single poller reads the fetch state and the countries changed since
+    its last poll every STATUS_STREAM_POLL_INTERVAL seconds while at least one
+    client is connected, so load grows with the number of events rather than
+    with the number of viewers. Every country stored or scored gets its own
+    event, even when a batch refreshes several between two polls. Recent
+    events are kept so a reconnecting client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self):
+        # Event ids from another process (or before a restart) can't be replayed
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.history = deque(maxlen=settings.STATUS_STREAM_HISTORY)
+        self.loop = None
+        self.changed = None
+        self.polled = None
+        self.poller = None
+        self.subscribers = 0
+        self.last_status = None
+        self.last_country = None
+        # Latest country change published; None until the poller's first poll
+        self.watermark = None
+
+    def _bind_to_running_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.changed = asyncio.Event()
+            self.polled = asyncio.Event()
+            self.poller = None
+            self.watermark = None
+            self.subscribers = 0
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def resume_point(self, last_event_id):
+        """Sequence number to replay from, or None when the client needs a fresh snapshot"""
+        try:
+            epoch, seq = (last_event_id or '').rsplit('-', 1)
+            seq = int(seq)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq > self.seq:
+            return None
+        oldest = self.history[0][0] if self.history else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        return seq
+
+    def publish(self, event, data):
+        self.seq += 1
+        self.history.append((self.seq, event, data))
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def poll_once(self):
+        try:
+            status = await read_status()
+            if status != self.last_status:
+                self.last_status = status
+                self.publish('status', status)
+
+            if self.watermark is None:
+                # New clients get the latest country; changes are published from here on
+                self.watermark = await read_change_watermark()
+                country = await read_latest_country()
+                if country is not None and country != self.last_country:
+                    self.last_country = country
+                    self.publish('country', country)
+                return
+
+            for changed_at, country in await read_changed_countries(self.watermark):
+                self.watermark = max(self.watermark, changed_at)
+                self.last_country = country
+                self.publish('country', country)
+        except Exception:
+            logger.exception("Error polling fetch status")
+
+    async def poll(self):
+        while self.subscribers:
+            await self.poll_once()
+            self.polled.set()
+            await asyncio.sleep(settings.STATUS_STREAM_POLL_INTERVAL)
+        self.poller = None
+        # The next first client waits for a fresh poll, and doesn't get
+        # replayed every change made while nobody was watching
+        self.polled.clear()
+        self.watermark = None
+
+    async def stream(self, last_event_id=None):
+        self._bind_to_running_loop()
+        self.subscribers += 1
+
+        try:
+            yield f"retry: {settings.STATUS_STREAM_RETRY_MS}\n\n"
+
+            if self.poller is None:
+                self.poller = asyncio.ensure_future(self.poll())
+
+            seq = self.resume_point(last_event_id)
+            if seq is None:
+                # New client, or one that missed more than we remember. Clients
+                # arriving together share the poller's first poll
+                await self.polled.wait()
+                seq = self.seq
+                yield format_event(self.event_id(seq), 'status', self.last_status or IDLE_STATUS)
+                if self.last_country is not None:
+                    yield format_event(self.event_id(seq), 'country', self.last_country)
+
+            while True:
+                for event_seq, event, data in [entry for entry in self.history if entry[0] > seq]:
+                    yield format_event(self.event_id(event_seq), event, data)
+                    seq = event_seq
+
+                try:
+                    await asyncio.wait_for(self.changed.wait(), settings.STATUS_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comment lines keep proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+        finally:
+            self.subscribers -= 1
+
+
+broadcaster = StatusBroadcaster()
@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import FetchRun
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class FetchRunRecorder:
+    """Buffers FetchRun rows and writes them with one bulk insert.
+
+    The buffer is written once it holds FETCH_RUN_FLUSH_SIZE rows or its
+    oldest row is FETCH_RUN_FLUSH_INTERVAL seconds old, so a busy ingest loop
+    costs one INSERT per few cycles. Unflushed rows are lost if the process
+    dies; call flush() on shutdown.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.oldest = None
+        self.lock = threading.Lock()
+
+    def add(self, runs):
+        with self.lock:
+            if runs and not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.extend(runs)
+            due = len(self.pending) >= settings.FETCH_RUN_FLUSH_SIZE or (
+                self.pending and time.monotonic() - self.oldest >= settings.FETCH_RUN_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            runs, self.pending = self.pending, []
+        if runs:
+            FetchRun.objects.bulk_create(runs, batch_size=500)
+        return len(runs)
+
+
+recorder = FetchRunRecorder()
+
+
+def prune_fetch_runs(now=None):
+    """Delete runs older than FETCH_RUN_RETENTION_DAYS; returns how many"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.FETCH_RUN_RETENTION_DAYS)
+    removed, _ = FetchRun.objects.filter(started_at__lt=cutoff).delete()
+    return removed
+
+
+def subreddit_stats(runs):
+    """Throughput, error rate and latency percentiles per subreddit of a FetchRun queryset.
+
+    Percentiles are computed here since SQLite has no percentile aggregate.
+    Sorted by p95 listing time, slowest first.
+    """
+    rows = runs.order_by().values_list(
+        'subreddit', 'started_at', 'finished_at', 'listing_seconds', 'persist_seconds',
+        'post_count', 'llm_tokens', 'outcome',
+    )
+
+    grouped = {}
+    for subreddit, started_at, finished_at, listing, persist, posts, tokens, outcome in rows.iterator():
+        group = grouped.setdefault(subreddit, {
+            'runs': 0, 'errors': 0, 'posts': 0, 'tokens': 0,
+            'first': started_at, 'last': started_at, 'listing': [], 'persist': [], 'total': [],
+        })
+        group['runs'] += 1
+        group['errors'] += outcome == FetchRun.ERROR
+        group['posts'] += posts
+        group['tokens'] += tokens
+        group['first'] = min(group['first'], started_at)
+        group['last'] = max(group['last'], started_at)
+        if listing is not None:
+            group['listing'].append(listing)
+        if persist is not None:
+            group['persist'].append(persist)
+        group['total'].append((finished_at - started_at).total_seconds())
+
+    stats = []
+    for subreddit, group in grouped.items():
+        listing, persist, total = sorted(group['listing']), sorted(group['persist']), sorted(group['total'])
+        hours = (group['last'] - group['first']).total_seconds() / 3600
+        stats.append({
+            'subreddit': subreddit,
+            'runs': group['runs'],
+            'errors': group['errors'],
+            'error_rate': group['errors'] / group['runs'],
+            'runs_per_hour': group['runs'] / hours if hours else None,
+            'posts_per_run': group['posts'] / group['runs'],
+            'tokens': group['tokens'],
+            'listing_p50': percentile(listing, 50),
+            'listing_p95': percentile(listing, 95),
+            'listing_p99': percentile(listing, 99),
+            'persist_p95': percentile(persist, 95),
+            'total_p50': percentile(total, 50),
+            'total_p95': percentile(total, 95),
+        })
+
+    stats.sort(key=lambda row: row['listing_p95'] if row['listing_p95'] is not None else -1, reverse=True)
+    return stats
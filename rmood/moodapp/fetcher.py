@@ -0,0 +1,76 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from datetime import datetime
+import pytz
+from . import clients
+from .ratelimit import TokenBucket
+
+# Reddit serves at most 100 posts per listing request
+LISTING_PAGE_SIZE = 100
+
+# One bucket for the whole process so every fetch shares Reddit's OAuth quota
+reddit_bucket = TokenBucket(settings.REDDIT_QPS, capacity=settings.REDDIT_BURST)
+
+def fetch_subreddit_posts(reddit, subreddit_name, limit=50):
+    """Read the hot listing of a subreddit into plain dicts"""
+    posts_data = []
+    subreddit = reddit.subreddit(subreddit_name)
+
+    for submission in subreddit.hot(limit=limit):
+        created_dt = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
+
+        posts_data.append({
+            'reddit_id': submission.id,
+            'title': submission.title,
+            'score': submission.score,
+            'permalink': f"https://reddit.com{submission.permalink}",
+            'num_comments': submission.num_comments,
+            'author': str(submission.author),
+            'created_utc': created_dt,
+        })
+
+    return posts_data
+
+
+def _fetch_one(subreddit_name, limit, bucket, timings):
+    bucket.acquire(math.ceil(limit / LISTING_PAGE_SIZE))
+    # Timed after the rate limit wait so slow subreddits stand out, not busy cycles
+    started = time.perf_counter()
+    try:
+        # Pooled clients outlive the worker threads, keeping their token and connections
+        with clients.reddit() as reddit:
+            return fetch_subreddit_posts(reddit, subreddit_name, limit=limit)
+    finally:
+        if timings is not None:
+            timings[subreddit_name] = time.perf_counter() - started
+
+
+def iter_listings(subreddit_names, limit=50, max_workers=None, bucket=None, timings=None):
+    """Fetch the hot listings of several subreddits concurrently, yielding each as it arrives.
+
+    Yields (subreddit name, posts, None) for every listing fetched and
+    (subreddit name, None, exception) for every one that failed. When
+    `timings` is a dict, the seconds spent on each subreddit are stored in it.
+    """
+    bucket = bucket or reddit_bucket
+    max_workers = max_workers or settings.REDDIT_FETCH_WORKERS
+
+    if not subreddit_names:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(subreddit_names))) as executor:
+        futures = {
+            executor.submit(_fetch_one, name, limit, bucket, timings): name
+            for name in subreddit_names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                posts = future.result()
+            except Exception as e:
+                yield name, None, e
+            else:
+                yield name, posts, None
+
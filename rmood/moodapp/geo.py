@@ -0,0 +1,141 @@
+import json
+import threading
+from pathlib import Path
+import numpy as np
+from .geometry import load_centroids
+from .jobs import ensure_jobs
+from .models import Country
+
+GEOJSON_PATH = Path(__file__).resolve().parent / 'templates' / 'ne_110m_admin_0_countries.geojson'
+
+COUNTRY_TO_SUBREDDIT = {
+    'United States of America': 'UnitedStates',
+    'United Kingdom': 'UnitedKingdom',
+    'United Arab Emirates': 'dubai',
+    'Australia': 'australia',
+    'Canada': 'canada',
+    'Germany': 'germany',
+    'France': 'france',
+    'India': 'india',
+    'Japan': 'japan',
+    'China': 'china',
+    'Brazil': 'brazil',
+    'Mexico': 'mexico',
+    'Italy': 'italy',
+    'Spain': 'spain',
+    'South Korea': 'korea',
+    'Netherlands': 'thenetherlands',
+    'Switzerland': 'switzerland',
+    'Sweden': 'sweden',
+    'Norway': 'norway',
+    'Denmark': 'denmark',
+    'Finland': 'finland',
+    'Poland': 'poland',
+    'Belgium': 'belgium',
+    'Austria': 'austria',
+    'Greece': 'greece',
+    'Portugal': 'portugal',
+    'Ireland': 'ireland',
+    'New Zealand': 'newzealand',
+    'Singapore': 'singapore',
+    'Thailand': 'thailand',
+    'Vietnam': 'vietnam',
+    'Philippines': 'philippines',
+    'Indonesia': 'indonesia',
+    'Malaysia': 'malaysia',
+    'Turkey': 'turkey',
+    'Russia': 'russia',
+    'South Africa': 'southafrica',
+    'Egypt': 'egypt',
+    'Argentina': 'argentina',
+    'Chile': 'chile',
+    'Colombia': 'colombia',
+    'Peru': 'peru',
+    'Pakistan': 'pakistan',
+    'Bangladesh': 'bangladesh',
+    'Saudi Arabia': 'saudiarabia',
+}
+
+
+def subreddit_for(country_name):
+    return COUNTRY_TO_SUBREDDIT.get(country_name, country_name.replace(' ', '').lower())
+
+
+class CountryIndex:
+    """Everything the app needs from the Natural Earth GeoJSON, keyed by country name"""
+
+    def __init__(self, geojson_data, centroids):
+        self.countries = {}
+
+        for feature, (lat, lng) in zip(geojson_data['features'], centroids):
+            properties = feature['properties']
+            country_name = properties['ADMIN']
+
+            if properties['ISO_A2'] == 'AQ' or not country_name:
+                continue
+
+            self.countries[country_name] = {
+                'name': country_name,
+                'subreddit': subreddit_for(country_name),
+                'centroid': None if np.isnan(lat) else {'lat': float(lat), 'lng': float(lng)},
+            }
+
+        self.subreddit_mapping = {
+            name: country['subreddit'] for name, country in self.countries.items()
+        }
+        self.coords = {
+            name: country['centroid']
+            for name, country in self.countries.items()
+            if country['centroid'] is not None
+        }
+
+        # Serialized once so the landing page can embed them as-is
+        self.subreddit_mapping_json = json.dumps(self.subreddit_mapping)
+        self.coords_json = json.dumps(self.coords)
+
+    def __contains__(self, country_name):
+        return country_name in self.countries
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_country_index():
+    """Process-wide CountryIndex, rebuilt only when the GeoJSON file changes"""
+    global _index, _index_mtime
+
+    mtime = GEOJSON_PATH.stat().st_mtime_ns
+    if _index is not None and mtime == _index_mtime:
+        return _index
+
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            with open(GEOJSON_PATH, 'r', encoding='utf-8') as f:
+                geojson_data = json.load(f)
+            centroids = load_centroids(GEOJSON_PATH, geojson_data['features'])
+            _index = CountryIndex(geojson_data, centroids)
+            _index_mtime = mtime
+    return _index
+
+
+def sync_countries():
+    """Create a Country row, and its refresh job, for every indexed country in bulk.
+
+    Existing rows are left alone. Returns the number of countries created.
+    """
+    index = get_country_index()
+    existing = set(Country.objects.values_list('name', flat=True))
+
+    created = Country.objects.bulk_create(
+        [
+            Country(name=name, subreddit=country['subreddit'])
+            for name, country in index.countries.items()
+            if name not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    ensure_jobs()
+
+    return len(created)
@@ -0,0 +1,160 @@
+import logging
+import os
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Parts of a country further than this many degrees from its largest polygon
+# are ignored when placing its marker
+MAX_PART_DISTANCE = 25.0
+
+
+def feature_polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def angular_distance(lat1, lng1, lat2, lng2):
+    """Great-circle distance in degrees"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))))
+
+
+def compute_centroids(features, max_part_distance=MAX_PART_DISTANCE):
+    """Area-weighted (lat, lng) centroids of all features, computed in one batch.
+
+    Every polygon of a MultiPolygon contributes by its area and holes are
+    subtracted. Longitudes are unwrapped so shapes that cross the antimeridian
+    (Russia, Fiji, ...) are treated as one piece, and areas are measured on a
+    sinusoidal projection so polar shapes are not over-weighted. Polygons whose
+    own centroid is more than `max_part_distance` degrees from the largest
+    polygon (Alaska, French Guiana, ...) are left out so the marker lands on
+    the main landmass. Returns an (n, 2) float array with NaN rows for
+    features without polygons.
+    """
+    xs, ys, ring_ids, ring_polygon, ring_sign, polygon_feature = [], [], [], [], [], []
+
+    for feature_id, feature in enumerate(features):
+        for polygon in feature_polygons(feature['geometry']):
+            polygon_id = len(polygon_feature)
+            polygon_feature.append(feature_id)
+            for ring_number, ring in enumerate(polygon):
+                ring_id = len(ring_polygon)
+                xs.extend(point[0] for point in ring)
+                ys.extend(point[1] for point in ring)
+                ring_ids.extend([ring_id] * len(ring))
+                ring_polygon.append(polygon_id)
+                # The first ring is the exterior, the others are holes
+                ring_sign.append(1.0 if ring_number == 0 else -1.0)
+
+    n_features = len(features)
+    centroids = np.full((n_features, 2), np.nan)
+    if not ring_polygon:
+        return centroids
+
+    x = np.asarray(xs, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64)
+    ring_ids = np.asarray(ring_ids)
+    ring_polygon = np.asarray(ring_polygon)
+    ring_sign = np.asarray(ring_sign)
+    polygon_feature = np.asarray(polygon_feature)
+    ring_feature = polygon_feature[ring_polygon]
+    n_rings = len(ring_polygon)
+    n_polygons = len(polygon_feature)
+    same_ring = ring_ids[1:] == ring_ids[:-1]
+
+    # Unwrap longitude jumps larger than 180 degrees within each ring
+    step = np.diff(x)
+    correction = np.where(same_ring, -360.0 * np.round(step / 360.0), 0.0)
+    cumulative = np.concatenate(([0.0], np.cumsum(correction)))
+    ring_start = np.searchsorted(ring_ids, np.arange(n_rings))
+    x = x + cumulative - cumulative[ring_start][ring_ids]
+
+    # Move every ring next to the first vertex of its feature
+    ring_count = np.bincount(ring_ids, minlength=n_rings)
+    ring_mean_x = np.bincount(ring_ids, weights=x, minlength=n_rings) / ring_count
+    features_with_rings, first_ring = np.unique(ring_feature, return_index=True)
+    origin = np.zeros(n_features)
+    origin[features_with_rings] = x[ring_start[first_ring]]
+    x = x - (360.0 * np.round((ring_mean_x - origin[ring_feature]) / 360.0))[ring_ids]
+
+    # Project onto a sinusoidal (equal-area) grid centred on each feature so
+    # high-latitude shapes are not over-weighted
+    x = (x - origin[ring_feature][ring_ids]) * np.cos(np.radians(y))
+
+    # Shoelace terms for every edge; the closing edge of each ring is dropped
+    # because GeoJSON rings repeat their first vertex
+    x0, y0, x1, y1 = x[:-1], y[:-1], x[1:], y[1:]
+    cross = np.where(same_ring, x0 * y1 - x1 * y0, 0.0)
+    edge_ring = ring_ids[:-1]
+    area2 = np.bincount(edge_ring, weights=cross, minlength=n_rings)
+    cx6 = np.bincount(edge_ring, weights=(x0 + x1) * cross, minlength=n_rings)
+    cy6 = np.bincount(edge_ring, weights=(y0 + y1) * cross, minlength=n_rings)
+
+    valid = area2 != 0
+    safe_area2 = np.where(valid, area2, 1.0)
+    ring_cx = np.where(valid, cx6 / (3.0 * safe_area2), 0.0)
+    ring_cy = np.where(valid, cy6 / (3.0 * safe_area2), 0.0)
+    ring_area = np.abs(area2) / 2.0 * ring_sign
+
+    # Combine rings into polygons (exterior minus holes)
+    polygon_area = np.bincount(ring_polygon, weights=ring_area, minlength=n_polygons)
+    polygon_cx = np.bincount(ring_polygon, weights=ring_area * ring_cx, minlength=n_polygons)
+    polygon_cy = np.bincount(ring_polygon, weights=ring_area * ring_cy, minlength=n_polygons)
+    has_area = polygon_area > 0
+    safe_area = np.where(has_area, polygon_area, 1.0)
+    polygon_lat = polygon_cy / safe_area
+    polygon_lng = origin[polygon_feature] + polygon_cx / safe_area / np.cos(np.radians(polygon_lat))
+
+    # Keep the parts close to each feature's largest polygon
+    order = np.lexsort((-polygon_area, polygon_feature))
+    features_with_polygons, first = np.unique(polygon_feature[order], return_index=True)
+    largest = np.zeros(n_features, dtype=np.int64)
+    largest[features_with_polygons] = order[first]
+    main = largest[polygon_feature]
+    distance = angular_distance(polygon_lat, polygon_lng, polygon_lat[main], polygon_lng[main])
+    weight = np.where(has_area & (distance <= max_part_distance), polygon_area, 0.0)
+
+    total = np.bincount(polygon_feature, weights=weight, minlength=n_features)
+    cx = np.bincount(polygon_feature, weights=weight * polygon_cx / safe_area, minlength=n_features)
+    cy = np.bincount(polygon_feature, weights=weight * polygon_cy / safe_area, minlength=n_features)
+
+    found = total > 0
+    lat = cy[found] / total[found]
+    lng = origin[found] + cx[found] / total[found] / np.cos(np.radians(lat))
+    centroids[found, 0] = lat
+    centroids[found, 1] = (lng + 180.0) % 360.0 - 180.0
+    return centroids
+
+
+def centroid_cache_path(geojson_path):
+    return settings.FILE_CACHE_DIR / f'{geojson_path.stem}.centroids.npy'
+
+
+def load_centroids(geojson_path, features):
+    """Memory-map cached centroids, recomputing them when the GeoJSON is newer"""
+    cache_path = centroid_cache_path(geojson_path)
+
+    try:
+        if cache_path.stat().st_mtime_ns >= geojson_path.stat().st_mtime_ns:
+            centroids = np.load(cache_path, mmap_mode='r')
+            if centroids.shape == (len(features), 2):
+                return centroids
+    except (OSError, ValueError):
+        pass
+
+    centroids = compute_centroids(features)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            np.save(f, centroids)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write centroid cache", extra={'path': str(cache_path), 'error': str(e)})
+    return centroids
@@ -0,0 +1,212 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Country, EmotionRollup, EmotionSnapshot
+
+RAW = 'raw'
+RESOLUTIONS = (RAW, EmotionRollup.HOUR, EmotionRollup.DAY)
+
+# Longest ranges served from raw snapshots and hourly rollups; anything longer
+# (or older than their retention) is read from daily rollups
+RAW_MAX_SPAN = timedelta(days=2)
+HOURLY_MAX_SPAN = timedelta(days=31)
+
+
+def bucket_start(moment, resolution):
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if resolution == EmotionRollup.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def record_snapshots(countries, recorded_at=None):
+    """Append the current emotion score of each country to the history.
+
+    Snapshots are stamped when the score was computed (now by default), not
+    when the listing was stored: scoring runs later, possibly after the
+    rollup of the hour the listing was stored in.
+    """
+    recorded_at = recorded_at or timezone.now()
+    EmotionSnapshot.objects.bulk_create([
+        EmotionSnapshot(
+            country=country,
+            emotion_score=country.emotion_score,
+            post_count=country.post_count,
+            recorded_at=recorded_at,
+        )
+        for country in countries
+    ])
+
+
+def last_bucket_start(resolution, country=OuterRef('country_id')):
+    """Start of the country's latest `resolution` bucket, as a subquery"""
+    return Subquery(
+        EmotionRollup.objects.filter(country=country, resolution=resolution)
+        .order_by('-bucket_start').values('bucket_start')[:1]
+    )
+
+
+def rollup_samples(resolution):
+    """Samples to fold into `resolution` buckets, as (country_id, time, min, max, sum, count, ema).
+
+    Each country's samples start at its own last bucket, so one whose scores
+    arrive late is not skipped because others were rolled up further.
+    """
+    if resolution == EmotionRollup.HOUR:
+        snapshots = EmotionSnapshot.objects.alias(last_start=last_bucket_start(resolution)).filter(
+            Q(last_start__isnull=True) | Q(recorded_at__gte=F('last_start'))
+        ).order_by('country_id', 'recorded_at')
+        for country_id, recorded_at, score in snapshots.values_list('country_id', 'recorded_at', 'emotion_score').iterator():
+            yield country_id, recorded_at, score, score, score, 1, None
+    else:
+        hours = EmotionRollup.objects.filter(resolution=EmotionRollup.HOUR).alias(
+            last_start=last_bucket_start(resolution)
+        ).filter(
+            Q(last_start__isnull=True) | Q(bucket_start__gte=F('last_start'))
+        ).order_by('country_id', 'bucket_start')
+        yield from hours.values_list(
+            'country_id', 'bucket_start', 'score_min', 'score_max', 'score_sum', 'sample_count', 'ema'
+        ).iterator()
+
+
+def previous_emas(resolution):
+    """EMA each country had at the end of the bucket before its last one"""
+    previous = EmotionRollup.objects.filter(
+        country=OuterRef('pk'), resolution=resolution, bucket_start__lt=OuterRef('last_start')
+    ).order_by('-bucket_start').values('ema')[:1]
+    return dict(
+        Country.objects.alias(last_start=last_bucket_start(resolution, country=OuterRef('pk')))
+        .annotate(previous_ema=Subquery(previous))
+        .filter(previous_ema__isnull=False)
+        .values_list('id', 'previous_ema')
+    )
+
+
+def roll_up(resolution):
+    """Fold new samples into `resolution` rollups and return the number of buckets written.
+
+    Hourly buckets are built from raw snapshots and daily buckets from hourly
+    ones, so raw rows can be compacted once their hour is rolled up. Each
+    country's last bucket is rebuilt on every call until its period is over,
+    and each country picks up from its own last bucket. The EMA
+    runs over individual snapshots with EMOTION_EMA_ALPHA and carries over
+    from one bucket to the next.
+    """
+    emas = previous_emas(resolution)
+    alpha = settings.EMOTION_EMA_ALPHA
+
+    buckets = {}
+    for country_id, moment, low, high, total, count, ema in rollup_samples(resolution):
+        key = (country_id, bucket_start(moment, resolution))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = EmotionRollup(
+                country_id=country_id, resolution=resolution, bucket_start=key[1],
+                sample_count=0, score_min=low, score_max=high, score_sum=0,
+            )
+        bucket.sample_count += count
+        bucket.score_min = min(bucket.score_min, low)
+        bucket.score_max = max(bucket.score_max, high)
+        bucket.score_sum += total
+
+        if ema is None:
+            previous = emas.get(country_id)
+            ema = total if previous is None else alpha * total + (1 - alpha) * previous
+        emas[country_id] = bucket.ema = ema
+
+    EmotionRollup.objects.bulk_create(
+        buckets.values(),
+        update_conflicts=True,
+        unique_fields=['country', 'resolution', 'bucket_start'],
+        update_fields=['sample_count', 'score_min', 'score_max', 'score_sum', 'ema'],
+        batch_size=500,
+    )
+    return len(buckets)
+
+
+def roll_up_all():
+    return roll_up(EmotionRollup.HOUR), roll_up(EmotionRollup.DAY)
+
+
+def compact_history(now=None):
+    """Roll up, then drop raw snapshots and hourly rollups past their retention.
+
+    Only rows already covered by a finished coarser bucket of their country
+    are deleted.
+    Returns the number of snapshots and hourly rollups removed.
+    """
+    now = now or timezone.now()
+    roll_up_all()
+
+    with transaction.atomic():
+        snapshots_removed, _ = EmotionSnapshot.objects.filter(
+            recorded_at__lt=now - timedelta(days=settings.EMOTION_SNAPSHOT_RETENTION_DAYS)
+        ).filter(recorded_at__lt=last_bucket_start(EmotionRollup.HOUR)).delete()
+        hours_removed, _ = EmotionRollup.objects.filter(
+            resolution=EmotionRollup.HOUR,
+            bucket_start__lt=now - timedelta(days=settings.EMOTION_HOURLY_RETENTION_DAYS),
+        ).filter(bucket_start__lt=last_bucket_start(EmotionRollup.DAY)).delete()
+    return snapshots_removed, hours_removed
+
+
+def parse_moment(value):
+    """Parse an ISO 8601 date or datetime; naive values are taken as UTC"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date '{value}'")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def choose_resolution(start, end, now=None):
+    """Finest resolution that still holds the whole range without too many points"""
+    now = now or timezone.now()
+    span = end - start
+    if span <= RAW_MAX_SPAN and start >= now - timedelta(days=settings.EMOTION_SNAPSHOT_RETENTION_DAYS):
+        return RAW
+    if span <= HOURLY_MAX_SPAN and start >= now - timedelta(days=settings.EMOTION_HOURLY_RETENTION_DAYS):
+        return EmotionRollup.HOUR
+    return EmotionRollup.DAY
+
+
+def country_history(country, resolution, start, end):
+    """Points of the country's emotion history between start and end, oldest first"""
+    if resolution == RAW:
+        snapshots = country.emotion_snapshots.filter(
+            recorded_at__gte=start, recorded_at__lt=end
+        ).order_by('recorded_at')
+        return [
+            {
+                't': recorded_at.isoformat(),
+                'mean': score,
+                'min': score,
+                'max': score,
+                'ema': None,
+                'count': 1,
+            }
+            for recorded_at, score in snapshots.values_list('recorded_at', 'emotion_score')
+        ]
+
+    rollups = country.emotion_rollups.filter(
+        resolution=resolution,
+        bucket_start__gte=bucket_start(start, resolution),
+        bucket_start__lt=end,
+    ).order_by('bucket_start')
+    return [
+        {
+            't': rollup.bucket_start.isoformat(),
+            'mean': round(rollup.score_mean, 2),
+            'min': rollup.score_min,
+            'max': rollup.score_max,
+            'ema': round(rollup.ema, 2),
+            'count': rollup.sample_count,
+        }
+        for rollup in rollups
+    ]
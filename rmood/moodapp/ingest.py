@@ -0,0 +1,315 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from . import metrics
+from .emotion import count_tokens
+from .fetch_runs import recorder
+from .fetcher import iter_listings
+from .history import record_snapshots
+from .jobs import Heartbeat, claim_jobs, finish_jobs
+from .pipeline import BatchStage
+from .prompts import select_titles
+from .scheduler import can_measure_activity, fold_score_change, is_dead_subreddit, schedule_failure, schedule_success
+from .models import FetchRun, RedditPost
+from .scorers import score_countries
+from .state import fetch_state, lease_owner_id
+
+logger = logging.getLogger(__name__)
+
+def save_country_posts(country, posts_data):
+    """Upsert the listing on (country, reddit_id) and drop the posts that fell out of it.
+
+    The country keeps its emotion_score until the scoring stage replaces it.
+    Returns the number of inserted, updated and removed posts.
+    """
+    posts_by_id = {post['reddit_id']: post for post in posts_data}
+
+    with transaction.atomic():
+        existing = set(country.posts.filter(
+            reddit_id__in=list(posts_by_id)
+        ).values_list('reddit_id', flat=True))
+
+        # A crosspost is stored once per country listing it, so every country
+        # keeps its whole listing
+        RedditPost.objects.bulk_create(
+            [RedditPost(country=country, **post_data) for post_data in posts_by_id.values()],
+            update_conflicts=True,
+            unique_fields=['country', 'reddit_id'],
+            update_fields=['score', 'num_comments'],
+        )
+
+        removed, _ = country.posts.exclude(reddit_id__in=list(posts_by_id)).delete()
+
+        inserted = len(posts_by_id) - len(existing)
+        previous_updated = country.last_updated
+        country.last_updated = timezone.now()
+        country.post_count = len(posts_by_id)
+        schedule_success(country, inserted, previous_updated, country.last_updated)
+        # Only the fields written here; votes update the user mood totals concurrently
+        country.save(update_fields=[
+            'last_updated', 'post_count', 'post_velocity', 'consecutive_failures', 'next_refresh_at',
+        ])
+
+    return inserted, len(existing), removed
+
+
+def mark_failed(country, error):
+    error_msg = str(error)
+    logger.warning("Refresh failed", extra={'country': country.name, 'subreddit': country.subreddit, 'error': error_msg})
+
+    # Still record the attempt and push the next one back
+    country.last_updated = timezone.now()
+    schedule_failure(country, error, country.last_updated)
+    country.save(update_fields=['last_updated', 'consecutive_failures', 'next_refresh_at'])
+
+    return {
+        'status': 'error',
+        'country': country.name,
+        'subreddit': country.subreddit,
+        'error': error_msg,
+        'error_class': type(error).__name__,
+        'permanent': is_dead_subreddit(error),
+    }
+
+
+def previous_listings(countries):
+    """Titles scored and score currently stored for each country, read in one query"""
+    by_id = {country.id: country for country in countries if country.last_updated}
+    posts = {country.name: [] for country in by_id.values()}
+    rows = RedditPost.objects.filter(country_id__in=list(by_id)).values('country_id', 'title', 'score', 'num_comments')
+    for row in rows:
+        posts[by_id[row['country_id']].name].append(row)
+    return {country.name: (select_titles(posts[country.name]), country.emotion_score) for country in by_id.values()}
+
+
+def store_listing(country, posts_data):
+    """Store a fetched listing for the country, ahead of its score"""
+    fetch_state.set_status(country, is_fetching=True)
+
+    try:
+        inserted, updated, removed = save_country_posts(country, posts_data)
+        logger.info("Stored listing", extra={
+            'country': country.name, 'posts': len(posts_data), 'inserted': inserted,
+            'updated': updated, 'removed': removed,
+        })
+
+        return {
+            'status': 'success',
+            'country': country.name,
+            'subreddit': country.subreddit,
+            'posts_fetched': len(posts_data),
+            'posts_inserted': inserted,
+            'posts_updated': updated,
+            'posts_removed': removed,
+            'total_posts': country.post_count,
+        }
+
+    except Exception as e:
+        return mark_failed(country, e)
+
+
+def fetch_run(country, outcome, started_at, **fields):
+    return FetchRun(
+        country=country,
+        subreddit=country.subreddit,
+        started_at=started_at,
+        finished_at=timezone.now(),
+        outcome=outcome['status'],
+        error_class=outcome.get('error_class', ''),
+        **fields,
+    )
+
+
+def split_tokens(tokens, title_sets):
+    """Share a batch's tokens between its listings by the length of their titles"""
+    sizes = {country: sum(len(title) for title in titles) for country, titles in title_sets.items()}
+    total = sum(sizes.values())
+    return {country: round(tokens * size / total) if total else 0 for country, size in sizes.items()}
+
+
+def score_stored_listings(items):
+    """Scoring stage: score a batch of stored listings and update their countries.
+
+    Each item is a dict queued by refresh_countries with the country, its new
+    titles, its previous (titles, score) if any, whether the score change
+    counts towards its volatility, and the trace fields of its refresh.
+    Countries no scorer could score keep their score, volatility and
+    history untouched. When scoring fails, the listings not scored yet are
+    traced as errors before the exception reaches the stage.
+    """
+    title_sets = {item['country'].name: item['titles'] for item in items}
+    previous = {item['country'].name: item['previous'] for item in items if item['previous']}
+    runs = []
+
+    try:
+        started = time.perf_counter()
+        with count_tokens() as meter:
+            emotion_scores = score_countries(title_sets, previous=previous)
+        scoring_seconds = time.perf_counter() - started
+        metrics.fetch_stage_duration.observe(scoring_seconds, stage='llm_scoring')
+        tokens = split_tokens(meter.tokens, title_sets)
+
+        scored_at = timezone.now()
+        scored, traced = [], []
+        # The batch shares scored_at and status polls only read changes after
+        # the last one they saw, so a poll must see the whole batch or none of it
+        with transaction.atomic():
+            for item in items:
+                country = item['country']
+                score = emotion_scores[country.name]
+                if score is None:
+                    # No scorer could read it; the previous score stands
+                    logger.warning("Listing not scored, keeping the previous score", extra={
+                        'country': country.name, 'emotion_score': country.emotion_score,
+                    })
+                    traced.append(fetch_run(
+                        country, {'status': 'error', 'error_class': 'Unscored'}, item['started_at'],
+                        scoring_seconds=scoring_seconds, llm_tokens=tokens[country.name], **item['trace'],
+                    ))
+                    continue
+
+                previous_score = country.emotion_score
+                country.emotion_score = score
+                country.scored_at = scored_at
+                if item['measure_volatility']:
+                    fold_score_change(country, previous_score)
+                country.save(update_fields=['emotion_score', 'scored_at', 'score_volatility'])
+                scored.append(country)
+                traced.append(fetch_run(
+                    country, {'status': 'success'}, item['started_at'],
+                    scoring_seconds=scoring_seconds, llm_tokens=tokens[country.name], **item['trace'],
+                ))
+
+            record_snapshots(scored, recorded_at=scored_at)
+        runs.extend(traced)
+        for country in scored:
+            logger.info("Scored listing", extra={'country': country.name, 'emotion_score': country.emotion_score})
+    except Exception as e:
+        outcome = {'status': 'error', 'error_class': type(e).__name__}
+        for item in items[len(runs):]:
+            runs.append(fetch_run(item['country'], outcome, item['started_at'], **item['trace']))
+        raise
+    finally:
+        recorder.add(runs)
+
+
+_scoring_stage = None
+_stage_lock = threading.Lock()
+
+
+def scoring_stage():
+    """The process-wide scoring stage, started on first use"""
+    global _scoring_stage
+    with _stage_lock:
+        if _scoring_stage is None:
+            _scoring_stage = BatchStage(
+                'scoring', score_stored_listings,
+                workers=settings.SCORING_WORKERS,
+                batch_size=settings.SCORING_BATCH_SIZE,
+                queue_size=settings.SCORING_QUEUE_SIZE,
+                batch_wait=settings.SCORING_BATCH_WAIT,
+            ).start()
+        return _scoring_stage
+
+
+def scoring_stats():
+    with _stage_lock:
+        stage = _scoring_stage
+    return stage.stats() if stage else None
+
+
+def stop_scoring():
+    """Score whatever is still queued, then end the scoring workers"""
+    global _scoring_stage
+    with _stage_lock:
+        stage, _scoring_stage = _scoring_stage, None
+    if stage is not None:
+        stage.stop()
+
+
+def refresh_countries(countries, max_workers=None):
+    """Fetch the listings of several countries at once and store each as it arrives.
+
+    Stored listings are queued for the scoring stage, which scores them in
+    batches on its own workers and then updates emotion_score, so new posts
+    show up while scoring catches up. Queueing blocks while the scoring
+    queue is full. Returns the outcome of each fetch; every country refreshed
+    leaves a FetchRun trace once it was scored or failed.
+    """
+    countries = list(countries)
+    if not countries:
+        return []
+
+    by_subreddit = {}
+    for country in countries:
+        by_subreddit.setdefault(country.subreddit, []).append(country)
+
+    # Read before the new listings replace them, for the scorer's pre-filter
+    previous = previous_listings(countries)
+    stage = scoring_stage()
+    started_at = timezone.now()
+    listing_seconds = {}
+    outcomes = []
+    runs = []
+
+    logger.info("Fetching listings", extra={'subreddits': len(by_subreddit)})
+    try:
+        listings = iter_listings(
+            list(by_subreddit), limit=settings.REDDIT_LISTING_SIZE, max_workers=max_workers, timings=listing_seconds
+        )
+        for subreddit_name, posts_data, error in listings:
+            metrics.fetch_stage_duration.observe(listing_seconds[subreddit_name], stage='reddit_listing')
+            for country in by_subreddit[subreddit_name]:
+                persist_started = time.perf_counter()
+                if error is not None:
+                    outcome = mark_failed(country, error)
+                else:
+                    measure_volatility = can_measure_activity(country)
+                    outcome = store_listing(country, posts_data)
+                outcomes.append(outcome)
+                trace = {
+                    'listing_seconds': listing_seconds.get(subreddit_name),
+                    'persist_seconds': time.perf_counter() - persist_started,
+                    'post_count': len(posts_data or []),
+                }
+                metrics.fetch_stage_duration.observe(trace['persist_seconds'], stage='db_persist')
+
+                if outcome['status'] == 'success':
+                    stage.put({
+                        'country': country,
+                        'titles': select_titles(posts_data),
+                        'previous': previous.get(country.name),
+                        'measure_volatility': measure_volatility,
+                        'started_at': started_at,
+                        'trace': trace,
+                    })
+                else:
+                    runs.append(fetch_run(country, outcome, started_at, **trace))
+    finally:
+        fetch_state.set_status(is_fetching=False)
+
+    recorder.add(runs)
+    for outcome in outcomes:
+        metrics.fetch_outcomes.inc(status=outcome['status'])
+    return outcomes
+
+
+def refresh_next_countries(batch_size=None, max_workers=None, owner=None):
+    """Claim the most overdue country jobs and refresh them.
+
+    Leases are kept alive while the refresh runs, so any number of workers
+    can call this at once without fetching a country twice. A worker that
+    dies leaves its leases to expire and be claimed again.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    claimed = claim_jobs(owner or lease_owner_id(), batch_size)
+    if not claimed:
+        return []
+
+    with Heartbeat(claimed):
+        outcomes = refresh_countries([job.country for job in claimed], max_workers=max_workers)
+    finish_jobs(claimed, {outcome['country']: outcome for outcome in outcomes})
+    return outcomes
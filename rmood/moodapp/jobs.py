@@ -0,0 +1,174 @@
+import logging
+import threading
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Country, FetchJob
+from .scheduler import schedule_failure
+
+logger = logging.getLogger(__name__)
+
+# Fields that end a lease, whoever held it
+RELEASED = {'lease_owner': '', 'lease_token': '', 'lease_expires_at': None, 'heartbeat_at': None}
+
+
+def ensure_jobs():
+    """Create the job of every country that has none; returns how many"""
+    missing = list(Country.objects.filter(fetch_job__isnull=True).values_list('pk', flat=True))
+    FetchJob.objects.bulk_create([FetchJob(country_id=pk) for pk in missing], ignore_conflicts=True)
+    return len(missing)
+
+
+def ensure_job(country):
+    """Create the job of a new country so ingestion picks it up"""
+    FetchJob.objects.bulk_create([FetchJob(country=country)], ignore_conflicts=True)
+
+
+def claimable(now):
+    """Queued jobs whose country is due"""
+    due = Q(country__next_refresh_at__isnull=True) | Q(country__next_refresh_at__lte=now)
+    return Q(state=FetchJob.QUEUED) & due
+
+
+def release_expired(now):
+    """Queue again the jobs whose worker stopped heartbeating; returns how many.
+
+    The refresh counts as failed, so the country backs off like after any
+    other failure instead of being claimed again at once.
+    """
+    released = 0
+    for job in FetchJob.objects.filter(state=FetchJob.LEASED, lease_expires_at__lt=now).select_related('country'):
+        # Whoever releases a lease first wins; the rest leave the country alone
+        if not FetchJob.objects.filter(pk=job.pk, lease_token=job.lease_token, state=FetchJob.LEASED).update(
+            state=FetchJob.QUEUED, last_error='Lease expired', **RELEASED
+        ):
+            continue
+        schedule_failure(job.country, TimeoutError('Lease expired'), now)
+        job.country.save(update_fields=['consecutive_failures', 'next_refresh_at'])
+        released += 1
+    return released
+
+
+def claim_jobs(owner, limit, lease_seconds=None):
+    """Lease up to `limit` due jobs to `owner`, most overdue first.
+
+    On databases with SKIP LOCKED (PostgreSQL, MySQL 8, Oracle) the rows are
+    locked while the lease is written, and rows another worker is claiming
+    are skipped rather than waited for. Elsewhere (SQLite) the UPDATE
+    re-checks that each row is still claimable, so when two workers race for
+    a row only one of them gets it. Every claim gets its own token; the jobs
+    holding it are returned with their country.
+    """
+    now = timezone.now()
+    lease_seconds = lease_seconds or settings.FETCH_JOB_LEASE_SECONDS
+    release_expired(now)
+
+    token = uuid.uuid4().hex
+    lease = {
+        'state': FetchJob.LEASED,
+        'lease_owner': owner,
+        'lease_token': token,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds),
+        'heartbeat_at': now,
+    }
+    candidates = FetchJob.objects.filter(claimable(now)).order_by(
+        F('country__next_refresh_at').asc(nulls_first=True), 'country__name'
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pks = list(candidates.select_for_update(skip_locked=True, of=('self',)).values_list('pk', flat=True)[:limit])
+            FetchJob.objects.filter(pk__in=pks).update(**lease)
+    else:
+        pks = list(candidates.values_list('pk', flat=True)[:limit])
+        FetchJob.objects.filter(claimable(now), pk__in=pks).update(**lease)
+
+    return list(FetchJob.objects.filter(lease_token=token).select_related('country'))
+
+
+def heartbeat(jobs, lease_seconds=None):
+    """Push back the lease expiry of jobs still held; returns how many are"""
+    now = timezone.now()
+    lease_seconds = lease_seconds or settings.FETCH_JOB_LEASE_SECONDS
+    return FetchJob.objects.filter(
+        pk__in=[job.pk for job in jobs], lease_token__in={job.lease_token for job in jobs}, state=FetchJob.LEASED
+    ).update(lease_expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now)
+
+
+class Heartbeat:
+    """Keeps the leases of claimed jobs alive from a background thread while they run"""
+
+    def __init__(self, jobs, lease_seconds=None):
+        self.jobs = jobs
+        self.lease_seconds = lease_seconds or settings.FETCH_JOB_LEASE_SECONDS
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(self.lease_seconds / 3):
+                held = heartbeat(self.jobs, self.lease_seconds)
+                if held < len(self.jobs):
+                    logger.warning("Lost job leases", extra={'held': held, 'claimed': len(self.jobs)})
+        except Exception:
+            logger.exception("Job heartbeat failed")
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def finish_jobs(jobs, outcomes):
+    """Release claimed jobs after a refresh, given its outcomes keyed by country name.
+
+    Jobs are queued again for when Country.next_refresh_at says, which
+    failures already pushed back. Only a subreddit that doesn't exist (or is
+    private or banned) failing FETCH_JOB_MAX_ATTEMPTS times in a row is
+    dead-lettered; any other failure keeps backing off on its own. Jobs
+    whose lease was taken over meanwhile are left to their new owner.
+    """
+    succeeded = []
+    for job in jobs:
+        outcome = outcomes.get(job.country.name)
+        if outcome is not None and outcome['status'] == 'success':
+            succeeded.append(job.pk)
+            continue
+
+        error = outcome['error'] if outcome else 'No outcome for this country'
+        dead = bool(outcome and outcome.get('permanent')) and (
+            job.country.consecutive_failures >= settings.FETCH_JOB_MAX_ATTEMPTS
+        )
+        FetchJob.objects.filter(pk=job.pk, lease_token=job.lease_token).update(
+            state=FetchJob.DEAD if dead else FetchJob.QUEUED, last_error=error, **RELEASED
+        )
+        if dead:
+            logger.warning("Job dead-lettered", extra={
+                'country': job.country.name, 'failures': job.country.consecutive_failures, 'error': error,
+            })
+
+    if succeeded:
+        FetchJob.objects.filter(pk__in=succeeded, lease_token__in={job.lease_token for job in jobs}).update(
+            state=FetchJob.QUEUED, last_error='', **RELEASED
+        )
+
+
+def requeue(jobs):
+    """Queue dead (or any) jobs again, due now and with no failures; `jobs` is a queryset"""
+    with transaction.atomic():
+        Country.objects.filter(fetch_job__in=jobs).update(consecutive_failures=0, next_refresh_at=None)
+        return jobs.update(state=FetchJob.QUEUED, **RELEASED)
+
+
+def job_counts():
+    counts = {state: 0 for state, label in FetchJob.STATE_CHOICES}
+    counts.update(FetchJob.objects.values_list('state').annotate(count=Count('pk')).order_by())
+    return counts
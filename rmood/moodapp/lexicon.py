@@ -0,0 +1,123 @@
+import re
+import numpy as np
+
+# Word valences from -5 (very negative) to +5 (very positive), tuned for news headlines
+VALENCE = {
+    # Strongly negative
+    'killed': -5, 'kill': -4, 'kills': -4, 'killing': -4, 'murder': -5, 'murdered': -5, 'massacre': -5,
+    'genocide': -5, 'terror': -5, 'terrorist': -5, 'terrorism': -5, 'bombing': -5, 'suicide': -5,
+    'rape': -5, 'raped': -5, 'dead': -4, 'death': -4, 'deaths': -4, 'die': -4, 'died': -4, 'dies': -4,
+    'war': -4, 'wars': -4, 'catastrophe': -4, 'catastrophic': -4, 'disaster': -4, 'tragedy': -4,
+    'tragic': -4, 'horrific': -4, 'horrible': -4, 'horror': -4, 'brutal': -4, 'abuse': -4, 'abused': -4,
+    'attack': -3, 'attacks': -3, 'attacked': -3, 'violence': -4, 'violent': -4, 'shooting': -4,
+    'stabbing': -4, 'stabbed': -4, 'hate': -4, 'hatred': -4, 'furious': -3, 'outrage': -3,
+    'outraged': -3, 'crisis': -3, 'collapse': -3, 'collapsed': -3, 'famine': -4, 'starving': -4,
+    'earthquake': -3, 'flood': -3, 'floods': -3, 'flooding': -3, 'wildfire': -3, 'wildfires': -3,
+    'hurricane': -3, 'explosion': -3, 'crash': -3, 'crashed': -3, 'injured': -3, 'victims': -3,
+    'victim': -3, 'hostage': -4, 'kidnapped': -4, 'invasion': -4, 'destroyed': -3, 'destroy': -3,
+    # Negative
+    'bad': -2, 'worse': -3, 'worst': -3, 'sad': -2, 'angry': -3, 'anger': -3, 'fear': -2, 'afraid': -2,
+    'scared': -2, 'worried': -2, 'worry': -2, 'concern': -1, 'concerns': -1, 'concerned': -1,
+    'problem': -2, 'problems': -2, 'fail': -2, 'failed': -2, 'failure': -2, 'fails': -2, 'lost': -2,
+    'lose': -2, 'losing': -2, 'loss': -2, 'losses': -2, 'poor': -2, 'poverty': -3, 'corrupt': -3,
+    'corruption': -3, 'scandal': -3, 'fraud': -3, 'scam': -3, 'crime': -3, 'criminal': -3,
+    'arrested': -2, 'arrest': -2, 'jailed': -2, 'prison': -2, 'protest': -1, 'protests': -1,
+    'riot': -3, 'riots': -3, 'strike': -1, 'strikes': -1, 'ban': -1, 'banned': -2, 'threat': -2,
+    'threats': -2, 'threatens': -2, 'danger': -2, 'dangerous': -2, 'risk': -1, 'warning': -1,
+    'inflation': -2, 'recession': -3, 'unemployment': -2, 'debt': -2, 'expensive': -1,
+    'shortage': -2, 'shortages': -2, 'illegal': -2, 'racist': -3, 'racism': -3, 'toxic': -3,
+    'pollution': -2, 'disease': -2, 'sick': -2, 'pandemic': -3, 'virus': -2, 'outbreak': -3,
+    'cancer': -3, 'pain': -2, 'hurt': -2, 'broken': -2, 'ugly': -2, 'stupid': -2, 'terrible': -3,
+    'awful': -3, 'disgusting': -3, 'shame': -2, 'shameful': -3, 'sucks': -2, 'annoying': -2,
+    'frustrated': -2, 'frustrating': -2, 'lonely': -2, 'depressed': -3, 'depression': -3,
+    'struggling': -2, 'struggle': -2, 'rent': -1, 'evicted': -3, 'homeless': -2, 'refugees': -1,
+    'conflict': -2, 'sanctions': -2, 'tension': -2, 'tensions': -2, 'cuts': -1, 'layoffs': -2,
+    'fired': -2, 'bankrupt': -3, 'bankruptcy': -3, 'scary': -2, 'unsafe': -2, 'delay': -1,
+    'delayed': -1, 'cancelled': -1, 'canceled': -1, 'missing': -2, 'rip': -2, 'mourn': -2,
+    'mourning': -2, 'grief': -3,
+    # Positive
+    'good': 2, 'better': 2, 'best': 3, 'great': 3, 'nice': 2, 'happy': 3, 'happiness': 3, 'glad': 2,
+    'love': 3, 'loved': 3, 'lovely': 3, 'beautiful': 3, 'wonderful': 4, 'amazing': 4, 'awesome': 4,
+    'fantastic': 4, 'excellent': 3, 'brilliant': 3, 'incredible': 3, 'stunning': 3, 'gorgeous': 3,
+    'proud': 2, 'pride': 2, 'win': 3, 'wins': 3, 'won': 3, 'winning': 3, 'winner': 3, 'victory': 3,
+    'success': 3, 'successful': 3, 'succeed': 3, 'celebrate': 3, 'celebrates': 3, 'celebration': 3,
+    'festival': 2, 'holiday': 2, 'vacation': 2, 'fun': 2, 'enjoy': 2, 'enjoyed': 2, 'friendly': 2,
+    'kind': 2, 'kindness': 3, 'thank': 2, 'thanks': 2, 'grateful': 3, 'hope': 2, 'hopeful': 2,
+    'peace': 3, 'peaceful': 3, 'safe': 2, 'safety': 1, 'free': 1, 'freedom': 2, 'growth': 2,
+    'grow': 1, 'boost': 2, 'improve': 2, 'improved': 2, 'improvement': 2, 'record': 1, 'rescue': 2,
+    'rescued': 2, 'saved': 2, 'save': 1, 'support': 1, 'cure': 3, 'breakthrough': 3, 'innovation': 2,
+    'discovery': 2, 'launch': 1, 'launches': 1, 'opens': 1, 'opening': 1, 'welcome': 2, 'cute': 2,
+    'delicious': 3, 'tasty': 2, 'sunny': 2, 'sunset': 2, 'view': 1, 'views': 1, 'wedding': 3,
+    'birthday': 2, 'baby': 2, 'congrats': 3, 'congratulations': 3, 'champion': 3, 'champions': 3,
+    'medal': 2, 'gold': 2, 'award': 2, 'awarded': 2, 'honour': 2, 'honor': 2, 'hero': 3,
+    'heroes': 3, 'wholesome': 3, 'cool': 1, 'interesting': 1, 'recommend': 1, 'recommendations': 1,
+    'agreement': 1, 'deal': 1, 'recovery': 2, 'recovered': 2, 'rises': 1, 'rise': 1, 'raise': 1,
+    'affordable': 2, 'cheap': 1, 'easy': 1, 'beauty': 3, 'smile': 2, 'laugh': 2, 'joy': 3,
+    'excited': 3, 'exciting': 3, 'perfect': 3, 'favorite': 2, 'favourite': 2, 'legend': 2,
+}
+
+NEGATORS = {'not', 'no', 'never', "don't", "doesn't", "isn't", "wasn't", "aren't", "won't", "can't", 'without'}
+
+TOKEN_RE = re.compile(r"[a-z']+")
+
+
+class LexiconEngine:
+    """Scores title sets with a word valence lexicon in one vectorized pass"""
+
+    def __init__(self, valence=VALENCE, negators=NEGATORS):
+        words = list(valence)
+        self.vocabulary = {word: i for i, word in enumerate(words)}
+        self.valence = np.array([valence[word] for word in words], dtype=np.float64)
+        self.negators = set(negators)
+
+    def score(self, title_sets):
+        """Return a 1-10 score per key of `title_sets`, or None when no title carries sentiment"""
+        keys = list(title_sets)
+        title_owner = []
+        rows = []
+        cols = []
+        signs = []
+        n_titles = 0
+
+        # Build the sparse title x term matrix as coordinate triplets
+        for owner, key in enumerate(keys):
+            for title in title_sets[key]:
+                previous = None
+                for token in TOKEN_RE.findall(title.casefold()):
+                    col = self.vocabulary.get(token)
+                    if col is not None:
+                        rows.append(n_titles)
+                        cols.append(col)
+                        signs.append(-0.5 if previous in self.negators else 1.0)
+                    previous = token
+                title_owner.append(owner)
+                n_titles += 1
+
+        if not keys:
+            return {}
+        if not rows:
+            return {key: None for key in keys}
+
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        signs = np.asarray(signs)
+        title_owner = np.asarray(title_owner)
+
+        # Sparse matrix times valence vector, then mean valence per title
+        title_sum = np.bincount(rows, weights=self.valence[cols] * signs, minlength=n_titles)
+        title_hits = np.bincount(rows, minlength=n_titles)
+        has_sentiment = title_hits > 0
+        title_mean = np.divide(title_sum, title_hits, out=np.zeros(n_titles), where=has_sentiment)
+
+        # Average the titles that carry sentiment within each set
+        set_sum = np.bincount(title_owner, weights=title_mean, minlength=len(keys))
+        set_count = np.bincount(title_owner, weights=has_sentiment, minlength=len(keys))
+        set_mean = np.divide(set_sum, set_count, out=np.zeros(len(keys)), where=set_count > 0)
+
+        # Map valence -5..5 onto the 1..10 emotion scale
+        scores = np.clip(1 + (set_mean + 5) * 0.9, 1, 10)
+
+        return {
+            key: float(score) if count > 0 else None
+            for key, score, count in zip(keys, scores, set_count)
+        }
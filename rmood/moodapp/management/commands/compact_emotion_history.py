@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from moodapp.history import compact_history
+
+class Command(BaseCommand):
+    help = 'Roll up emotion snapshots and drop raw and hourly rows past their retention'
+
+    def handle(self, *args, **kwargs):
+        snapshots, hours = compact_history()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {snapshots} raw snapshots and {hours} hourly rollups'
+        ))
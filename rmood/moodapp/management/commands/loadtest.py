@@ -0,0 +1,142 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from moodapp import benchmark, clients, fetcher, ingest
+from moodapp.geo import sync_countries
+from moodapp.models import Country
+from moodapp.ratelimit import TokenBucket
+
+class Command(BaseCommand):
+    help = 'Benchmark the endpoints against local fake Reddit and OpenRouter servers and print JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests sent to each endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--countries', type=int, default=40, help='Countries ingested before the endpoints are driven')
+        parser.add_argument('--endpoints', nargs='*', help='Only benchmark these endpoints')
+        parser.add_argument('--reddit-latency', type=float, default=0.05, help='Mean seconds added to each fake Reddit reply')
+        parser.add_argument('--reddit-error-rate', type=float, default=0.0, help='Share of fake Reddit requests answered with 503')
+        parser.add_argument('--llm-latency', type=float, default=0.2, help='Mean seconds added to each fake OpenRouter reply')
+        parser.add_argument('--llm-error-rate', type=float, default=0.0, help='Share of fake OpenRouter requests answered with 503')
+        parser.add_argument('--reddit-qps', type=float, default=None,
+                            help='Override the Reddit token bucket rate (default keeps REDDIT_QPS)')
+        parser.add_argument('--servers', nargs='*', choices=['wsgi', 'asgi'], default=[],
+                            help='Also serve the project over these interfaces with uvicorn and hold polling clients against it')
+        parser.add_argument('--pollers', type=int, default=1000, help='Clients polling each served interface')
+        parser.add_argument('--poll-interval', type=float, default=30.0, help='Seconds between the polls of one client')
+        parser.add_argument('--poll-seconds', type=float, default=60.0, help='Seconds the pollers run for')
+        parser.add_argument('--streams', type=int, default=1000, help='Status streams held open alongside the pollers')
+        parser.add_argument('--wsgi-threads', type=int, default=32, help='Threads serving the WSGI interface')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--keep-db', action='store_true', help='Keep the benchmark database afterwards')
+
+    def handle(self, *args, **options):
+        if options['servers'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('--servers needs uvicorn (pip install uvicorn)')
+
+        reddit = benchmark.FakeReddit(latency=options['reddit_latency'], error_rate=options['reddit_error_rate'])
+        openrouter = benchmark.FakeOpenRouter(latency=options['llm_latency'], error_rate=options['llm_error_rate'])
+
+        # Everything runs against a throwaway copy of the database. SQLite's
+        # default in-memory test database uses table locks that fail concurrent
+        # writers at once, so use a file like a real deployment would
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'rmood_loadtest.sqlite3')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keep_db'])
+        log = io.StringIO()
+
+        try:
+            with reddit, openrouter, override_settings(
+                REDDIT_URL=reddit.url,
+                REDDIT_OAUTH_URL=reddit.url,
+                OPENROUTER_URL=f'{openrouter.url}/api/v1/chat/completions',
+                ALLOWED_HOSTS=['testserver'],
+            ), contextlib.redirect_stdout(log):
+                clients.reset_clients()
+                if options['reddit_qps']:
+                    fetcher.reddit_bucket = TokenBucket(options['reddit_qps'], capacity=settings.REDDIT_BURST)
+                results = self.run_benchmark(options, reddit, openrouter)
+        finally:
+            clients.reset_clients()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keep_db'])
+            teardown_test_environment()
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_benchmark(self, options, reddit, openrouter):
+        sync_countries()
+
+        started = time.perf_counter()
+        outcomes = ingest.refresh_next_countries(options['countries'], settings.REDDIT_FETCH_WORKERS)
+        stored_seconds = time.perf_counter() - started
+        # Wait for the scoring stage so endpoints see the scores
+        ingest.stop_scoring()
+        ingest_seconds = time.perf_counter() - started
+
+        country_names = list(
+            Country.objects.filter(last_updated__isnull=False).values_list('name', flat=True)
+        ) or ['France']
+
+        scenarios = benchmark.endpoint_scenarios(country_names)
+        selected = options['endpoints'] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise ValueError(f"Unknown endpoints {sorted(unknown)}, expected some of {sorted(scenarios)}")
+
+        endpoints = {}
+        for name in selected:
+            samples, elapsed = benchmark.drive(scenarios[name], options['requests'], options['concurrency'])
+            endpoints[name] = benchmark.summarize(samples, elapsed)
+
+        servers = {}
+        for interface in options['servers']:
+            servers[interface] = benchmark.drive_server(
+                interface, benchmark.poll_paths(country_names), options['pollers'], options['poll_interval'],
+                options['poll_seconds'], streams=options['streams'], threads=options['wsgi_threads'],
+            )
+
+        return {
+            'config': {
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'countries': options['countries'],
+                'reddit_latency': options['reddit_latency'],
+                'reddit_error_rate': options['reddit_error_rate'],
+                'llm_latency': options['llm_latency'],
+                'llm_error_rate': options['llm_error_rate'],
+                'database': connection.vendor,
+                'servers': options['servers'],
+                'pollers': options['pollers'],
+                'poll_interval': options['poll_interval'],
+                'poll_seconds': options['poll_seconds'],
+                'streams': options['streams'],
+                'wsgi_threads': options['wsgi_threads'],
+            },
+            'ingest': {
+                'countries': len(outcomes),
+                'succeeded': sum(1 for outcome in outcomes if outcome['status'] == 'success'),
+                'stored_seconds': round(stored_seconds, 3),
+                'seconds': round(ingest_seconds, 3),
+                'reddit': reddit.stats(),
+                'openrouter': openrouter.stats(),
+            },
+            'endpoints': endpoints,
+            'servers': servers,
+        }
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from moodapp.moods import prune_buckets, rebuild_mood_aggregates
+
+class Command(BaseCommand):
+    help = 'Recompute the user mood totals and rolling window on every country'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune-only',
+            action='store_true',
+            help='Only drop hourly buckets that fell out of the rolling window',
+        )
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            self.stdout.write(self.style.SUCCESS(f'Pruned {prune_buckets()} hourly buckets'))
+            return
+
+        countries, buckets = rebuild_mood_aggregates()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt mood totals for {countries} countries and {buckets} hourly buckets'
+        ))
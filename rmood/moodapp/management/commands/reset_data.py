@@ -1,12 +1,19 @@
 from django.core.management.base import BaseCommand
-from moodapp.models import Country, RedditPost, FetchQueue, FetchStatus
+from django.db import transaction
+from moodapp.models import Country, RedditPost
+from moodapp.moods import rebuild_mood_aggregates
+from moodapp.signals import mood_aggregates_paused
+from moodapp.state import fetch_state
 
 class Command(BaseCommand):
     help = 'Reset all data in the database'
 
     def handle(self, *args, **kwargs):
-        RedditPost.objects.all().delete()
-        Country.objects.all().delete()
-        FetchQueue.objects.all().delete()
-        FetchStatus.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('Successfully reset all data'))
\ No newline at end of file
+        # Votes go with their countries; rebuild the aggregates once rather
+        # than moving them for every deleted vote
+        with transaction.atomic(), mood_aggregates_paused():
+            RedditPost.objects.all().delete()
+            Country.objects.all().delete()
+        rebuild_mood_aggregates()
+        fetch_state.reset()
+        self.stdout.write(self.style.SUCCESS('Successfully reset all data'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from moodapp.state import fetch_state
+
+class Command(BaseCommand):
+    help = 'Reset the live fetch status shown on the globe'
+
+    def handle(self, *args, **kwargs):
+        fetch_state.reset({'next_country': 'Ready', 'next_subreddit': '', 'is_fetching': False})
+
+        self.stdout.write(self.style.SUCCESS('Successfully reset fetch state'))
@@ -0,0 +1,147 @@
+import logging
+import signal
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from moodapp import clients, fetch_runs, history, ingest, jobs, metrics, score_cache
+from moodapp.geo import sync_countries
+from moodapp.moods import prune_buckets
+from moodapp.state import fetch_state, lease_owner_id
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Continuously refresh country posts and emotion scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.INGEST_MIN_INTERVAL,
+            help='Minimum seconds between two refresh cycles',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.INGEST_BATCH_SIZE,
+            help='Number of countries refreshed per cycle',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.REDDIT_FETCH_WORKERS,
+            help='Number of subreddits fetched concurrently',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single refresh cycle and exit',
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            default=settings.INGEST_METRICS_PORT,
+            help='Serve Prometheus metrics of this process on this port',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write('Shutting down after the current cycle...')
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        if options['metrics_port']:
+            metrics.serve_metrics(options['metrics_port'])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
+
+        created = sync_countries()
+        if created:
+            self.stdout.write(f'Added {created} countries')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingestion started ({options['batch_size']} countries per cycle, {options['workers']} workers)"
+        ))
+
+        last_rollup = None
+        last_stats = time.monotonic()
+        owner = lease_owner_id()
+
+        while not stop_event.is_set():
+            started = time.monotonic()
+
+            # A failed cycle (e.g. 'database is locked' while the web process
+            # writes to SQLite) is logged and retried; only a stop ends the loop
+            try:
+                self.refresh_cycle(options, owner)
+            except Exception as e:
+                logger.exception("Refresh cycle failed")
+                self.stderr.write(f'Refresh cycle failed: {e}')
+
+            if last_rollup is None or time.monotonic() - last_rollup >= settings.EMOTION_ROLLUP_INTERVAL:
+                try:
+                    self.maintenance()
+                    last_rollup = time.monotonic()
+                except Exception as e:
+                    logger.exception("Maintenance failed")
+                    self.stderr.write(f'Maintenance failed: {e}')
+
+            if time.monotonic() - last_stats >= settings.CLIENT_STATS_LOG_INTERVAL:
+                try:
+                    self.log_stats()
+                except Exception:
+                    logger.exception("Could not read ingestion stats")
+                last_stats = time.monotonic()
+
+            if options['once']:
+                break
+
+            # Reddit requests are paced by the shared token bucket; this only spaces out cycles
+            elapsed = time.monotonic() - started
+            stop_event.wait(max(0.0, interval - elapsed))
+
+        self.stdout.write('Scoring the listings still queued...')
+        ingest.stop_scoring()
+        self.stdout.write(f'Client pools: {clients.pool_stats()}')
+        fetch_runs.recorder.flush()
+        fetch_state.set_status(is_fetching=False)
+        self.stdout.write(self.style.SUCCESS('Ingestion stopped'))
+
+    def refresh_cycle(self, options, owner):
+        # Other workers may run alongside; each claims its own country jobs
+        outcomes = ingest.refresh_next_countries(options['batch_size'], options['workers'], owner=owner)
+
+        if not outcomes:
+            self.stdout.write('No countries due for a refresh')
+
+        for result in outcomes:
+            if result['status'] == 'success':
+                self.stdout.write(
+                    f"{result['country']}: {result['posts_inserted']} new, {result['posts_updated']} updated, "
+                    f"{result['posts_removed']} removed posts"
+                )
+            else:
+                self.stderr.write(f"{result['country']}: {result['error']}")
+
+    def maintenance(self):
+        hours, days = history.roll_up_all()
+        self.stdout.write(f'Rolled up {hours} hourly and {days} daily emotion buckets')
+        pruned = fetch_runs.prune_fetch_runs()
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} old fetch runs')
+        pruned = prune_buckets()
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} user mood buckets outside the window')
+        evicted = score_cache.evict()
+        if evicted:
+            self.stdout.write(f'Evicted {evicted} emotion score cache entries')
+
+    def log_stats(self):
+        self.stdout.write(f'Client pools: {clients.pool_stats()}')
+        self.stdout.write(f'Fetch jobs: {jobs.job_counts()}')
+        self.stdout.write(f'Scoring stage: {ingest.scoring_stats()}')
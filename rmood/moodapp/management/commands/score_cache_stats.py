@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from moodapp.score_cache import cache_stats, evict
+
+class Command(BaseCommand):
+    help = 'Show emotion score cache hit rates and estimated savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--evict',
+            action='store_true',
+            help='Drop expired and least recently used entries first',
+        )
+
+    def handle(self, *args, **options):
+        if options['evict']:
+            evict()
+
+        stats = cache_stats()
+        self.stdout.write(f"Entries: {stats['entries']}")
+        self.stdout.write(
+            f"Listings: {stats['listing_hits']} hits / {stats['listing_misses']} misses "
+            f"({stats['listing_hit_ratio']:.0%})"
+        )
+        self.stdout.write(
+            f"Titles: {stats['title_hits']} hits / {stats['title_misses']} misses "
+            f"({stats['title_hit_ratio']:.0%})"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved about {stats['tokens_saved']} prompt tokens (${stats['dollars_saved']:.4f})"
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from moodapp.geo import get_country_index, sync_countries
+
+class Command(BaseCommand):
+    help = 'Create a Country for every country in the Natural Earth GeoJSON'
+
+    def handle(self, *args, **kwargs):
+        created = sync_countries()
+        total = len(get_country_index().countries)
+        self.stdout.write(self.style.SUCCESS(f'Added {created} countries ({total} in the index)'))
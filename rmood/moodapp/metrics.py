@@ -0,0 +1,239 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; spans a cached JSON view up to a slow LLM batch
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric(ABC):
+    """A named family of values keyed by label values, kept in process memory"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        """(name suffix, label names, label values, value) of every sample to expose"""
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labelnames, values, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(labelnames, values)} {value}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [('_total', self.labelnames, key, value) for key, value in items]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, dict(state, buckets=list(state['buckets']))) for key, state in self.values.items())
+
+        samples = []
+        bucket_labels = self.labelnames + ('le',)
+        for key, state in items:
+            for bound, count in zip(self.buckets, state['buckets']):
+                samples.append(('_bucket', bucket_labels, key + (repr(float(bound)),), count))
+            samples.append(('_bucket', bucket_labels, key + ('+Inf',), state['count']))
+            samples.append(('_sum', self.labelnames, key, round(state['sum'], 6)))
+            samples.append(('_count', self.labelnames, key, state['count']))
+        return samples
+
+
+class GaugeFunction(Metric):
+    """Gauge read from `func` at scrape time; func returns {label values tuple: value}"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def samples(self):
+        try:
+            values = self.func()
+        except Exception:
+            return []
+        return [('', self.labelnames, key, value) for key, value in sorted(values.items())]
+
+
+REGISTRY = []
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+def serve_metrics(port, address=''):
+    """Serve /metrics from a background thread, for processes without a web server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+http_request_duration = Histogram(
+    'rmood_http_request_duration_seconds', 'Time to build a response, by URL name',
+    ['view', 'method', 'status'],
+)
+http_request_queries = Histogram(
+    'rmood_http_request_queries', 'SQL queries run while handling a request, by URL name',
+    ['view'], buckets=QUERY_BUCKETS,
+)
+http_request_db_duration = Histogram(
+    'rmood_http_request_db_seconds', 'Time spent in SQL while handling a request, by URL name',
+    ['view'],
+)
+fetch_stage_duration = Histogram(
+    'rmood_fetch_stage_duration_seconds', 'Time spent in each stage of a refresh cycle',
+    ['stage'],
+)
+fetch_outcomes = Counter(
+    'rmood_fetch_countries', 'Countries refreshed, by outcome',
+    ['status'],
+)
+openrouter_request_duration = Histogram(
+    'rmood_openrouter_request_duration_seconds', 'OpenRouter chat completion latency',
+    ['model', 'outcome'],
+)
+openrouter_tokens = Counter(
+    'rmood_openrouter_tokens', 'Tokens used by OpenRouter completions, as reported or estimated',
+    ['model'],
+)
+emotion_cache_lookups = Counter(
+    'rmood_emotion_cache_lookups', 'Emotion score cache lookups, by kind and result',
+    ['kind', 'result'],
+)
+
+
+# Gauges import lazily: the modules they read import this one
+
+
+def circuit_state():
+    from .emotion import openrouter_breaker
+    states = (openrouter_breaker.CLOSED, openrouter_breaker.HALF_OPEN, openrouter_breaker.OPEN)
+    return {(openrouter_breaker.name,): states.index(openrouter_breaker.state)}
+
+
+def client_pools():
+    from .clients import pool_stats
+    stats = pool_stats()
+    values = {}
+    if stats['reddit']:
+        for field in ('created', 'in_use', 'checkouts', 'waits', 'requests_sent', 'connections_opened'):
+            values[('reddit', field)] = stats['reddit'][field]
+    if stats['openrouter']:
+        values[('openrouter', 'requests_sent')] = stats['openrouter']['requests_sent']
+        values[('openrouter', 'connections_opened')] = sum(
+            host['connections_opened'] for host in stats['openrouter']['hosts'].values()
+        )
+    return values
+
+
+def pipeline_stages():
+    from .ingest import scoring_stats
+    stats = scoring_stats()
+    return {('scoring', field): value for field, value in stats.items()} if stats else {}
+
+
+def emotion_cache_ratio():
+    # Read from this process's lookup counter; scrapes run no queries
+    with emotion_cache_lookups.lock:
+        lookups = dict(emotion_cache_lookups.values)
+    totals = {}
+    for (kind, result), count in lookups.items():
+        hits, total = totals.get(kind, (0, 0))
+        totals[kind] = (hits + (count if result == 'hit' else 0), total + count)
+    return {(kind,): hits / total for kind, (hits, total) in totals.items() if total}
+
+
+GaugeFunction(
+    'rmood_circuit_state', 'Circuit breaker state: 0 closed, 1 half open, 2 open',
+    circuit_state, ['circuit'],
+)
+GaugeFunction(
+    'rmood_client_pool', 'Usage of the pooled Reddit and OpenRouter clients in this process',
+    client_pools, ['client', 'field'],
+)
+GaugeFunction(
+    'rmood_pipeline_stage', 'Queued, in-flight and handled items of the ingestion stages, and time producers waited on them',
+    pipeline_stages, ['stage', 'field'],
+)
+GaugeFunction(
+    'rmood_emotion_cache_hit_ratio', 'Share of emotion score cache lookups answered from the cache, since this process started',
+    emotion_cache_ratio, ['kind'],
+)
@@ -0,0 +1,88 @@
+import contextvars
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from . import metrics
+
+# Timer of the request being handled. Context variables follow async views
+# into the threads their ORM calls run in, which a per-connection
+# execute_wrapper block would not.
+_query_timer = contextvars.ContextVar('query_timer', default=None)
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and the time spent running them"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def time_query(execute, sql, params, many, context):
+    """execute_wrapper of every connection; times the query for the current request, if any"""
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # Connected to connection_created, which fires again on every reconnect
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class MetricsMiddleware:
+    """Record latency, SQL query count and SQL time of every request by URL name.
+
+    Works for sync and async views alike, so it doesn't push async views
+    onto a thread. Streaming responses are timed up to the first byte, not
+    the whole stream.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = QueryTimer()
+        token = _query_timer.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryTimer()
+        token = _query_timer.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def record(self, request, response, elapsed, queries):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        metrics.http_request_duration.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        metrics.http_request_queries.observe(queries.count, view=view)
+        metrics.http_request_db_duration.observe(queries.seconds, view=view)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0005_usercomment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_hits', models.IntegerField(default=0)),
+                ('listing_misses', models.IntegerField(default=0)),
+                ('title_hits', models.IntegerField(default=0)),
+                ('title_misses', models.IntegerField(default=0)),
+                ('tokens_saved', models.BigIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Score cache stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('listing', 'Listing'), ('title', 'Title')], max_length=10)),
+                ('score', models.FloatField()),
+                ('hits', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Score cache entries',
+                'indexes': [models.Index(fields=['kind', 'last_used_at'], name='moodapp_sco_kind_af99a0_idx'), models.Index(fields=['created_at'], name='moodapp_sco_created_88af01_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0006_scorecachestats_scorecacheentry'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='FetchQueue',
+        ),
+        migrations.DeleteModel(
+            name='FetchStatus',
+        ),
+    ]
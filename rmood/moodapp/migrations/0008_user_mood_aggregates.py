@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_user_mood_totals(apps, schema_editor):
+    # The rolling window is filled by the first vote or rebuild_mood_aggregates
+    Country = apps.get_model('moodapp', 'Country')
+    UserMood = apps.get_model('moodapp', 'UserMood')
+    totals = UserMood.objects.values('country_id').annotate(mood_sum=Sum('mood_score'), mood_count=Count('id')).order_by()
+    for row in totals:
+        Country.objects.filter(pk=row['country_id']).update(
+            user_mood_sum=row['mood_sum'], user_mood_count=row['mood_count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0007_remove_fetchqueue_fetchstatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='user_mood_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='user_mood_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='user_mood_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='UserMoodBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('mood_sum', models.IntegerField(default=0)),
+                ('mood_count', models.IntegerField(default=0)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_mood_buckets', to='moodapp.country')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='moodapp_use_hour_d42561_idx')],
+                'constraints': [models.UniqueConstraint(fields=('country', 'hour'), name='unique_user_mood_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_user_mood_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0008_user_mood_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmotionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('score_min', models.IntegerField()),
+                ('score_max', models.IntegerField()),
+                ('score_sum', models.IntegerField()),
+                ('ema', models.FloatField()),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emotion_rollups', to='moodapp.country')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='moodapp_emo_resolut_f40460_idx')],
+                'constraints': [models.UniqueConstraint(fields=('country', 'resolution', 'bucket_start'), name='unique_emotion_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmotionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emotion_score', models.IntegerField()),
+                ('post_count', models.IntegerField(default=0)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emotion_snapshots', to='moodapp.country')),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['country', 'recorded_at'], name='moodapp_emo_country_488450_idx'), models.Index(fields=['recorded_at'], name='moodapp_emo_recorde_455717_idx')],
+            },
+        ),
+    ]
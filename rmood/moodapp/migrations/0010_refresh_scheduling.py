@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0009_emotion_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='consecutive_failures',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='next_refresh_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='post_velocity',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='score_volatility',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0010_refresh_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subreddit', models.CharField(max_length=100)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('listing_seconds', models.FloatField(blank=True, null=True)),
+                ('scoring_seconds', models.FloatField(blank=True, null=True)),
+                ('persist_seconds', models.FloatField(blank=True, null=True)),
+                ('post_count', models.IntegerField(default=0)),
+                ('llm_tokens', models.IntegerField(default=0)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('error', 'Error')], max_length=10)),
+                ('error_class', models.CharField(blank=True, max_length=100)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_runs', to='moodapp.country')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['started_at'], name='moodapp_fet_started_507322_idx'), models.Index(fields=['subreddit', 'started_at'], name='moodapp_fet_subredd_f8e4f4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_jobs(apps, schema_editor):
+    Country = apps.get_model('moodapp', 'Country')
+    FetchJob = apps.get_model('moodapp', 'FetchJob')
+    FetchJob.objects.bulk_create([FetchJob(country_id=pk) for pk in Country.objects.values_list('pk', flat=True)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0011_fetch_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('leased', 'Leased'), ('dead', 'Dead')], default='queued', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('lease_owner', models.CharField(blank=True, max_length=200)),
+                ('lease_token', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('country', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_job', to='moodapp.country')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'lease_expires_at'], name='moodapp_fet_state_2bb795_idx')],
+            },
+        ),
+        migrations.RunPython(create_jobs, migrations.RunPython.noop),
+    ]
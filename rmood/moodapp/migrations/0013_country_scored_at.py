@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0012_fetch_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0013_country_scored_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='redditpost',
+            name='reddit_id',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='redditpost',
+            constraint=models.UniqueConstraint(fields=('country', 'reddit_id'), name='unique_country_post'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moodapp', '0014_reddit_post_per_country'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='fetchjob',
+            name='attempts',
+        ),
+    ]
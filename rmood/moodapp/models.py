@@ -7,6 +7,17 @@ class Country(models.Model):
     last_updated = models.DateTimeField(null=True, blank=True)
     post_count = models.IntegerField(default=0)
     emotion_score = models.IntegerField(default=5)
+    # When the scoring stage last wrote emotion_score; it runs after last_updated moved
+    scored_at = models.DateTimeField(null=True, blank=True)
+    # Running totals of user_moods, kept up to date by moodapp.moods
+    user_mood_sum = models.IntegerField(default=0)
+    user_mood_count = models.IntegerField(default=0)
+    user_mood_updated_at = models.DateTimeField(null=True, blank=True)
+    # Refresh scheduling, maintained by moodapp.scheduler
+    next_refresh_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    post_velocity = models.FloatField(default=0.0)  # new hot posts per hour
+    score_volatility = models.FloatField(default=0.0)  # average score change per refresh
+    consecutive_failures = models.IntegerField(default=0)
     
     class Meta:
         ordering = ['last_updated']
@@ -15,6 +26,12 @@ class Country(models.Model):
     def __str__(self):
         return f"{self.name} (r/{self.subreddit})"
 
+    @property
+    def user_mood_avg(self):
+        if not self.user_mood_count:
+            return None
+        return self.user_mood_sum / self.user_mood_count
+
 class RedditPost(models.Model):
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='posts')
     title = models.TextField()
@@ -23,7 +40,7 @@ class RedditPost(models.Model):
     num_comments = models.IntegerField(default=0)
     author = models.CharField(max_length=100)
     created_utc = models.DateTimeField()
-    reddit_id = models.CharField(max_length=50, unique=True)
+    reddit_id = models.CharField(max_length=50)
     fetched_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -31,25 +48,64 @@ class RedditPost(models.Model):
         indexes = [
             models.Index(fields=['country', '-created_utc']),
         ]
+        constraints = [
+            # Crossposts and subreddits shared by several countries appear in each listing
+            models.UniqueConstraint(fields=['country', 'reddit_id'], name='unique_country_post'),
+        ]
     
     def __str__(self):
         return f"{self.title[:50]} - {self.country.name}"
 
-class FetchQueue(models.Model):
-    last_fetch_time = models.DateTimeField(default=timezone.now)
-    is_fetching = models.BooleanField(default=False)
-    
+class EmotionSnapshot(models.Model):
+    """Append-only record of every stored emotion score"""
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='emotion_snapshots')
+    emotion_score = models.IntegerField()
+    post_count = models.IntegerField(default=0)
+    recorded_at = models.DateTimeField(default=timezone.now)
+
     class Meta:
-        verbose_name_plural = "Fetch Queue"
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['country', 'recorded_at']),
+            models.Index(fields=['recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.country.name} - {self.emotion_score}/10 at {self.recorded_at:%Y-%m-%d %H:%M}"
+
+class EmotionRollup(models.Model):
+    """Emotion scores of one country downsampled into an hour or a day"""
+    HOUR = 'hour'
+    DAY = 'day'
+    RESOLUTION_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='emotion_rollups')
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    sample_count = models.IntegerField(default=0)
+    score_min = models.IntegerField()
+    score_max = models.IntegerField()
+    score_sum = models.IntegerField()
+    ema = models.FloatField()  # EMA of all samples up to the end of the bucket
 
-class FetchStatus(models.Model):
-    current_country = models.CharField(max_length=100, blank=True)
-    current_subreddit = models.CharField(max_length=50, blank=True)
-    is_fetching = models.BooleanField(default=False)
-    last_updated = models.DateTimeField(auto_now=True)
-    
     class Meta:
-        verbose_name_plural = "Fetch statuses"
+        ordering = ['bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['country', 'resolution', 'bucket_start'], name='unique_emotion_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.country.name} {self.resolution} {self.bucket_start:%Y-%m-%d %H:00} - {self.score_mean:.1f}/10"
+
+    @property
+    def score_mean(self):
+        return self.score_sum / self.sample_count if self.sample_count else None
 
 class UserMood(models.Model):
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='user_moods')
@@ -67,6 +123,32 @@ class UserMood(models.Model):
     def __str__(self):
         return f"{self.country.name} - Mood: {self.mood_score}/10"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can move the country aggregates by the difference
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+class UserMoodBucket(models.Model):
+    """Sum and count of the user moods submitted in one hour, for rolling windows"""
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='user_mood_buckets')
+    hour = models.DateTimeField()
+    mood_sum = models.IntegerField(default=0)
+    mood_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['country', 'hour'], name='unique_user_mood_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.country.name} {self.hour:%Y-%m-%d %H:00} - {self.mood_count} moods"
+
 class UserComment(models.Model):
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='user_comments', null=True, blank=True)
     mood_score = models.IntegerField()  # 1-10
@@ -82,3 +164,107 @@ class UserComment(models.Model):
     
     def __str__(self):
         return f"{self.mood_score}/10 - {self.comment_text[:50]}"
+
+class ScoreCacheEntry(models.Model):
+    LISTING = 'listing'
+    TITLE = 'title'
+    KIND_CHOICES = [
+        (LISTING, 'Listing'),
+        (TITLE, 'Title'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)  # sha256 of the normalized text
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    score = models.FloatField()
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Score cache entries"
+        indexes = [
+            models.Index(fields=['kind', 'last_used_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key[:12]} - {self.score:.1f}/10"
+
+class ScoreCacheStats(models.Model):
+    listing_hits = models.IntegerField(default=0)
+    listing_misses = models.IntegerField(default=0)
+    title_hits = models.IntegerField(default=0)
+    title_misses = models.IntegerField(default=0)
+    tokens_saved = models.BigIntegerField(default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Score cache stats"
+
+class FetchRun(models.Model):
+    """Trace of one country refresh, written in batches by moodapp.fetch_runs"""
+    SUCCESS = 'success'
+    ERROR = 'error'
+    OUTCOME_CHOICES = [
+        (SUCCESS, 'Success'),
+        (ERROR, 'Error'),
+    ]
+
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='fetch_runs')
+    subreddit = models.CharField(max_length=100)  # as fetched, in case the country's changes later
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    # Seconds; scoring is one batch per cycle, so every country of a cycle shares it
+    listing_seconds = models.FloatField(null=True, blank=True)
+    scoring_seconds = models.FloatField(null=True, blank=True)
+    persist_seconds = models.FloatField(null=True, blank=True)
+    post_count = models.IntegerField(default=0)
+    llm_tokens = models.IntegerField(default=0)  # this listing's share of the cycle's OpenRouter tokens
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    error_class = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['started_at']),
+            models.Index(fields=['subreddit', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"r/{self.subreddit} {self.started_at:%Y-%m-%d %H:%M} - {self.outcome}"
+
+    @property
+    def duration(self):
+        return (self.finished_at - self.started_at).total_seconds()
+
+class FetchJob(models.Model):
+    """Refresh job of one country, claimed by ingest workers through moodapp.jobs.
+
+    When the job is due comes from Country.next_refresh_at; this row only
+    tracks who holds it and whether it gave up; failures in a row are
+    counted on the country.
+    """
+    QUEUED = 'queued'
+    LEASED = 'leased'
+    DEAD = 'dead'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (LEASED, 'Leased'),
+        (DEAD, 'Dead'),
+    ]
+
+    country = models.OneToOneField(Country, on_delete=models.CASCADE, related_name='fetch_job')
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED)
+    lease_owner = models.CharField(max_length=200, blank=True)
+    lease_token = models.CharField(max_length=32, blank=True, db_index=True)  # one per claim
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.country.name} - {self.state}"
@@ -0,0 +1,156 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from .models import Country, UserMood, UserMoodBucket
+
+
+def hour_of(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now=None):
+    """First hour bucket inside the USER_MOOD_WINDOW_HOURS rolling window"""
+    now = now or timezone.now()
+    return hour_of(now) - timedelta(hours=settings.USER_MOOD_WINDOW_HOURS - 1)
+
+
+def add_to_bucket(country_id, submitted_at, score_delta, count_delta):
+    if not settings.USER_MOOD_WINDOW_HOURS:
+        return
+
+    hour = hour_of(submitted_at)
+    if hour < window_start():
+        # Old buckets are pruned; votes that old no longer count anyway
+        return
+
+    buckets = UserMoodBucket.objects.filter(country_id=country_id, hour=hour)
+    if buckets.update(mood_sum=F('mood_sum') + score_delta, mood_count=F('mood_count') + count_delta):
+        return
+    if count_delta <= 0:
+        return
+
+    try:
+        with transaction.atomic():
+            UserMoodBucket.objects.create(
+                country_id=country_id, hour=hour, mood_sum=score_delta, mood_count=count_delta
+            )
+    except IntegrityError:
+        # Another request created the bucket first
+        buckets.update(mood_sum=F('mood_sum') + score_delta, mood_count=F('mood_count') + count_delta)
+
+
+def apply_mood_delta(country_id, submitted_at, score_delta, count_delta):
+    """Move a country's running totals and hourly bucket without reading them"""
+    with transaction.atomic():
+        Country.objects.filter(pk=country_id).update(
+            user_mood_sum=F('user_mood_sum') + score_delta,
+            user_mood_count=F('user_mood_count') + count_delta,
+            user_mood_updated_at=timezone.now(),
+        )
+        add_to_bucket(country_id, submitted_at, score_delta, count_delta)
+
+
+def mood_saved(instance, created):
+    """Apply a created or edited UserMood to the aggregates"""
+    previous = getattr(instance, '_loaded_values', {})
+    current = {
+        'country_id': instance.country_id,
+        'mood_score': instance.mood_score,
+        'submitted_at': instance.submitted_at,
+    }
+
+    if created:
+        apply_mood_delta(instance.country_id, instance.submitted_at, instance.mood_score, 1)
+    elif current.keys() - previous.keys():
+        # Loaded with deferred fields; only a rebuild can tell what changed
+        pass
+    elif any(previous[field] != value for field, value in current.items()):
+        apply_mood_delta(previous['country_id'], previous['submitted_at'], -previous['mood_score'], -1)
+        apply_mood_delta(instance.country_id, instance.submitted_at, instance.mood_score, 1)
+
+    instance._loaded_values = {**previous, **current}
+
+
+def mood_deleted(instance):
+    apply_mood_delta(instance.country_id, instance.submitted_at, -instance.mood_score, -1)
+
+
+def window_average(totals):
+    if not totals['mood_count']:
+        return None, 0
+    return totals['mood_sum'] / totals['mood_count'], totals['mood_count']
+
+
+def recent_mood(country):
+    """(average, count) of the votes in the rolling window, read from at most a day of buckets"""
+    if not settings.USER_MOOD_WINDOW_HOURS:
+        return None, 0
+
+    totals = country.user_mood_buckets.filter(hour__gte=window_start()).aggregate(
+        mood_sum=Sum('mood_sum'), mood_count=Sum('mood_count')
+    )
+    return window_average(totals)
+
+
+async def arecent_mood(country):
+    """recent_mood() for async views"""
+    if not settings.USER_MOOD_WINDOW_HOURS:
+        return None, 0
+
+    totals = await country.user_mood_buckets.filter(hour__gte=window_start()).aaggregate(
+        mood_sum=Sum('mood_sum'), mood_count=Sum('mood_count')
+    )
+    return window_average(totals)
+
+
+def rebuild_mood_aggregates():
+    """Recompute every country's totals and the rolling window from UserMood.
+
+    Returns the number of countries and buckets written.
+    """
+    now = timezone.now()
+    totals = {
+        row['country_id']: row
+        for row in UserMood.objects.values('country_id').annotate(
+            mood_sum=Sum('mood_score'), mood_count=Count('id')
+        ).order_by()
+    }
+
+    countries = list(Country.objects.only('id'))
+    for country in countries:
+        row = totals.get(country.id)
+        country.user_mood_sum = row['mood_sum'] if row else 0
+        country.user_mood_count = row['mood_count'] if row else 0
+        country.user_mood_updated_at = now
+
+    buckets = []
+    if settings.USER_MOOD_WINDOW_HOURS:
+        buckets = [
+            UserMoodBucket(country_id=row['country_id'], hour=row['hour'], mood_sum=row['mood_sum'], mood_count=row['mood_count'])
+            for row in UserMood.objects.filter(submitted_at__gte=window_start(now)).annotate(
+                hour=TruncHour('submitted_at')
+            ).values('country_id', 'hour').annotate(
+                mood_sum=Sum('mood_score'), mood_count=Count('id')
+            ).order_by()
+        ]
+
+    with transaction.atomic():
+        Country.objects.bulk_update(
+            countries, ['user_mood_sum', 'user_mood_count', 'user_mood_updated_at'], batch_size=500
+        )
+        UserMoodBucket.objects.all().delete()
+        UserMoodBucket.objects.bulk_create(buckets, batch_size=500)
+
+    return len(countries), len(buckets)
+
+
+def prune_buckets():
+    """Drop hourly buckets that fell out of the rolling window"""
+    if not settings.USER_MOOD_WINDOW_HOURS:
+        deleted, _ = UserMoodBucket.objects.all().delete()
+    else:
+        deleted, _ = UserMoodBucket.objects.filter(hour__lt=window_start()).delete()
+    return deleted
@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Put on the queue once per worker to end it
+STOP = object()
+
+
+class BatchStage:
+    """Worker threads that take items off a bounded queue and handle them in batches.
+
+    A worker waits up to `batch_wait` seconds to gather `batch_size` items,
+    then calls `handle(items)`. put() blocks while `queue_size` items are
+    waiting, which slows the producer down to the stage's pace instead of
+    letting work pile up in memory.
+    """
+
+    def __init__(self, name, handle, workers, batch_size, queue_size, batch_wait):
+        self.name = name
+        self.handle = handle
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.handled = 0
+        self.failed = 0
+        self.put_wait = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def put(self, item):
+        started = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.put_wait += waited
+
+    def next_batch(self):
+        """Block for one item, then gather more until the batch is full or batch_wait passed"""
+        first = self.queue.get()
+        if first is STOP:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is STOP:
+                # Hand the stop on to whichever worker is idle next
+                self.queue.put(STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def run(self):
+        try:
+            while True:
+                batch = self.next_batch()
+                if batch is None:
+                    return
+
+                with self.lock:
+                    self.in_flight += len(batch)
+                failed = 0
+                try:
+                    self.handle(batch)
+                except Exception:
+                    logger.exception("Stage batch failed", extra={'stage': self.name, 'items': len(batch)})
+                    failed = len(batch)
+                with self.lock:
+                    self.in_flight -= len(batch)
+                    self.handled += len(batch) - failed
+                    self.failed += failed
+        finally:
+            connection.close()
+
+    def stop(self):
+        """Handle what is queued, then end the workers"""
+        for _ in self.threads:
+            self.queue.put(STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': self.queue.qsize(),
+                'in_flight': self.in_flight,
+                'handled': self.handled,
+                'failed': self.failed,
+                'put_wait_seconds': round(self.put_wait, 3),
+            }
@@ -0,0 +1,145 @@
+import hashlib
+import math
+import random
+from django.conf import settings
+
+LISTING_PROMPT = (
+    "ONLY GIVE ME ONE NUMBER BETWEEN 1 AND 10 THAT REPRESENTS THE OVERALL EMOTION OF THE FOLLOWING TEXTS: {texts} "
+    "PLEASE STOP BEING NEUTRAL AND CHOOSING 5, CHOOSE OTHER NUMBERS TOO YOU CAN ALSO CHOOSE DECIMALS LIKE 6.5 OR 7.2 IF YOU WANT TO BE MORE PRECISE"
+)
+
+BATCH_PROMPT = (
+    "FOR EACH COUNTRY BELOW GIVE ONE NUMBER BETWEEN 1 AND 10 THAT REPRESENTS THE OVERALL EMOTION OF ITS TEXTS. "
+    "PLEASE STOP BEING NEUTRAL AND CHOOSING 5, CHOOSE OTHER NUMBERS TOO YOU CAN ALSO CHOOSE DECIMALS LIKE 6.5 OR 7.2 IF YOU WANT TO BE MORE PRECISE. "
+    "ANSWER ONLY WITH A JSON OBJECT MAPPING EACH COUNTRY NAME EXACTLY AS WRITTEN TO ITS NUMBER, FOR EXAMPLE {\"France\": 6.5, \"Japan\": 4}."
+)
+
+TITLES_PROMPT = (
+    "FOR EACH OF THE {count} NUMBERED TEXTS BELOW GIVE ONE NUMBER BETWEEN 1 AND 10 THAT REPRESENTS ITS EMOTION. "
+    "PLEASE STOP BEING NEUTRAL AND CHOOSING 5, CHOOSE OTHER NUMBERS TOO. "
+    "ANSWER ONLY WITH A JSON ARRAY OF {count} NUMBERS IN THE SAME ORDER.\n\n{texts}"
+)
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def normalize_title(title):
+    """Key under which titles count as the same: whitespace and case ignored"""
+    return " ".join(title.split()).casefold()
+
+
+def clean_title(title, max_tokens=None):
+    """Collapse whitespace and cut overlong titles at a word boundary"""
+    max_tokens = max_tokens or settings.EMOTION_MAX_TITLE_TOKENS
+    title = " ".join(title.split())
+    max_chars = max_tokens * 4
+    if len(title) <= max_chars:
+        return title
+    cut = title[:max_chars].rsplit(" ", 1)[0]
+    return (cut or title[:max_chars]) + "..."
+
+
+def post_weight(post):
+    """How much a post should count: more for upvoted and discussed ones"""
+    return 1.0 + math.log1p(max(post.get('score') or 0, 0)) + math.log1p(max(post.get('num_comments') or 0, 0))
+
+
+def select_titles(posts, budget=None):
+    """Titles of a listing to score, within `budget` tokens.
+
+    `posts` are dicts with a title and optionally score and num_comments.
+    Titles are cleaned and de-duplicated. When they don't all fit they are
+    sampled without replacement, a post's chance growing with its weight
+    (Efraimidis-Spirakis keys). Each title's key is seeded by the listing and
+    the title, so an unchanged listing gives the same titles, in whatever
+    order it comes, and hits the score cache. Titles keep their listing order.
+    """
+    budget = budget or settings.EMOTION_LISTING_TOKEN_BUDGET
+    seen = set()
+    candidates = []
+    for post in posts:
+        title = clean_title(post['title'])
+        key = normalize_title(title)
+        if key and key not in seen:
+            seen.add(key)
+            candidates.append((title, key, post_weight(post)))
+
+    costs = [estimate_tokens(title) for title, key, weight in candidates]
+    if sum(costs) <= budget:
+        return [title for title, key, weight in candidates]
+
+    seed = hashlib.sha256("\n".join(sorted(seen)).encode('utf-8')).hexdigest()
+    keys = [random.Random(f'{seed}:{key}').random() ** (1 / weight) for title, key, weight in candidates]
+    chosen = []
+    used = 0
+    for i in sorted(range(len(candidates)), key=keys.__getitem__, reverse=True):
+        if used + costs[i] <= budget:
+            chosen.append(i)
+            used += costs[i]
+    return [candidates[i][0] for i in sorted(chosen)]
+
+
+def chunk_titles(titles, budget=None):
+    """Split titles into consecutive chunks of at most `budget` tokens each"""
+    budget = budget or settings.EMOTION_CHUNK_TOKEN_BUDGET
+    chunks = []
+    current = []
+    used = 0
+    for title in titles:
+        cost = estimate_tokens(title)
+        if current and used + cost > budget:
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(title)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def listing_tokens(titles):
+    return estimate_tokens(" ".join(titles))
+
+
+def build_listing_prompt(titles):
+    return LISTING_PROMPT.format(texts=" ".join(titles))
+
+
+def build_titles_prompt(titles):
+    numbered = "\n".join(f"{i + 1}. {title}" for i, title in enumerate(titles))
+    return TITLES_PROMPT.format(count=len(titles), texts=numbered)
+
+
+def batch_section(country, titles):
+    return f"COUNTRY: {country}\nTEXTS: {' '.join(titles)}"
+
+
+def build_batch_prompt(title_sets):
+    sections = [BATCH_PROMPT]
+    for country, titles in title_sets.items():
+        sections.append(batch_section(country, titles))
+    return "\n\n".join(sections)
+
+
+def pack_batches(title_sets, token_budget):
+    """Group countries into as few prompts as fit within the token budget"""
+    batches = []
+    current = {}
+    used = estimate_tokens(BATCH_PROMPT)
+
+    for country, titles in title_sets.items():
+        cost = estimate_tokens(batch_section(country, titles))
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current = {}
+            used = estimate_tokens(BATCH_PROMPT)
+        current[country] = titles
+        used += cost
+
+    if current:
+        batches.append(current)
+    return batches
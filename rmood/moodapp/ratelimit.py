@@ -0,0 +1,206 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available, otherwise return the seconds to wait for them"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; False if that takes longer than timeout"""
+        if tokens > self.capacity:
+            # The bucket never holds that many, so this would wait forever
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity:g}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class SlidingWindowLimiter:
+    """Allows `limit` hits per `window` seconds for each key, kept in process memory.
+
+    Every key keeps the times of its last `limit` hits, so the check is exact.
+    At most `max_keys` keys are remembered; the least recently seen ones are
+    dropped first, which can only make the limiter more lenient for clients
+    that have been quiet the longest.
+    """
+
+    def __init__(self, limit, window, max_keys=10000):
+        self.limit = limit
+        self.window = float(window)
+        self.max_keys = max_keys
+        self.hits = OrderedDict()
+        self.lock = threading.Lock()
+
+    def hit(self, key):
+        """Record a hit for key; 0.0 if it is allowed, otherwise the seconds until it would be"""
+        now = time.monotonic()
+        with self.lock:
+            recent = self.hits.pop(key, None) or deque(maxlen=self.limit)
+            while recent and recent[0] <= now - self.window:
+                recent.popleft()
+
+            if len(recent) >= self.limit:
+                wait = recent[0] + self.window - now
+            else:
+                recent.append(now)
+                wait = 0.0
+
+            self.hits[key] = recent
+            while len(self.hits) > self.max_keys:
+                self.hits.popitem(last=False)
+            return wait
+
+    def refund(self, key):
+        """Take back the last allowed hit of key"""
+        with self.lock:
+            recent = self.hits.get(key)
+            if recent:
+                recent.pop()
+
+
+class CacheRateLimiter:
+    """Sliding-window limit shared by every worker through a Django cache.
+
+    Counts hits in fixed windows and weighs the previous window by how much of
+    it still overlaps the sliding one, which needs two counters per key and
+    no locking beyond the cache's own add/incr.
+    """
+
+    def __init__(self, limit, window, alias='default', prefix='ratelimit'):
+        self.limit = limit
+        self.window = float(window)
+        self.alias = alias
+        self.prefix = prefix
+
+    def hit(self, key):
+        cache = caches[self.alias]
+        now = time.time()
+        current = int(now // self.window)
+        elapsed = now - current * self.window
+        current_key = f"{self.prefix}:{key}:{current}"
+        previous_key = f"{self.prefix}:{key}:{current - 1}"
+
+        counts = cache.get_many([current_key, previous_key])
+        previous_weight = 1.0 - elapsed / self.window
+        previous_count = counts.get(previous_key, 0)
+        estimate = counts.get(current_key, 0) + previous_count * previous_weight
+        if estimate + 1 > self.limit:
+            if counts.get(current_key, 0) >= self.limit or not previous_count:
+                return self.window - elapsed
+            # Wait until enough of the previous window has slid out
+            needed = (estimate + 1 - self.limit) / previous_count
+            return max(min(needed * self.window, self.window - elapsed), 0.001)
+
+        # Counters live for two windows so the next one can still weigh this one
+        if not cache.add(current_key, 1, timeout=int(self.window * 2) + 1):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                cache.set(current_key, 1, timeout=int(self.window * 2) + 1)
+        return 0.0
+
+    def refund(self, key):
+        """Take back the last allowed hit of key.
+
+        Counts down the current window, so a refund right after a window
+        boundary only approximately undoes the hit.
+        """
+        cache = caches[self.alias]
+        current = int(time.time() // self.window)
+        try:
+            cache.decr(f"{self.prefix}:{key}:{current}")
+        except ValueError:
+            pass
+
+
+def client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Limiter for a RATE_LIMITS entry, built on first use"""
+    with _limiters_lock:
+        if name not in _limiters:
+            config = settings.RATE_LIMITS[name]
+            if settings.RATE_LIMIT_BACKEND == 'cache':
+                _limiters[name] = CacheRateLimiter(
+                    config['limit'], config['window'], alias=settings.RATE_LIMIT_CACHE, prefix=f'ratelimit:{name}'
+                )
+            elif settings.RATE_LIMIT_BACKEND == 'local':
+                _limiters[name] = SlidingWindowLimiter(
+                    config['limit'], config['window'], max_keys=settings.RATE_LIMIT_MAX_KEYS
+                )
+            else:
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}', expected 'local' or 'cache'")
+        return _limiters[name]
+
+
+def rate_limit(name, action='submitting'):
+    """Reject requests over the RATE_LIMITS[name] per-IP limit with a 429 before the view runs.
+
+    Only accepted requests count: a request the view rejects with a 4xx
+    (e.g. a validation error) is refunded, so a client fixing a typo isn't
+    locked out for the rest of the window.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            limiter = get_limiter(name)
+            ip = client_ip(request)
+            wait = limiter.hit(ip)
+            if wait > 0:
+                response = JsonResponse({
+                    'status': 'rate_limited',
+                    'error': f'Please wait {wait:.1f} more seconds before {action} again',
+                    'wait_time': wait,
+                }, status=429)
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if 400 <= response.status_code < 500:
+                limiter.refund(ip)
+            return response
+
+        return wrapper
+
+    return decorator
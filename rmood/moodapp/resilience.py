@@ -0,0 +1,154 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Runs hedged calls for the whole process; calls abandoned at their deadline
+# keep a worker until their own timeout ends them
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='hedged-call')
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls, for picking hedge thresholds"""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, percent):
+        """The given percentile in seconds, or None until enough calls were seen"""
+        with self.lock:
+            samples = sorted(self.samples)
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    fail fast with CircuitOpenError. Once `reset_timeout` seconds have passed a
+    single trial call is let through: success closes the circuit, failure
+    opens it again for another `reset_timeout`. Only exceptions of
+    `failure_types` count as failures; any other exception means the
+    dependency answered and is passed on as a success.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_timeout, failure_types=(Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_types = failure_types
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            # Open, or half-open with the trial call still running
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed again", extra={'circuit': self.name})
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(
+                    "Circuit opened",
+                    extra={'circuit': self.name, 'failures': self.failures, 'reset_timeout': self.reset_timeout},
+                )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit {self.name} is open, not calling it")
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_types:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+def hedged_call(primary, deadline, hedge=None, hedge_after=None):
+    """Return the first successful result of `primary` or `hedge` within `deadline` seconds.
+
+    `hedge` is started when `primary` has not answered after `hedge_after`
+    seconds, or as soon as it fails. Calls still running at the deadline are
+    abandoned to finish (and time out) in the background. Both calls see
+    the caller's context variables. Raises DeadlineExceeded, or the last
+    error when every call failed in time.
+    """
+    started = time.monotonic()
+    pending = {_executor.submit(contextvars.copy_context().run, primary)}
+    try:
+        hedged = hedge is None
+        error = None
+
+        while pending or not hedged:
+            elapsed = time.monotonic() - started
+            if elapsed >= deadline:
+                break
+
+            if not hedged and (error is not None or elapsed >= hedge_after):
+                pending.add(_executor.submit(contextvars.copy_context().run, hedge))
+                hedged = True
+                continue
+
+            timeout = deadline - elapsed
+            if not hedged:
+                timeout = min(timeout, hedge_after - elapsed)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(f"No reply within {deadline:.1f}s")
+    finally:
+        # Calls still queued behind busy workers are not started at all
+        for future in pending:
+            future.cancel()
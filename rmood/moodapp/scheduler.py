@@ -0,0 +1,77 @@
+from datetime import timedelta
+from django.conf import settings
+from prawcore.exceptions import Forbidden, NotFound, Redirect, UnavailableForLegalReasons
+
+# Reddit answers these for subreddits that don't exist, are private or banned;
+# retrying them soon only burns quota
+DEAD_SUBREDDIT_ERRORS = (Forbidden, NotFound, Redirect, UnavailableForLegalReasons)
+
+# Weight of the newest observation in the velocity and volatility averages
+ACTIVITY_ALPHA = 0.3
+
+
+def is_dead_subreddit(error):
+    return isinstance(error, DEAD_SUBREDDIT_ERRORS)
+
+
+def refresh_interval(country):
+    """Seconds until the next refresh of a healthy country.
+
+    Busy subreddits (many new posts per hour) and ones whose mood swings a lot
+    are refreshed up to every SCHEDULER_MIN_INTERVAL seconds; quiet and stable
+    ones drift towards SCHEDULER_MAX_INTERVAL.
+    """
+    activity = (
+        1.0
+        + country.post_velocity / settings.SCHEDULER_VELOCITY_SCALE
+        + country.score_volatility / settings.SCHEDULER_VOLATILITY_SCALE
+    )
+    return max(settings.SCHEDULER_MIN_INTERVAL, settings.SCHEDULER_MAX_INTERVAL / activity)
+
+
+def failure_backoff(country, dead):
+    """Seconds to wait after the country's consecutive_failures-th failure in a row"""
+    base = settings.SCHEDULER_DEAD_BACKOFF if dead else settings.SCHEDULER_MIN_INTERVAL
+    return min(base * 2 ** (country.consecutive_failures - 1), settings.SCHEDULER_MAX_BACKOFF)
+
+
+def can_measure_activity(country):
+    """Whether the previous refresh succeeded, so the next one can be compared with it"""
+    return country.last_updated is not None and country.consecutive_failures == 0
+
+
+def schedule_success(country, new_posts, previous_updated, now):
+    """Fold a stored listing into the country's post velocity and set next_refresh_at.
+
+    Call can_measure_activity() before updating the country to know whether
+    its score change should later go to fold_score_change().
+    """
+    if previous_updated is not None and country.consecutive_failures == 0:
+        hours = max((now - previous_updated).total_seconds() / 3600, 1 / 60)
+        country.post_velocity += ACTIVITY_ALPHA * (new_posts / hours - country.post_velocity)
+
+    if previous_updated is None:
+        # Nothing to measure activity against yet; come back soon to learn it
+        interval = settings.SCHEDULER_MIN_INTERVAL
+    else:
+        interval = refresh_interval(country)
+
+    country.consecutive_failures = 0
+    country.next_refresh_at = now + timedelta(seconds=interval)
+
+
+def fold_score_change(country, previous_score):
+    """Fold the change from `previous_score` to the country's new emotion_score into its volatility.
+
+    Scores arrive after the listing was stored, so this only affects the
+    interval picked at the next refresh.
+    """
+    country.score_volatility += ACTIVITY_ALPHA * (
+        abs(country.emotion_score - previous_score) - country.score_volatility
+    )
+
+
+def schedule_failure(country, error, now):
+    """Back off exponentially, much faster for subreddits that don't exist or are private"""
+    country.consecutive_failures += 1
+    country.next_refresh_at = now + timedelta(seconds=failure_backoff(country, is_dead_subreddit(error)))
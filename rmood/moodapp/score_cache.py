@@ -0,0 +1,185 @@
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from . import metrics
+from .emotion import NEUTRAL_SCORE, check_emotions_batch, score_titles
+from .prompts import estimate_tokens, normalize_title
+from .models import ScoreCacheEntry, ScoreCacheStats
+
+# Keep IN (...) lookups well below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def title_key(title):
+    return hashlib.sha256(f"title:{normalize_title(title)}".encode('utf-8')).hexdigest()
+
+
+def listing_key(titles):
+    """Stable hash of a listing that ignores order, case, whitespace and duplicates"""
+    normalized = sorted({normalize_title(title) for title in titles})
+    return hashlib.sha256(("listing:" + "\n".join(normalized)).encode('utf-8')).hexdigest()
+
+
+def lookup(kind, keys):
+    """Return fresh cached scores for the given keys and mark them as used"""
+    keys = list(set(keys))
+    fresh_since = timezone.now() - timedelta(seconds=settings.EMOTION_CACHE_TTL)
+    found = {}
+
+    for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+        entries = dict(ScoreCacheEntry.objects.filter(
+            kind=kind, key__in=chunk, created_at__gte=fresh_since
+        ).values_list('key', 'score'))
+        if entries:
+            ScoreCacheEntry.objects.filter(key__in=list(entries)).update(
+                hits=F('hits') + 1, last_used_at=timezone.now()
+            )
+        found.update(entries)
+
+    metrics.emotion_cache_lookups.inc(len(found), kind=kind, result='hit')
+    metrics.emotion_cache_lookups.inc(len(keys) - len(found), kind=kind, result='miss')
+    return found
+
+
+def store(kind, scores):
+    if not scores:
+        return
+    now = timezone.now()
+    ScoreCacheEntry.objects.bulk_create(
+        [ScoreCacheEntry(key=key, kind=kind, score=score, created_at=now, last_used_at=now)
+         for key, score in scores.items()],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['score', 'created_at', 'last_used_at'],
+        batch_size=LOOKUP_CHUNK_SIZE,
+    )
+
+
+def evict():
+    """Drop expired entries, then the least recently used beyond the size bound; returns how many"""
+    removed, _ = ScoreCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.EMOTION_CACHE_TTL)
+    ).delete()
+
+    limit = settings.EMOTION_CACHE_MAX_ENTRIES
+    for kind, label in ScoreCacheEntry.KIND_CHOICES:
+        cutoff = list(ScoreCacheEntry.objects.filter(kind=kind).order_by(
+            '-last_used_at'
+        ).values_list('last_used_at', flat=True)[limit:limit + 1])
+        if cutoff:
+            deleted, _ = ScoreCacheEntry.objects.filter(kind=kind, last_used_at__lte=cutoff[0]).delete()
+            removed += deleted
+    return removed
+
+
+def record_stats(**deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    ScoreCacheStats.objects.get_or_create(pk=1)
+    ScoreCacheStats.objects.filter(pk=1).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def cache_stats():
+    stats, created = ScoreCacheStats.objects.get_or_create(pk=1)
+    listing_lookups = stats.listing_hits + stats.listing_misses
+    title_lookups = stats.title_hits + stats.title_misses
+    return {
+        'listing_hits': stats.listing_hits,
+        'listing_misses': stats.listing_misses,
+        'listing_hit_ratio': stats.listing_hits / listing_lookups if listing_lookups else 0.0,
+        'title_hits': stats.title_hits,
+        'title_misses': stats.title_misses,
+        'title_hit_ratio': stats.title_hits / title_lookups if title_lookups else 0.0,
+        'tokens_saved': stats.tokens_saved,
+        'dollars_saved': stats.tokens_saved * settings.OPENROUTER_PRICE_PER_MILLION_TOKENS / 1_000_000,
+        'entries': ScoreCacheEntry.objects.count(),
+    }
+
+
+def score_listings(title_sets, default=NEUTRAL_SCORE):
+    """Score listings like check_emotions_batch, reusing cached work.
+
+    An unchanged listing is answered from the listing cache. A listing whose
+    titles are mostly cached (EMOTION_TITLE_CACHE_MIN_COVERAGE) is re-scored
+    from the cached per-title values plus one completion for its new titles.
+    Everything else goes through check_emotions_batch and is cached under its
+    listing key only: the title cache holds nothing but scores of titles
+    scored one by one. Listings that cannot be scored get `default`.
+    Expired entries are evicted by run_ingest, not here.
+    """
+    results = {}
+    listing_keys = {country: listing_key(titles) for country, titles in title_sets.items() if titles}
+    cached_listings = lookup(ScoreCacheEntry.LISTING, listing_keys.values())
+
+    pending = {}
+    tokens_saved = 0
+    for country, titles in title_sets.items():
+        key = listing_keys.get(country)
+        if key is None:
+            results[country] = default
+        elif key in cached_listings:
+            results[country] = round(cached_listings[key])
+            tokens_saved += estimate_tokens(" ".join(titles))
+        else:
+            pending[country] = titles
+
+    title_keys = {country: [title_key(title) for title in titles] for country, titles in pending.items()}
+    cached_titles = lookup(ScoreCacheEntry.TITLE, [key for keys in title_keys.values() for key in keys])
+
+    incremental = {}
+    full = {}
+    for country, titles in pending.items():
+        keys = title_keys[country]
+        coverage = sum(key in cached_titles for key in keys) / len(keys)
+        if coverage >= settings.EMOTION_TITLE_CACHE_MIN_COVERAGE:
+            incremental[country] = titles
+        else:
+            full[country] = titles
+
+    new_titles = {}
+    for country, titles in incremental.items():
+        for title, key in zip(titles, title_keys[country]):
+            if key not in cached_titles:
+                new_titles.setdefault(key, title)
+
+    new_scores = score_titles(list(new_titles.values())) if new_titles else []
+    if new_scores is None:
+        full.update(incremental)
+        incremental = {}
+    else:
+        fresh = dict(zip(new_titles, new_scores))
+        store(ScoreCacheEntry.TITLE, fresh)
+        for country, titles in incremental.items():
+            values = [cached_titles.get(key, fresh.get(key)) for key in title_keys[country]]
+            results[country] = round(sum(values) / len(values))
+            tokens_saved += estimate_tokens(" ".join(
+                title for title, key in zip(titles, title_keys[country]) if key not in fresh
+            ))
+
+    full_scores = check_emotions_batch(full, default=None) if full else {}
+    for country, score in full_scores.items():
+        results[country] = default if score is None else score
+
+    store(ScoreCacheEntry.LISTING, {
+        listing_keys[country]: results[country]
+        for country in pending
+        if country in incremental or full_scores.get(country) is not None
+    })
+
+    title_lookups = sum(len(keys) for keys in title_keys.values())
+    title_hits = sum(key in cached_titles for keys in title_keys.values() for key in keys)
+    record_stats(
+        listing_hits=len(listing_keys) - len(pending),
+        listing_misses=len(pending),
+        title_hits=title_hits,
+        title_misses=title_lookups - title_hits,
+        tokens_saved=tokens_saved,
+    )
+
+    return results
@@ -0,0 +1,112 @@
+import logging
+from abc import ABC, abstractmethod
+from django.conf import settings
+from .emotion import NEUTRAL_SCORE
+
+logger = logging.getLogger(__name__)
+
+
+class Scorer(ABC):
+    """Turns title sets into 1-10 emotion scores"""
+    name = None
+
+    @abstractmethod
+    def score_many(self, title_sets, default=NEUTRAL_SCORE):
+        """Dict of country name to score for a dict of country name to titles, `default` for sets it cannot score"""
+
+
+class OpenRouterScorer(Scorer):
+    name = 'openrouter'
+
+    def score_many(self, title_sets, default=NEUTRAL_SCORE):
+        from .score_cache import score_listings
+
+        return score_listings(title_sets, default=default)
+
+
+class LexiconScorer(Scorer):
+    name = 'lexicon'
+
+    def __init__(self):
+        # numpy is only needed when the lexicon engine is actually used
+        from .lexicon import LexiconEngine
+
+        self.engine = LexiconEngine()
+
+    def raw_scores(self, title_sets):
+        """Unrounded scores, or None for sets without any sentiment-bearing word"""
+        return self.engine.score(title_sets)
+
+    def score_many(self, title_sets, default=NEUTRAL_SCORE):
+        return {
+            country: default if score is None else round(score)
+            for country, score in self.raw_scores(title_sets).items()
+        }
+
+
+SCORERS = {
+    OpenRouterScorer.name: OpenRouterScorer,
+    LexiconScorer.name: LexiconScorer,
+}
+
+_instances = {}
+
+
+def get_scorer(name):
+    if name not in SCORERS:
+        raise ValueError(f"Unknown emotion scorer '{name}', expected one of {sorted(SCORERS)}")
+    if name not in _instances:
+        _instances[name] = SCORERS[name]()
+    return _instances[name]
+
+
+def unchanged_by_lexicon(title_sets, previous_title_sets, threshold):
+    """Countries whose lexicon mood moved less than `threshold` since their previous listing"""
+    lexicon = get_scorer(LexiconScorer.name)
+    keys = [country for country in title_sets if previous_title_sets.get(country)]
+    combined = {}
+    for country in keys:
+        combined[('new', country)] = title_sets[country]
+        combined[('old', country)] = previous_title_sets[country]
+
+    # Old and new listings of every country go through one vectorized pass
+    scores = lexicon.raw_scores(combined)
+    return {
+        country for country in keys
+        if scores[('new', country)] is not None
+        and scores[('old', country)] is not None
+        and abs(scores[('new', country)] - scores[('old', country)]) < threshold
+    }
+
+
+def score_countries(title_sets, previous=None):
+    """Score title sets with the configured scorer, pre-filter and fallback.
+
+    `previous` optionally maps country name to a (titles, score) pair for the
+    listing currently stored. When EMOTION_PREFILTER_DELTA is set, countries
+    whose lexicon mood barely moved keep their previous score without calling
+    the primary scorer. Sets the primary scorer cannot handle are retried with
+    EMOTION_FALLBACK_SCORER. Countries no scorer could score map to None, so
+    callers keep their previous score instead of storing a made-up neutral one.
+    """
+    scores = {}
+    remaining = dict(title_sets)
+
+    if previous and settings.EMOTION_PREFILTER_DELTA:
+        previous_titles = {country: titles for country, (titles, score) in previous.items()}
+        for country in unchanged_by_lexicon(remaining, previous_titles, settings.EMOTION_PREFILTER_DELTA):
+            scores[country] = previous[country][1]
+            del remaining[country]
+        if scores:
+            logger.info("Lexicon pre-filter kept previous scores", extra={'countries': len(scores)})
+
+    primary = get_scorer(settings.EMOTION_SCORER)
+    scores.update(primary.score_many(remaining, default=None))
+
+    failed = {country: titles for country, titles in remaining.items() if scores[country] is None}
+    fallback_name = settings.EMOTION_FALLBACK_SCORER
+    if failed and fallback_name and fallback_name != primary.name:
+        logger.warning("Scoring with the fallback scorer", extra={'countries': len(failed), 'scorer': fallback_name})
+        scores.update(get_scorer(fallback_name).score_many(failed, default=None))
+
+    return scores
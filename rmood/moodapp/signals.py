@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .jobs import ensure_job
+from .middleware import install_query_timer
+from .models import Country, UserMood
+from .moods import mood_deleted, mood_saved
+
+# Lets MetricsMiddleware count the queries of each request
+connection_created.connect(install_query_timer)
+
+
+@receiver(post_save, sender=UserMood)
+def update_mood_aggregates(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        mood_saved(instance, created)
+
+
+@receiver(post_delete, sender=UserMood)
+def remove_from_mood_aggregates(sender, instance, **kwargs):
+    mood_deleted(instance)
+
+
+@contextmanager
+def mood_aggregates_paused():
+    """Skip the per-vote aggregate updates, e.g. around bulk deletes.
+
+    Call rebuild_mood_aggregates() afterwards to bring the totals back in line.
+    """
+    post_save.disconnect(update_mood_aggregates, sender=UserMood)
+    post_delete.disconnect(remove_from_mood_aggregates, sender=UserMood)
+    try:
+        yield
+    finally:
+        post_save.connect(update_mood_aggregates, sender=UserMood)
+        post_delete.connect(remove_from_mood_aggregates, sender=UserMood)
+
+
+@receiver(post_save, sender=Country)
+def create_fetch_job(sender, instance, created, raw=False, **kwargs):
+    # Countries created outside sync_countries (e.g. by a mood vote) need a job too
+    if created and not raw:
+        ensure_job(instance)
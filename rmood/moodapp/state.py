@@ -0,0 +1,51 @@
+import os
+import socket
+from django.conf import settings
+from django.core.cache import caches
+
+IDLE_STATUS = {'next_country': 'Waiting...', 'next_subreddit': '', 'is_fetching': False}
+
+
+class FetchStateStore:
+    """Live ingestion state kept in a Django cache instead of the database.
+
+    Holds what ingestion is doing right now (current country and whether it
+    is fetching). Nothing here is durable: losing it only means the globe
+    shows 'Waiting...' until the next step. The cache alias comes from
+    FETCH_STATE_CACHE; it must be shared (file, memcached, redis, ...) when the
+    daemon and the web server run in different processes.
+    """
+
+    STATUS_KEY = 'fetch_state:status'
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.FETCH_STATE_CACHE]
+
+    def set_status(self, country=None, is_fetching=False):
+        status = dict(self.get_status())
+        if country is not None:
+            status['next_country'] = country.name
+            status['next_subreddit'] = country.subreddit
+        status['is_fetching'] = is_fetching
+        self.cache.set(self.STATUS_KEY, status, timeout=None)
+
+    def get_status(self):
+        return self.cache.get(self.STATUS_KEY) or IDLE_STATUS
+
+    async def aget_status(self):
+        return await self.cache.aget(self.STATUS_KEY) or IDLE_STATUS
+
+    def reset(self, status=None):
+        self.cache.set(self.STATUS_KEY, status or IDLE_STATUS, timeout=None)
+
+
+def lease_owner_id():
+    """Names this process as the holder of job leases"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+fetch_state = FetchStateStore()
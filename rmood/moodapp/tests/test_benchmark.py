@@ -0,0 +1,86 @@
+import json
+import requests
+from django.test import SimpleTestCase
+from moodapp import benchmark
+from moodapp.prompts import build_batch_prompt, build_listing_prompt, build_titles_prompt
+
+
+class StableScoreTests(SimpleTestCase):
+    def test_same_text_same_score(self):
+        self.assertEqual(benchmark.stable_score('Paris'), benchmark.stable_score('Paris'))
+
+    def test_scores_stay_in_range(self):
+        scores = {benchmark.stable_score(f'title {i}') for i in range(200)}
+        self.assertEqual(scores, set(range(1, 11)))
+
+
+class FakeServerTests(SimpleTestCase):
+    def test_respond_must_be_overridden(self):
+        class Incomplete(benchmark.FakeServer):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def chat(self, server, prompt):
+        response = requests.post(
+            f'{server.url}/api/v1/chat/completions',
+            json={'messages': [{'role': 'user', 'content': prompt}]},
+            timeout=5,
+        )
+        return response.status_code, response.json()
+
+    def test_openrouter_answers_in_the_format_asked(self):
+        with benchmark.FakeOpenRouter() as server:
+            status, reply = self.chat(server, build_batch_prompt({'France': ['a'], 'Japan': ['b']}))
+            self.assertEqual(status, 200)
+            scores = json.loads(reply['choices'][0]['message']['content'])
+            self.assertEqual(scores, {'France': benchmark.stable_score('France'), 'Japan': benchmark.stable_score('Japan')})
+
+            status, reply = self.chat(server, build_titles_prompt(['one', 'two', 'three']))
+            self.assertEqual(json.loads(reply['choices'][0]['message']['content']), [
+                benchmark.stable_score(title) for title in ['one', 'two', 'three']
+            ])
+
+            status, reply = self.chat(server, build_listing_prompt(['one', 'two']))
+            self.assertIn(int(reply['choices'][0]['message']['content']), range(1, 11))
+
+        self.assertEqual(server.stats(), {'requests': 3, 'errors': 0})
+
+    def test_injected_errors(self):
+        with benchmark.FakeOpenRouter(error_rate=1.0) as server:
+            status, reply = self.chat(server, 'anything')
+        self.assertEqual(status, 503)
+        self.assertEqual(server.stats(), {'requests': 1, 'errors': 1})
+
+    def test_reddit_listing(self):
+        with benchmark.FakeReddit(posts_per_listing=3) as server:
+            listing = requests.get(f'{server.url}/r/france/hot?limit=3', timeout=5).json()
+            missing = requests.get(f'{server.url}/somewhere/else', timeout=5)
+
+        children = listing['data']['children']
+        self.assertEqual(len(children), 3)
+        self.assertTrue(all(child['data']['permalink'].startswith('/r/france/') for child in children))
+        self.assertEqual(missing.status_code, 404)
+
+
+class SummaryTests(SimpleTestCase):
+    def test_latency_summary(self):
+        samples = [(i / 1000, 200) for i in range(1, 99)] + [(0.5, 503), (1.0, 0)]
+
+        summary = benchmark.latency_summary(samples, elapsed=2.0)
+
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['errors'], 2)
+        self.assertEqual(summary['statuses'], {'200': 98, '503': 1, '0': 1})
+        self.assertEqual(summary['rps'], 50.0)
+        self.assertEqual(summary['p50_ms'], 51.0)
+        self.assertEqual(summary['p99_ms'], 1000.0)
+
+    def test_summarize_adds_query_counts(self):
+        summary = benchmark.summarize([(0.01, 200, 2), (0.02, 200, 4)], elapsed=1.0)
+        self.assertEqual((summary['mean_queries'], summary['max_queries']), (3, 4))
+
+    def test_empty_run(self):
+        summary = benchmark.summarize([], elapsed=0)
+        self.assertEqual((summary['requests'], summary['p50_ms'], summary['mean_queries']), (0, None, None))
@@ -0,0 +1,70 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from moodapp import clients
+from moodapp.clients import PooledSession, RedditPool
+
+
+class PooledSessionTests(SimpleTestCase):
+    def test_own_timeout_wins_and_requests_are_counted(self):
+        session = PooledSession((1, 2), pool_size=2)
+
+        with mock.patch('requests.Session.request') as request:
+            session.request('GET', 'http://example.invalid/', timeout=99)
+            session.get('http://example.invalid/')
+
+        self.assertEqual([call.kwargs['timeout'] for call in request.call_args_list], [(1, 2), (1, 2)])
+        self.assertEqual(session.pool_stats(), {'requests_sent': 2, 'hosts': {}})
+
+
+class RedditPoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(RedditPool, '_new_client', side_effect=lambda: object())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clients_are_reused(self):
+        pool = RedditPool(size=2)
+
+        with pool.client() as first:
+            pass
+        with pool.client() as second:
+            self.assertEqual(pool.stats()['in_use'], 1)
+
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use'], stats['waits']), (1, 2, 0, 0))
+
+    def test_callers_wait_once_every_client_is_lent(self):
+        pool = RedditPool(size=1)
+        held = pool.acquire()
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+        waiter.start()
+
+        waiter.join(timeout=0.05)
+        self.assertTrue(waiter.is_alive())
+        pool.release(held)
+        waiter.join(timeout=5)
+
+        self.assertEqual(borrowed, [held])
+        self.assertEqual((pool.stats()['created'], pool.stats()['waits']), (1, 1))
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        clients.reset_clients()
+        self.addCleanup(clients.reset_clients)
+
+    @override_settings(OPENROUTER_CONNECT_TIMEOUT=1, OPENROUTER_READ_TIMEOUT=2, REDDIT_FETCH_WORKERS=3)
+    def test_clients_are_shared_until_reset(self):
+        self.assertEqual(clients.pool_stats(), {'reddit': None, 'openrouter': None})
+
+        session = clients.openrouter_session()
+        self.assertIs(clients.openrouter_session(), session)
+        self.assertEqual(session.timeout, (1, 2))
+        self.assertEqual(clients.reddit_pool().size, 3)
+        self.assertIsNotNone(clients.pool_stats()['openrouter'])
+
+        clients.reset_clients()
+        self.assertIsNot(clients.openrouter_session(), session)
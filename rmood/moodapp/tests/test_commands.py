@@ -0,0 +1,61 @@
+import io
+import os
+import signal
+from unittest import mock
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from moodapp.models import Country
+from moodapp.state import fetch_state
+
+
+@override_settings(FETCH_STATE_CACHE='default')
+class RunIngestTests(TestCase):
+    def setUp(self):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+    def run_ingest(self, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('run_ingest', interval=0, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_errors_do_not_end_the_loop(self):
+        calls = []
+
+        def refresh(*args, **kwargs):
+            calls.append(args)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            # Stopping is the only way out
+            os.kill(os.getpid(), signal.SIGTERM)
+            return []
+
+        with mock.patch('moodapp.ingest.refresh_next_countries', side_effect=refresh), \
+                mock.patch('moodapp.history.roll_up_all', side_effect=OperationalError('database is locked')) as roll_up:
+            stdout, stderr = self.run_ingest()
+
+        self.assertEqual(len(calls), 3)
+        # Maintenance is retried every cycle until it succeeds
+        self.assertEqual(roll_up.call_count, 3)
+        self.assertEqual(stderr.count('Refresh cycle failed: database is locked'), 2)
+        self.assertIn('Maintenance failed: database is locked', stderr)
+        self.assertIn('Ingestion stopped', stdout)
+
+    def test_once_runs_a_single_cycle(self):
+        with mock.patch('moodapp.ingest.refresh_next_countries', return_value=[]) as refresh:
+            stdout, stderr = self.run_ingest(once=True)
+
+        self.assertEqual(refresh.call_count, 1)
+        self.assertIn('No countries due for a refresh', stdout)
+        self.assertIn('Rolled up 0 hourly and 0 daily emotion buckets', stdout)
+
+
+@override_settings(FETCH_STATE_CACHE='default')
+class ResetFetchStateTests(TestCase):
+    def test_shows_the_globe_ready(self):
+        fetch_state.set_status(Country(name='France', subreddit='france'), is_fetching=True)
+
+        call_command('reset_fetch_state', stdout=io.StringIO())
+
+        self.assertEqual(fetch_state.get_status(), {'next_country': 'Ready', 'next_subreddit': '', 'is_fetching': False})
@@ -0,0 +1,126 @@
+from unittest import mock
+import requests
+from django.test import SimpleTestCase, override_settings
+from moodapp import emotion
+from moodapp.emotion import check_emotions_batch, parse_batch_scores, parse_title_scores
+from moodapp.resilience import CircuitBreaker
+
+
+class ParseBatchScoresTests(SimpleTestCase):
+    countries = ['France', 'Japan', 'New Zealand']
+
+    def test_reads_fenced_json_and_clamps(self):
+        reply = 'Sure!\n```json\n{"France": 6.5, "japan": 14, "New Zealand": 0}\n```'
+        self.assertEqual(parse_batch_scores(reply, self.countries), {'France': 6, 'Japan': 10, 'New Zealand': 1})
+
+    def test_falls_back_to_name_number_pairs(self):
+        reply = 'France: 7\nJapan: 3.2\nNew Zealand: about five'
+        self.assertEqual(parse_batch_scores(reply, self.countries), {'France': 7, 'Japan': 3})
+
+    def test_ignores_unknown_countries_and_bad_values(self):
+        reply = '{"France": "high", "Atlantis": 4, "Japan": null, "New Zealand": 8'
+        self.assertEqual(parse_batch_scores(reply, self.countries), {'New Zealand': 8})
+
+    def test_empty_reply(self):
+        self.assertEqual(parse_batch_scores('', self.countries), {})
+
+
+class ParseTitleScoresTests(SimpleTestCase):
+    def test_reads_an_array_of_the_right_length(self):
+        self.assertEqual(parse_title_scores('Scores: [3, 7.5, 12]', 3), [3, 7, 10])
+
+    def test_rejects_mismatched_or_malformed_replies(self):
+        self.assertIsNone(parse_title_scores('[3, 7]', 3))
+        self.assertIsNone(parse_title_scores('[3, "x", 5]', 3))
+        self.assertIsNone(parse_title_scores('three, seven', 2))
+
+
+def fake_openrouter(batch_reply, single_scores):
+    """call_openrouter stand-in: `batch_reply` for batch prompts, `single_scores[country]` otherwise"""
+    calls = []
+
+    def call(prompt, max_tokens, country):
+        calls.append(country)
+        if country.startswith('batch of'):
+            return batch_reply
+        return str(single_scores[country])
+
+    return calls, call
+
+
+class CheckEmotionsBatchTests(SimpleTestCase):
+    title_sets = {'France': ['Great day'], 'Japan': ['Bad news'], 'Peru': ['Calm']}
+
+    def test_one_completion_for_the_batch(self):
+        calls, call = fake_openrouter('{"France": 8, "Japan": 3, "Peru": 5}', {})
+        with mock.patch('moodapp.emotion.call_openrouter', side_effect=call):
+            scores = check_emotions_batch(self.title_sets)
+
+        self.assertEqual(scores, {'France': 8, 'Japan': 3, 'Peru': 5})
+        self.assertEqual(calls, ['batch of 3 countries'])
+
+    def test_countries_missing_from_the_reply_are_scored_alone(self):
+        calls, call = fake_openrouter('Here you go: {"France": 8, "Japan": 3', {'Peru': 6})
+        with mock.patch('moodapp.emotion.call_openrouter', side_effect=call):
+            scores = check_emotions_batch(self.title_sets)
+
+        self.assertEqual(scores, {'France': 8, 'Japan': 3, 'Peru': 6})
+        self.assertEqual(calls, ['batch of 3 countries', 'Peru'])
+
+    def test_provider_errors_give_the_default_without_retrying(self):
+        call = mock.Mock(side_effect=requests.exceptions.ConnectionError('down'))
+        with mock.patch('moodapp.emotion.call_openrouter', call):
+            scores = check_emotions_batch(self.title_sets, default=None)
+
+        self.assertEqual(scores, {'France': None, 'Japan': None, 'Peru': None})
+        self.assertEqual(call.call_count, 1)
+
+    def test_empty_listings_get_the_default(self):
+        calls, call = fake_openrouter('', {'France': 9})
+        with mock.patch('moodapp.emotion.call_openrouter', side_effect=call):
+            scores = check_emotions_batch({'France': ['Great day'], 'Japan': []}, default=None)
+
+        self.assertEqual(scores, {'France': 9, 'Japan': None})
+
+
+@override_settings(EMOTION_CHUNK_TOKEN_BUDGET=25)
+class ChunkedListingTests(SimpleTestCase):
+    titles = ['x' * 39] * 5  # 10 tokens each, so chunks of 2, 2 and 1
+
+    def test_chunk_scores_are_averaged_by_title_count(self):
+        calls, call = fake_openrouter('', {'France part 1/3': 8, 'France part 2/3': 'no idea', 'France part 3/3': 2})
+        with mock.patch('moodapp.emotion.call_openrouter', side_effect=call), mock.patch('moodapp.emotion.logger'):
+            score = emotion.request_emotion(self.titles, 'France')
+
+        # The unreadable chunk is left out: (8 * 2 + 2 * 1) / 3
+        self.assertEqual(score, 6)
+        self.assertEqual(sorted(calls), ['France part 1/3', 'France part 2/3', 'France part 3/3'])
+
+    def test_large_listings_are_not_packed(self):
+        calls, call = fake_openrouter('', {'Peru': 4, **{f'France part {i}/3': 7 for i in (1, 2, 3)}})
+        with mock.patch('moodapp.emotion.call_openrouter', side_effect=call):
+            scores = check_emotions_batch({'France': self.titles, 'Peru': ['Calm']})
+
+        self.assertEqual(scores, {'France': 7, 'Peru': 4})
+        self.assertNotIn('batch of 2 countries', calls)
+
+
+class OpenRouterBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('openrouter', 1, 60, failure_types=emotion.TRANSPORT_ERRORS)
+        patcher = mock.patch('moodapp.emotion.openrouter_breaker', self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, error):
+        with mock.patch('moodapp.emotion.post_completion', side_effect=error):
+            with self.assertRaises(type(error)):
+                emotion.call_openrouter('prompt', 10, 'France')
+
+    def test_unreadable_replies_do_not_open_the_circuit(self):
+        self.call(ValueError('No choices in OpenRouter response for France'))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_provider_errors_do(self):
+        self.call(requests.exceptions.HTTPError('OpenRouter API error: overloaded'))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
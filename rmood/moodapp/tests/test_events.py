@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from moodapp.events import StatusBroadcaster
+from moodapp.ingest import score_stored_listings
+from moodapp.models import Country
+
+
+@override_settings(STATUS_STREAM_HISTORY=3)
+class ResumePointTests(SimpleTestCase):
+    async def start_publishing(self):
+        self.broadcaster = StatusBroadcaster()
+        self.broadcaster._bind_to_running_loop()
+        for i in range(5):
+            self.broadcaster.publish('status', {'n': i})
+
+    async def test_resumes_within_the_remembered_events(self):
+        await self.start_publishing()
+        event_id = self.broadcaster.event_id
+        self.assertEqual(self.broadcaster.resume_point(event_id(5)), 5)
+        # Events 3 to 5 are remembered, so a client that saw 2 misses nothing
+        self.assertEqual(self.broadcaster.resume_point(event_id(2)), 2)
+
+    async def test_needs_a_snapshot_otherwise(self):
+        await self.start_publishing()
+        self.assertIsNone(self.broadcaster.resume_point(self.broadcaster.event_id(1)))
+        self.assertIsNone(self.broadcaster.resume_point(self.broadcaster.event_id(6)))
+        self.assertIsNone(self.broadcaster.resume_point('otherepoch-4'))
+        self.assertIsNone(self.broadcaster.resume_point('garbage'))
+        self.assertIsNone(self.broadcaster.resume_point(None))
+
+    async def test_publish_wakes_waiting_streams(self):
+        await self.start_publishing()
+        changed = self.broadcaster.changed
+        self.broadcaster.publish('status', {'n': 5})
+        self.assertTrue(changed.is_set())
+        self.assertFalse(self.broadcaster.changed.is_set())
+        self.assertEqual([entry[0] for entry in self.broadcaster.history], [4, 5, 6])
+
+
+@override_settings(FETCH_STATE_CACHE='default', STATUS_STREAM_POLL_INTERVAL=0.01, STATUS_STREAM_HEARTBEAT=5)
+class StreamTests(TestCase):
+    async def test_new_client_gets_a_snapshot_then_changes(self):
+        await Country.objects.acreate(name='France', subreddit='france', last_updated=timezone.now())
+        broadcaster = StatusBroadcaster()
+        stream = broadcaster.stream()
+
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        self.assertIn('event: status', await anext(stream))
+        self.assertIn('"country": "France"', await anext(stream))
+
+        await Country.objects.acreate(name='Japan', subreddit='japan', last_updated=timezone.now())
+        event = await asyncio.wait_for(anext(stream), 2)
+        self.assertIn('"country": "Japan"', event)
+        await stream.aclose()
+        self.assertEqual(broadcaster.subscribers, 0)
+
+    @override_settings(STATUS_STREAM_POLL_INTERVAL=60)
+    async def test_clients_arriving_together_share_the_first_poll(self):
+        await Country.objects.acreate(name='France', subreddit='france', last_updated=timezone.now())
+        broadcaster = StatusBroadcaster()
+        streams = [broadcaster.stream(), broadcaster.stream()]
+
+        with mock.patch.object(broadcaster, 'poll_once', wraps=broadcaster.poll_once) as poll_once:
+            for stream in streams:
+                await anext(stream)
+            snapshots = await asyncio.gather(*(anext(stream) for stream in streams))
+
+        self.assertEqual(poll_once.call_count, 1)
+        self.assertEqual(snapshots[0], snapshots[1])
+        for stream in streams:
+            await stream.aclose()
+        broadcaster.poller.cancel()
+
+
+@override_settings(FETCH_STATE_CACHE='default')
+class MidBatchPollTests(TransactionTestCase):
+    """A poll landing while a scoring batch is being saved must not lose the rest of it"""
+
+    def setUp(self):
+        # The poller runs on its own loop and database connection, like in a server
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            thread.join()
+            self.loop.close()
+
+        self.addCleanup(stop)
+        self.broadcaster = StatusBroadcaster()
+        self.run_on_loop(self.bind())
+
+        stored = timezone.now() - timedelta(minutes=5)
+        self.countries = [
+            Country.objects.create(name=name, subreddit=name.lower(), last_updated=stored)
+            for name in ['France', 'Japan']
+        ]
+        recorder = mock.patch('moodapp.ingest.recorder')
+        recorder.start()
+        self.addCleanup(recorder.stop)
+
+    async def bind(self):
+        self.broadcaster._bind_to_running_loop()
+
+    def run_on_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=10)
+
+    def poll(self):
+        self.run_on_loop(self.broadcaster.poll_once())
+
+    def test_poll_between_two_saves(self):
+        self.poll()
+        save = Country.save
+        saves = []
+
+        def save_then_poll(country, *args, **kwargs):
+            save(country, *args, **kwargs)
+            saves.append(country.name)
+            if len(saves) == 1:
+                # The shared-cache test database refuses this read until the
+                # batch commits, so don't log the failed poll
+                with mock.patch('moodapp.events.logger'):
+                    self.poll()
+
+        items = [{
+            'country': country, 'titles': ['Some title'], 'previous': None, 'measure_volatility': False,
+            'started_at': timezone.now(), 'trace': {'post_count': 1},
+        } for country in self.countries]
+        with mock.patch.object(Country, 'save', save_then_poll), \
+                mock.patch('moodapp.ingest.score_countries', return_value={'France': 8, 'Japan': 3}):
+            score_stored_listings(items)
+        self.poll()
+
+        scored = {
+            data['country']: data['emotion_score']
+            for seq, event, data in self.broadcaster.history
+            if event == 'country' and data['scored_at'] is not None
+        }
+        self.assertEqual(scored, {'France': 8, 'Japan': 3})
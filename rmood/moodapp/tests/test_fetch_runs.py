@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from moodapp.fetch_runs import FetchRunRecorder, prune_fetch_runs, subreddit_stats
+from moodapp.ingest import score_stored_listings
+from moodapp.models import Country, FetchRun
+
+T0 = datetime(2026, 3, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+
+def run(country, minutes=0, seconds=2.0, listing=1.0, outcome=FetchRun.SUCCESS, subreddit=None, **fields):
+    started = T0 + timedelta(minutes=minutes)
+    return FetchRun(
+        country=country, subreddit=subreddit or country.subreddit, started_at=started,
+        finished_at=started + timedelta(seconds=seconds), listing_seconds=listing, outcome=outcome, **fields,
+    )
+
+
+class FetchRunRecorderTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france')
+
+    @override_settings(FETCH_RUN_FLUSH_SIZE=3, FETCH_RUN_FLUSH_INTERVAL=3600)
+    def test_writes_once_the_buffer_is_full(self):
+        recorder = FetchRunRecorder()
+
+        recorder.add([run(self.country), run(self.country)])
+        self.assertEqual(FetchRun.objects.count(), 0)
+
+        recorder.add([run(self.country)])
+        self.assertEqual(FetchRun.objects.count(), 3)
+        self.assertEqual(recorder.pending, [])
+
+    @override_settings(FETCH_RUN_FLUSH_SIZE=100, FETCH_RUN_FLUSH_INTERVAL=60)
+    def test_writes_once_the_oldest_row_is_old_enough(self):
+        recorder = FetchRunRecorder()
+        with mock.patch('moodapp.fetch_runs.time.monotonic', return_value=1000.0):
+            recorder.add([run(self.country)])
+        with mock.patch('moodapp.fetch_runs.time.monotonic', return_value=1060.0):
+            recorder.add([])
+
+        self.assertEqual(FetchRun.objects.count(), 1)
+
+    @override_settings(FETCH_RUN_FLUSH_SIZE=100, FETCH_RUN_FLUSH_INTERVAL=3600)
+    def test_flush_on_shutdown(self):
+        recorder = FetchRunRecorder()
+        recorder.add([run(self.country)])
+
+        self.assertEqual(recorder.flush(), 1)
+        self.assertEqual(recorder.flush(), 0)
+        self.assertEqual(FetchRun.objects.count(), 1)
+
+
+class PruneFetchRunsTests(TestCase):
+    @override_settings(FETCH_RUN_RETENTION_DAYS=7)
+    def test_drops_runs_past_retention(self):
+        country = Country.objects.create(name='France', subreddit='france')
+        FetchRun.objects.bulk_create([run(country), run(country, minutes=60 * 24 * 8)])
+
+        self.assertEqual(prune_fetch_runs(now=T0 + timedelta(days=8, hours=1)), 1)
+        self.assertEqual(FetchRun.objects.get().started_at, T0 + timedelta(days=8))
+
+
+class SubredditStatsTests(TestCase):
+    def test_per_subreddit_rates_and_percentiles(self):
+        france = Country.objects.create(name='France', subreddit='france')
+        japan = Country.objects.create(name='Japan', subreddit='japan')
+        FetchRun.objects.bulk_create([
+            run(france, minutes=0, listing=1.0, post_count=20, llm_tokens=100),
+            run(france, minutes=30, listing=3.0, post_count=10, llm_tokens=50),
+            run(france, minutes=60, listing=None, outcome=FetchRun.ERROR, error_class='Timeout'),
+            run(japan, listing=9.0, seconds=12.0),
+        ])
+
+        stats = subreddit_stats(FetchRun.objects.all())
+
+        self.assertEqual([row['subreddit'] for row in stats], ['japan', 'france'])
+        japan_stats, france_stats = stats
+        self.assertEqual((france_stats['runs'], france_stats['errors'], france_stats['tokens']), (3, 1, 150))
+        self.assertAlmostEqual(france_stats['error_rate'], 1 / 3)
+        self.assertEqual(france_stats['runs_per_hour'], 3.0)
+        self.assertEqual(france_stats['posts_per_run'], 10.0)
+        self.assertEqual((france_stats['listing_p50'], france_stats['listing_p95']), (3.0, 3.0))
+        self.assertIsNone(japan_stats['runs_per_hour'])
+        self.assertEqual(japan_stats['total_p95'], 12.0)
+
+
+@override_settings(FETCH_STATE_CACHE='default')
+class ScoringFailureTraceTests(TestCase):
+    def test_every_listing_of_a_failed_batch_is_traced_as_an_error(self):
+        countries = [Country.objects.create(name=name, subreddit=name.lower()) for name in ['France', 'Japan']]
+        items = [{
+            'country': country, 'titles': ['Some title'], 'previous': None, 'measure_volatility': False,
+            'started_at': timezone.now(), 'trace': {'listing_seconds': 0.5, 'post_count': 1},
+        } for country in countries]
+
+        with mock.patch('moodapp.ingest.recorder') as recorder, \
+                mock.patch('moodapp.ingest.score_countries', side_effect=RuntimeError('scorer crashed')):
+            with self.assertRaises(RuntimeError):
+                score_stored_listings(items)
+
+        runs = recorder.add.call_args.args[0]
+        self.assertEqual(
+            [(run.country.name, run.outcome, run.error_class, run.listing_seconds) for run in runs],
+            [('France', FetchRun.ERROR, 'RuntimeError', 0.5), ('Japan', FetchRun.ERROR, 'RuntimeError', 0.5)],
+        )
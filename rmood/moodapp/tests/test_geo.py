@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from moodapp import geo
+from moodapp.geo import CountryIndex, get_country_index, sync_countries
+from moodapp.models import Country
+
+
+def square(lng, lat, size=2):
+    return [[[lng, lat], [lng + size, lat], [lng + size, lat + size], [lng, lat + size], [lng, lat]]]
+
+
+def feature(name, iso_a2, coordinates):
+    return {
+        'type': 'Feature',
+        'properties': {'ADMIN': name, 'ISO_A2': iso_a2},
+        'geometry': {'type': 'Polygon', 'coordinates': coordinates},
+    }
+
+
+GEOJSON = {
+    'type': 'FeatureCollection',
+    'features': [
+        feature('France', 'FR', square(2, 46)),
+        feature('Neverland', 'NL', square(10, 10)),
+        feature('Antarctica', 'AQ', square(0, -80)),
+        feature('', 'XX', square(20, 20)),
+    ],
+}
+
+
+class CountryIndexTests(SimpleTestCase):
+    def setUp(self):
+        centroids = np.array([[47.0, 3.0], [np.nan, np.nan], [-79.0, 1.0], [21.0, 21.0]])
+        self.index = CountryIndex(GEOJSON, centroids)
+
+    def test_skips_antarctica_and_nameless_features(self):
+        self.assertEqual(list(self.index.countries), ['France', 'Neverland'])
+        self.assertIn('France', self.index)
+        self.assertNotIn('Antarctica', self.index)
+
+    def test_countries_without_a_centroid_get_no_marker(self):
+        self.assertEqual(self.index.countries['France']['centroid'], {'lat': 47.0, 'lng': 3.0})
+        self.assertIsNone(self.index.countries['Neverland']['centroid'])
+        self.assertEqual(json.loads(self.index.coords_json), {'France': {'lat': 47.0, 'lng': 3.0}})
+
+    def test_subreddits_come_from_the_mapping_or_the_name(self):
+        self.assertEqual(
+            json.loads(self.index.subreddit_mapping_json), {'France': 'france', 'Neverland': 'neverland'},
+        )
+
+
+class GetCountryIndexTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'countries.geojson'
+        self.path.write_text(json.dumps(GEOJSON))
+
+        settings = override_settings(FILE_CACHE_DIR=Path(directory.name) / 'cache')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name, value in (('GEOJSON_PATH', self.path), ('_index', None), ('_index_mtime', None)):
+            patcher = mock.patch.object(geo, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_index_is_reused_until_the_file_changes(self):
+        index = get_country_index()
+        self.assertIs(get_country_index(), index)
+
+        changed = dict(GEOJSON, features=GEOJSON['features'][:1])
+        self.path.write_text(json.dumps(changed))
+        mtime = self.path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(self.path, ns=(mtime, mtime))
+
+        rebuilt = get_country_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(list(rebuilt.countries), ['France'])
+
+    def test_sync_creates_only_missing_countries(self):
+        Country.objects.create(name='France', subreddit='custom')
+
+        self.assertEqual(sync_countries(), 1)
+        self.assertEqual(sync_countries(), 0)
+        self.assertEqual(
+            dict(Country.objects.values_list('name', 'subreddit')), {'France': 'custom', 'Neverland': 'neverland'},
+        )
@@ -0,0 +1,93 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from moodapp import geometry
+from moodapp.geometry import compute_centroids, load_centroids
+
+
+def ring(west, south, east, north):
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+def polygon(*rings):
+    return {'geometry': {'type': 'Polygon', 'coordinates': list(rings)}}
+
+
+def multipolygon(*polygons):
+    return {'geometry': {'type': 'MultiPolygon', 'coordinates': [list(rings) for rings in polygons]}}
+
+
+class ComputeCentroidsTests(SimpleTestCase):
+    def assertCentroid(self, centroid, lat, lng, places=1):
+        self.assertAlmostEqual(centroid[0], lat, places=places)
+        self.assertAlmostEqual(centroid[1], lng, places=places)
+
+    def test_square_near_the_equator(self):
+        centroids = compute_centroids([polygon(ring(10, -1, 12, 1))])
+        self.assertCentroid(centroids[0], 0.0, 11.0)
+
+    def test_holes_pull_the_centroid_away(self):
+        centroids = compute_centroids([polygon(ring(0, -2, 4, 2), ring(2, -2, 4, 2)[::-1])])
+        self.assertCentroid(centroids[0], 0.0, 1.0)
+
+    def test_parts_are_weighted_by_area(self):
+        big, small = [ring(0, -3, 6, 3)], [ring(8, -1, 10, 1)]
+        centroids = compute_centroids([multipolygon(big, small)])
+        self.assertCentroid(centroids[0], 0.0, (3 * 36 + 9 * 4) / 40)
+
+    def test_far_away_parts_are_left_out(self):
+        mainland, island = [ring(0, -3, 6, 3)], [ring(100, -1, 102, 1)]
+        centroids = compute_centroids([multipolygon(mainland, island)])
+        self.assertCentroid(centroids[0], 0.0, 3.0)
+
+    def test_shapes_across_the_antimeridian_stay_whole(self):
+        east, west = [ring(176, -1, 180, 1)], [ring(-180, -1, -178, 1)]
+        centroids = compute_centroids([multipolygon(east, west)])
+        self.assertAlmostEqual(centroids[0][0], 0.0, places=1)
+        self.assertAlmostEqual(abs(centroids[0][1]), 179.0, places=1)
+
+    def test_features_without_polygons_are_nan(self):
+        centroids = compute_centroids([{'geometry': {'type': 'Point', 'coordinates': [1, 2]}}, polygon(ring(0, 0, 2, 2))])
+        self.assertTrue(np.isnan(centroids[0]).all())
+        self.assertFalse(np.isnan(centroids[1]).any())
+        self.assertTrue(np.isnan(compute_centroids([{'geometry': {'type': 'Point', 'coordinates': [1, 2]}}])).all())
+
+
+class LoadCentroidsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.geojson_path = Path(directory.name) / 'countries.geojson'
+        self.geojson_path.write_text('{}')
+        settings = override_settings(FILE_CACHE_DIR=Path(directory.name) / 'cache')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.features = [polygon(ring(10, -1, 12, 1))]
+
+    def load(self):
+        with mock.patch('moodapp.geometry.compute_centroids', wraps=geometry.compute_centroids) as compute:
+            centroids = load_centroids(self.geojson_path, self.features)
+        return centroids, compute.call_count
+
+    def test_centroids_are_computed_once_then_read_from_the_cache(self):
+        first, computed = self.load()
+        self.assertEqual(computed, 1)
+        self.assertTrue(geometry.centroid_cache_path(self.geojson_path).exists())
+
+        second, computed = self.load()
+        self.assertEqual(computed, 0)
+        np.testing.assert_array_equal(first, second)
+
+    def test_a_newer_geojson_or_other_feature_count_recomputes(self):
+        self.load()
+        mtime = geometry.centroid_cache_path(self.geojson_path).stat().st_mtime_ns + 1_000_000_000
+        os.utime(self.geojson_path, ns=(mtime, mtime))
+        self.assertEqual(self.load()[1], 1)
+
+        self.features.append(polygon(ring(0, 0, 2, 2)))
+        centroids, computed = self.load()
+        self.assertEqual(computed, 1)
+        self.assertEqual(centroids.shape, (2, 2))
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.test import SimpleTestCase, TestCase, override_settings
+from moodapp import history
+from moodapp.models import Country, EmotionRollup, EmotionSnapshot
+
+T0 = datetime(2026, 3, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+
+@override_settings(EMOTION_EMA_ALPHA=0.5)
+class RollUpTests(TestCase):
+    def setUp(self):
+        self.france = Country.objects.create(name='France', subreddit='france')
+        self.japan = Country.objects.create(name='Japan', subreddit='japan')
+
+    def snapshot(self, country, score, minutes):
+        EmotionSnapshot.objects.create(country=country, emotion_score=score, recorded_at=T0 + timedelta(minutes=minutes))
+
+    def rollups(self, country, resolution=EmotionRollup.HOUR):
+        return list(country.emotion_rollups.filter(resolution=resolution).order_by('bucket_start').values_list(
+            'bucket_start', 'sample_count', 'score_min', 'score_max', 'score_sum', 'ema',
+        ))
+
+    def test_hours_and_days_with_a_running_ema(self):
+        self.snapshot(self.france, 4, 5)
+        self.snapshot(self.france, 8, 35)
+        self.snapshot(self.france, 6, 65)
+
+        self.assertEqual(history.roll_up_all(), (2, 1))
+
+        self.assertEqual(self.rollups(self.france), [
+            (T0, 2, 4, 8, 12, 6.0),
+            (T0 + timedelta(hours=1), 1, 6, 6, 6, 6.0),
+        ])
+        self.assertEqual(self.rollups(self.france, EmotionRollup.DAY), [
+            (T0.replace(hour=0), 3, 4, 8, 18, 6.0),
+        ])
+
+    def test_last_bucket_is_rebuilt_and_the_ema_carries_over(self):
+        self.snapshot(self.france, 4, 5)
+        self.snapshot(self.france, 8, 65)
+        history.roll_up(EmotionRollup.HOUR)
+
+        self.snapshot(self.france, 2, 70)
+        history.roll_up(EmotionRollup.HOUR)
+
+        self.assertEqual(self.rollups(self.france), [
+            (T0, 1, 4, 4, 4, 4.0),
+            (T0 + timedelta(hours=1), 2, 2, 8, 10, 4.0),
+        ])
+
+    def test_a_country_behind_the_others_is_still_rolled_up(self):
+        self.snapshot(self.france, 7, 125)
+        self.snapshot(self.japan, 3, 5)
+        history.roll_up_all()
+
+        # Japan's next score lands in an hour France has already left behind
+        self.snapshot(self.japan, 5, 65)
+        history.roll_up_all()
+
+        self.assertEqual(self.rollups(self.japan), [
+            (T0, 1, 3, 3, 3, 3.0),
+            (T0 + timedelta(hours=1), 1, 5, 5, 5, 4.0),
+        ])
+        self.assertEqual(self.rollups(self.japan, EmotionRollup.DAY), [
+            (T0.replace(hour=0), 2, 3, 5, 8, 4.0),
+        ])
+
+
+@override_settings(EMOTION_SNAPSHOT_RETENTION_DAYS=1, EMOTION_HOURLY_RETENTION_DAYS=2)
+class CompactHistoryTests(TestCase):
+    def test_drops_only_rolled_up_rows_past_retention(self):
+        france = Country.objects.create(name='France', subreddit='france')
+        for days, score in ((0, 4), (3, 6), (5, 8)):
+            EmotionSnapshot.objects.create(country=france, emotion_score=score, recorded_at=T0 + timedelta(days=days))
+
+        snapshots_removed, hours_removed = history.compact_history(now=T0 + timedelta(days=5, hours=1))
+
+        self.assertEqual((snapshots_removed, hours_removed), (2, 2))
+        self.assertEqual(list(france.emotion_snapshots.values_list('emotion_score', flat=True)), [8])
+        self.assertEqual(france.emotion_rollups.filter(resolution=EmotionRollup.HOUR).count(), 1)
+        self.assertEqual(france.emotion_rollups.filter(resolution=EmotionRollup.DAY).count(), 3)
+
+    def test_keeps_rows_not_covered_by_a_rollup(self):
+        france = Country.objects.create(name='France', subreddit='france')
+        EmotionSnapshot.objects.create(country=france, emotion_score=4, recorded_at=T0)
+
+        self.assertEqual(history.compact_history(now=T0 + timedelta(days=10)), (0, 0))
+        self.assertEqual(france.emotion_snapshots.count(), 1)
+
+
+class RecordSnapshotsTests(TestCase):
+    def test_stamps_every_country_with_the_scoring_time(self):
+        france = Country.objects.create(name='France', subreddit='france', emotion_score=7, post_count=25)
+
+        history.record_snapshots([france], recorded_at=T0)
+
+        self.assertEqual(
+            list(EmotionSnapshot.objects.values_list('country__name', 'emotion_score', 'post_count', 'recorded_at')),
+            [('France', 7, 25, T0)],
+        )
+
+
+@override_settings(EMOTION_SNAPSHOT_RETENTION_DAYS=7, EMOTION_HOURLY_RETENTION_DAYS=90)
+class ChooseResolutionTests(SimpleTestCase):
+    now = T0
+
+    def test_finest_resolution_that_fits(self):
+        self.assertEqual(history.choose_resolution(T0 - timedelta(days=1), T0, now=self.now), history.RAW)
+        self.assertEqual(history.choose_resolution(T0 - timedelta(days=10), T0, now=self.now), EmotionRollup.HOUR)
+        self.assertEqual(history.choose_resolution(T0 - timedelta(days=60), T0, now=self.now), EmotionRollup.DAY)
+
+    def test_compacted_ranges_use_coarser_rollups(self):
+        start = T0 - timedelta(days=8)
+        self.assertEqual(history.choose_resolution(start, start + timedelta(hours=1), now=self.now), EmotionRollup.HOUR)
+
+
+class ParseMomentTests(SimpleTestCase):
+    def test_dates_and_datetimes(self):
+        self.assertEqual(history.parse_moment('2026-03-01'), T0.replace(hour=0))
+        self.assertEqual(history.parse_moment('2026-03-01T08:00:00'), T0)
+        self.assertEqual(history.parse_moment('2026-03-01T10:00:00+02:00'), T0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            history.parse_moment('yesterday')
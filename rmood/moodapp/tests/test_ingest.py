@@ -0,0 +1,95 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from moodapp.ingest import save_country_posts, score_stored_listings
+from moodapp.models import Country, EmotionSnapshot, FetchRun, RedditPost
+
+
+def post(reddit_id, score=1, num_comments=0):
+    return {
+        'reddit_id': reddit_id,
+        'title': f'Post {reddit_id}',
+        'score': score,
+        'permalink': f'https://reddit.com/r/test/{reddit_id}',
+        'num_comments': num_comments,
+        'author': 'someone',
+        'created_utc': datetime(2026, 1, 1, tzinfo=dt_timezone.utc),
+    }
+
+
+def queued(country, titles=('Some title',), measure_volatility=True):
+    """An item as refresh_countries queues it for the scoring stage"""
+    return {
+        'country': country,
+        'titles': list(titles),
+        'previous': None,
+        'measure_volatility': measure_volatility,
+        'started_at': timezone.now(),
+        'trace': {'listing_seconds': 0.1, 'persist_seconds': 0.01, 'post_count': len(titles)},
+    }
+
+
+class SaveCountryPostsTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france')
+
+    def test_counts_inserted_updated_and_removed_posts(self):
+        self.assertEqual(save_country_posts(self.country, [post('a'), post('b'), post('c')]), (3, 0, 0))
+
+        inserted, updated, removed = save_country_posts(self.country, [post('b', score=50), post('c'), post('d')])
+
+        self.assertEqual((inserted, updated, removed), (1, 2, 1))
+        self.assertEqual(set(self.country.posts.values_list('reddit_id', flat=True)), {'b', 'c', 'd'})
+        self.assertEqual(RedditPost.objects.get(reddit_id='b').score, 50)
+        self.country.refresh_from_db()
+        self.assertEqual(self.country.post_count, 3)
+        self.assertIsNotNone(self.country.last_updated)
+
+    def test_crossposts_are_stored_for_every_country_listing_them(self):
+        other = Country.objects.create(name='Belgium', subreddit='belgium')
+        save_country_posts(other, [post('a')])
+
+        inserted, updated, removed = save_country_posts(self.country, [post('a', score=9), post('b')])
+
+        self.assertEqual((inserted, updated, removed), (2, 0, 0))
+        self.assertEqual(other.posts.get(reddit_id='a').score, 1)
+        self.assertEqual(self.country.posts.get(reddit_id='a').score, 9)
+        self.country.refresh_from_db()
+        self.assertEqual(self.country.post_count, 2)
+
+        # Dropping it from one listing leaves the other country's copy alone
+        self.assertEqual(save_country_posts(self.country, [post('b')]), (0, 1, 1))
+        self.assertTrue(other.posts.filter(reddit_id='a').exists())
+
+
+@override_settings(FETCH_STATE_CACHE='default')
+class ScoreStoredListingsTests(TestCase):
+    def setUp(self):
+        self.france = Country.objects.create(name='France', subreddit='france', emotion_score=6)
+        self.japan = Country.objects.create(name='Japan', subreddit='japan', emotion_score=4)
+        patcher = mock.patch('moodapp.ingest.recorder')
+        self.recorder = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def runs(self):
+        return [run for call in self.recorder.add.call_args_list for run in call.args[0]]
+
+    def score(self, scores, items):
+        with mock.patch('moodapp.ingest.score_countries', return_value=scores):
+            score_stored_listings(items)
+
+    def test_unscored_countries_keep_their_previous_score(self):
+        self.score({'France': 9, 'Japan': None}, [queued(self.france), queued(self.japan)])
+
+        self.france.refresh_from_db()
+        self.japan.refresh_from_db()
+        self.assertEqual((self.france.emotion_score, self.japan.emotion_score), (9, 4))
+        self.assertIsNotNone(self.france.scored_at)
+        self.assertIsNone(self.japan.scored_at)
+        self.assertEqual(self.japan.score_volatility, 0.0)
+        self.assertEqual(list(EmotionSnapshot.objects.values_list('country__name', 'emotion_score')), [('France', 9)])
+        self.assertEqual(
+            [(run.country.name, run.outcome, run.error_class) for run in self.runs()],
+            [('France', FetchRun.SUCCESS, ''), ('Japan', FetchRun.ERROR, 'Unscored')],
+        )
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.test import TestCase, override_settings
+from prawcore.exceptions import NotFound
+from moodapp import ratelimit
+from moodapp.ingest import mark_failed
+from moodapp.jobs import claim_jobs, finish_jobs, requeue
+from moodapp.models import Country, FetchJob
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def at(moment):
+    return mock.patch('moodapp.jobs.timezone.now', return_value=moment)
+
+
+class ClaimJobsTests(TestCase):
+    def setUp(self):
+        self.france = Country.objects.create(name='France', subreddit='france')
+        self.japan = Country.objects.create(name='Japan', subreddit='japan')
+
+    def test_countries_created_outside_sync_get_a_job(self):
+        self.assertEqual(FetchJob.objects.get(country=self.france).state, FetchJob.QUEUED)
+
+    def test_claims_are_exclusive(self):
+        first = claim_jobs('worker-a', 1)
+        second = claim_jobs('worker-b', 5)
+
+        self.assertEqual([job.country.name for job in first], ['France'])
+        self.assertEqual([job.country.name for job in second], ['Japan'])
+        self.assertEqual(claim_jobs('worker-c', 5), [])
+
+    def test_expired_lease_backs_off_before_it_is_claimed_again(self):
+        self.japan.delete()
+        with at(T0):
+            stale = claim_jobs('worker-a', 1, lease_seconds=60)
+        with at(T0 + timedelta(minutes=2)):
+            # Released, but the country waits out a failure backoff first
+            self.assertEqual(claim_jobs('worker-b', 1), [])
+
+        job = FetchJob.objects.get(country=self.france)
+        self.france.refresh_from_db()
+        self.assertEqual((job.state, job.lease_token, job.last_error), (FetchJob.QUEUED, '', 'Lease expired'))
+        self.assertEqual(self.france.consecutive_failures, 1)
+        self.assertGreater(self.france.next_refresh_at, T0 + timedelta(minutes=2))
+
+        with at(self.france.next_refresh_at):
+            claimed = claim_jobs('worker-b', 1)
+        self.assertEqual([job.country.name for job in claimed], ['France'])
+
+        # The first worker finishing late doesn't touch the new lease
+        finish_jobs(stale, {'France': {'status': 'success', 'country': 'France'}})
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.lease_owner), (FetchJob.LEASED, 'worker-b'))
+
+
+@override_settings(FETCH_JOB_MAX_ATTEMPTS=2)
+class FinishJobsTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france')
+        self.job = FetchJob.objects.get(country=self.country)
+
+    def fail(self, error):
+        Country.objects.update(next_refresh_at=None)
+        claimed = claim_jobs('worker', 1)
+        finish_jobs(claimed, {'France': mark_failed(claimed[0].country, error)})
+        self.job.refresh_from_db()
+        return self.job.state
+
+    def test_transient_failures_keep_backing_off(self):
+        states = [self.fail(ConnectionError('timeout')) for _ in range(4)]
+
+        self.assertEqual(states, [FetchJob.QUEUED] * 4)
+        self.assertEqual(self.job.last_error, 'timeout')
+        self.country.refresh_from_db()
+        self.assertEqual(self.country.consecutive_failures, 4)
+
+    def test_dead_subreddit_is_dead_lettered(self):
+        self.assertEqual(self.fail(ConnectionError('timeout')), FetchJob.QUEUED)
+        self.assertEqual(self.fail(mock.Mock(spec=NotFound)), FetchJob.DEAD)
+
+        Country.objects.update(next_refresh_at=None)
+        self.assertEqual(claim_jobs('worker', 1), [])
+
+    def test_success_clears_the_last_error(self):
+        self.fail(ConnectionError('timeout'))
+        Country.objects.update(next_refresh_at=None)
+
+        finish_jobs(claim_jobs('worker', 1), {'France': {'status': 'success', 'country': 'France'}})
+
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.state, self.job.last_error, self.job.lease_token), (FetchJob.QUEUED, '', ''))
+
+    def test_requeue_clears_failures_and_is_due_now(self):
+        self.fail(mock.Mock(spec=NotFound))
+        self.fail(mock.Mock(spec=NotFound))
+
+        self.assertEqual(requeue(FetchJob.objects.filter(state=FetchJob.DEAD)), 1)
+
+        self.country.refresh_from_db()
+        self.assertEqual((self.country.consecutive_failures, self.country.next_refresh_at), (0, None))
+        self.assertEqual([job.pk for job in claim_jobs('worker', 1)], [self.job.pk])
+
+
+class UnknownCountryTests(TestCase):
+    def setUp(self):
+        ratelimit._limiters.clear()
+        self.addCleanup(ratelimit._limiters.clear)
+
+    def post(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+    def test_votes_and_comments_for_unknown_countries_are_rejected(self):
+        vote = self.post('/submit-user-mood/', {'country': 'Atlantis', 'mood': 7})
+        comment = self.post('/submit-comment/', {'country': 'Atlantis', 'mood': 7, 'comment': 'Hello'})
+
+        self.assertEqual((vote.status_code, comment.status_code), (400, 400))
+        self.assertEqual(vote.json()['error'], 'Unknown country')
+        self.assertFalse(Country.objects.exists())
+        self.assertFalse(FetchJob.objects.exists())
+
+    def test_known_country_gets_its_row_and_job(self):
+        self.assertEqual(self.post('/submit-user-mood/', {'country': 'France', 'mood': 7}).status_code, 200)
+        self.assertEqual(self.post('/submit-comment/', {'mood': 7, 'comment': 'No country'}).status_code, 200)
+
+        self.assertEqual(FetchJob.objects.get().country.name, 'France')
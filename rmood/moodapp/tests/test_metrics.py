@@ -0,0 +1,109 @@
+from unittest import mock
+import requests
+from django.test import SimpleTestCase, TestCase, override_settings
+from moodapp import metrics
+
+
+def unregistered(metric_class, *args, **kwargs):
+    """A metric that stays out of the process registry"""
+    with mock.patch.object(metrics, 'REGISTRY', []):
+        return metric_class(*args, **kwargs)
+
+
+class MetricTests(SimpleTestCase):
+    def test_samples_must_be_implemented(self):
+        class Incomplete(metrics.Metric):
+            kind = 'gauge'
+
+        with self.assertRaises(TypeError):
+            unregistered(Incomplete, 'incomplete', 'Never rendered')
+
+    def test_counter(self):
+        counter = unregistered(metrics.Counter, 'rmood_things', 'Things seen', ['kind'])
+        counter.inc(kind='a')
+        counter.inc(2, kind='b "quoted"')
+        counter.inc(kind='a')
+
+        self.assertEqual(counter.render(), '\n'.join([
+            '# HELP rmood_things Things seen',
+            '# TYPE rmood_things counter',
+            'rmood_things_total{kind="a"} 2',
+            'rmood_things_total{kind="b \\"quoted\\""} 2',
+        ]))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = unregistered(metrics.Histogram, 'rmood_seconds', 'Durations', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'rmood_seconds_bucket{le="0.1"} 1',
+            'rmood_seconds_bucket{le="1.0"} 2',
+            'rmood_seconds_bucket{le="+Inf"} 3',
+            'rmood_seconds_sum 5.55',
+            'rmood_seconds_count 3',
+        ])
+
+    def test_gauge_function_skips_failing_reads(self):
+        gauge = unregistered(metrics.GaugeFunction, 'rmood_broken', 'Never readable', mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(gauge.samples(), [])
+
+    def test_cache_ratio_comes_from_the_lookup_counter(self):
+        # SimpleTestCase fails any database query
+        lookups = {('listing', 'hit'): 3, ('listing', 'miss'): 1, ('title', 'miss'): 2}
+        with mock.patch.dict(metrics.emotion_cache_lookups.values, lookups, clear=True):
+            self.assertEqual(metrics.emotion_cache_ratio(), {('listing',): 0.75, ('title',): 0.0})
+
+
+class MetricsViewTests(TestCase):
+    def test_serves_local_scrapes(self):
+        response = self.client.get('/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('# TYPE rmood_http_request_duration_seconds histogram', response.content.decode())
+
+    def test_hidden_from_other_addresses(self):
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='203.0.113.9').status_code, 404)
+        # A forwarded-for header doesn't get anyone in
+        self.assertEqual(
+            self.client.get('/metrics/', REMOTE_ADDR='203.0.113.9', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 404,
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=None)
+    def test_open_to_everyone_when_not_restricted(self):
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='203.0.113.9').status_code, 200)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def count(self, histogram, key):
+        state = histogram.values.get(key)
+        return state['count'] if state else 0
+
+    def test_records_latency_and_queries_by_url_name(self):
+        key = ('world_snapshot', 'GET', '200')
+        before = self.count(metrics.http_request_duration, key), self.count(metrics.http_request_queries, ('world_snapshot',))
+        queries_before = metrics.http_request_queries.values.get(('world_snapshot',), {'sum': 0})['sum']
+
+        self.client.get('/world-snapshot/')
+
+        after = self.count(metrics.http_request_duration, key), self.count(metrics.http_request_queries, ('world_snapshot',))
+        self.assertEqual(after, (before[0] + 1, before[1] + 1))
+        self.assertGreater(metrics.http_request_queries.values[('world_snapshot',)]['sum'], queries_before)
+
+    def test_unmatched_urls(self):
+        before = self.count(metrics.http_request_duration, ('unmatched', 'GET', '404'))
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.count(metrics.http_request_duration, ('unmatched', 'GET', '404')), before + 1)
+
+
+class ServeMetricsTests(SimpleTestCase):
+    def test_serves_the_registry_on_its_own_port(self):
+        server = metrics.serve_metrics(0, '127.0.0.1')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        response = requests.get(f'http://127.0.0.1:{server.server_address[1]}/metrics', timeout=5)
+
+        self.assertEqual(response.headers['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertEqual(response.text, metrics.render())
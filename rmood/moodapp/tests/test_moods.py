@@ -0,0 +1,69 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from moodapp.models import Country, RedditPost, UserMood, UserMoodBucket
+from moodapp.moods import recent_mood
+
+
+class MoodAggregateTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france')
+
+    def assertTotals(self, mood_sum, mood_count):
+        self.country.refresh_from_db()
+        self.assertEqual((self.country.user_mood_sum, self.country.user_mood_count), (mood_sum, mood_count))
+        average, count = recent_mood(self.country)
+        self.assertEqual(count, mood_count)
+        self.assertEqual(average, mood_sum / mood_count if mood_count else None)
+
+    def test_create_update_and_delete(self):
+        first = UserMood.objects.create(country=self.country, mood_score=8, ip_address='10.0.0.1')
+        UserMood.objects.create(country=self.country, mood_score=4, ip_address='10.0.0.2')
+        self.assertTotals(12, 2)
+
+        first.mood_score = 2
+        first.save()
+        self.assertTotals(6, 2)
+
+        first.delete()
+        self.assertTotals(4, 1)
+
+    def test_failed_aggregate_update_rolls_the_vote_back(self):
+        with mock.patch('moodapp.moods.add_to_bucket', side_effect=RuntimeError('bucket')), \
+                mock.patch('moodapp.views.logger'):
+            response = self.client.post(
+                '/submit-user-mood/', json.dumps({'country': 'France', 'mood': 7}), content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(UserMood.objects.exists())
+        self.assertTotals(0, 0)
+
+
+class ResetDataTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france')
+        for i in range(3):
+            UserMood.objects.create(country=self.country, mood_score=5, ip_address=f'10.0.0.{i}')
+        RedditPost.objects.create(
+            country=self.country, title='Post', permalink='https://reddit.com/r/france/a', author='someone',
+            created_utc=datetime(2026, 1, 1, tzinfo=dt_timezone.utc), reddit_id='a',
+        )
+
+    def test_deletes_without_moving_aggregates_per_vote(self):
+        with mock.patch('moodapp.signals.mood_deleted') as mood_deleted:
+            call_command('reset_data', stdout=StringIO())
+
+        mood_deleted.assert_not_called()
+        self.assertFalse(Country.objects.exists())
+        self.assertFalse(UserMood.objects.exists())
+        self.assertFalse(UserMoodBucket.objects.exists())
+
+        # The aggregates follow votes again afterwards
+        country = Country.objects.create(name='Japan', subreddit='japan')
+        UserMood.objects.create(country=country, mood_score=9, ip_address='10.0.0.1')
+        country.refresh_from_db()
+        self.assertEqual((country.user_mood_sum, country.user_mood_count), (9, 1))
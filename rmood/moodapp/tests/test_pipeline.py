@@ -0,0 +1,67 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from moodapp.pipeline import BatchStage
+
+
+def stage(handle, workers=1, batch_size=3, queue_size=100, batch_wait=1):
+    return BatchStage('test', handle, workers, batch_size, queue_size, batch_wait)
+
+
+class BatchStageTests(SimpleTestCase):
+    def test_items_are_handled_in_batches(self):
+        batches = []
+        scoring = stage(batches.append)
+        for i in range(5):
+            scoring.put(i)
+
+        scoring.start().stop()
+
+        self.assertEqual(batches, [[0, 1, 2], [3, 4]])
+        self.assertEqual(scoring.stats()['handled'], 5)
+
+    def test_stop_handles_what_is_queued_on_every_worker(self):
+        handled = []
+        lock = threading.Lock()
+
+        def handle(items):
+            with lock:
+                handled.extend(items)
+
+        scoring = stage(handle, workers=3, batch_size=2).start()
+        for i in range(10):
+            scoring.put(i)
+        scoring.stop()
+
+        self.assertEqual(sorted(handled), list(range(10)))
+        self.assertEqual(scoring.threads, [])
+
+    def test_failed_batch_is_counted_and_the_worker_goes_on(self):
+        def handle(items):
+            if 'bad' in items:
+                raise RuntimeError('scorer crashed')
+
+        scoring = stage(handle, batch_size=2)
+        for item in ['bad', 'a', 'b', 'c']:
+            scoring.put(item)
+
+        with mock.patch('moodapp.pipeline.logger'):
+            scoring.start().stop()
+
+        stats = scoring.stats()
+        self.assertEqual((stats['handled'], stats['failed'], stats['queued'], stats['in_flight']), (2, 2, 0, 0))
+
+    def test_put_blocks_while_the_queue_is_full(self):
+        scoring = stage(lambda items: None, queue_size=1)
+        scoring.put('first')
+        producer = threading.Thread(target=scoring.put, args=('second',))
+        producer.start()
+
+        producer.join(timeout=0.05)
+        self.assertTrue(producer.is_alive())
+        scoring.start()
+        producer.join(timeout=5)
+        scoring.stop()
+
+        self.assertFalse(producer.is_alive())
+        self.assertGreater(scoring.stats()['put_wait_seconds'], 0)
@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase
+from moodapp.prompts import (
+    BATCH_PROMPT, batch_section, chunk_titles, clean_title, estimate_tokens, pack_batches, select_titles,
+)
+
+
+def posts(count, **fields):
+    return [{'title': f'Title number {i:02d} here', **fields} for i in range(count)]
+
+
+class CleanTitleTests(SimpleTestCase):
+    def test_collapses_whitespace(self):
+        self.assertEqual(clean_title('  Big \n news\ttoday '), 'Big news today')
+
+    def test_long_titles_are_cut_at_a_word_boundary(self):
+        self.assertEqual(clean_title('word ' * 100, max_tokens=5), 'word word word word...')
+        self.assertEqual(clean_title('x' * 50, max_tokens=5), 'x' * 20 + '...')
+
+
+class SelectTitlesTests(SimpleTestCase):
+    def test_everything_fits(self):
+        listing = [{'title': 'Hello   World'}, {'title': ' hello world '}, {'title': 'Other'}, {'title': '   '}]
+        self.assertEqual(select_titles(listing, budget=100), ['Hello World', 'Other'])
+
+    def test_sample_fits_the_budget_and_keeps_listing_order(self):
+        listing = posts(20)
+        titles = [post['title'] for post in listing]
+
+        chosen = select_titles(listing, budget=30)
+
+        self.assertLessEqual(sum(estimate_tokens(title) for title in chosen), 30)
+        self.assertEqual(len(chosen), 5)
+        self.assertEqual(chosen, sorted(chosen, key=titles.index))
+
+    def test_same_listing_gives_the_same_sample_in_any_order(self):
+        listing = posts(20)
+        chosen = select_titles(listing, budget=30)
+
+        self.assertEqual(select_titles(listing, budget=30), chosen)
+        self.assertEqual(select_titles(listing[::-1], budget=30), chosen[::-1])
+
+    def test_engagement_makes_a_post_likelier(self):
+        listing = posts(20)
+        listing[7] = {'title': 'Front page story', 'score': 50000, 'num_comments': 8000}
+
+        self.assertIn('Front page story', select_titles(listing, budget=30))
+
+
+class ChunkTitlesTests(SimpleTestCase):
+    def test_chunks_stay_within_the_budget(self):
+        titles = ['x' * 39] * 5  # 10 tokens each
+        self.assertEqual([len(chunk) for chunk in chunk_titles(titles, budget=25)], [2, 2, 1])
+
+    def test_oversized_title_gets_a_chunk_of_its_own(self):
+        self.assertEqual(chunk_titles(['short', 'x' * 400, 'short'], budget=25), [['short'], ['x' * 400], ['short']])
+
+
+class PackBatchesTests(SimpleTestCase):
+    def test_countries_are_packed_in_order_within_the_budget(self):
+        title_sets = {name: ['x' * 40] for name in ['Aaa', 'Bbb', 'Ccc']}
+        budget = estimate_tokens(BATCH_PROMPT) + 2 * estimate_tokens(batch_section('Aaa', ['x' * 40]))
+
+        self.assertEqual([list(batch) for batch in pack_batches(title_sets, budget)], [['Aaa', 'Bbb'], ['Ccc']])
@@ -0,0 +1,168 @@
+import json
+import time
+from unittest import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from moodapp import benchmark, clients, ratelimit
+from moodapp.fetcher import iter_listings
+from moodapp.models import Country
+from moodapp.ratelimit import CacheRateLimiter, SlidingWindowLimiter, TokenBucket
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.1, delta=0.02)
+
+    def test_acquire_blocks_until_refilled(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        bucket.acquire()
+
+        started = time.monotonic()
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.monotonic() - started, 0.015)
+
+    def test_acquire_gives_up_after_timeout(self):
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        bucket.acquire()
+        self.assertFalse(bucket.acquire(timeout=0.05))
+
+    def test_more_than_capacity_is_an_error(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=2).acquire(3)
+
+
+class IterListingsTests(SimpleTestCase):
+    def setUp(self):
+        self.reddit = benchmark.FakeReddit(posts_per_listing=5).start()
+        self.addCleanup(self.reddit.stop)
+        settings = override_settings(REDDIT_URL=self.reddit.url, REDDIT_OAUTH_URL=self.reddit.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        clients.reset_clients()
+        self.addCleanup(clients.reset_clients)
+
+    def test_fetches_every_subreddit_under_the_bucket(self):
+        timings = {}
+        bucket = TokenBucket(rate=1000, capacity=3)
+
+        listings = list(iter_listings(['france', 'japan', 'peru'], limit=5, max_workers=3, bucket=bucket, timings=timings))
+
+        self.assertEqual(sorted(name for name, posts, error in listings), ['france', 'japan', 'peru'])
+        self.assertTrue(all(error is None and len(posts) == 5 for name, posts, error in listings))
+        self.assertEqual(set(timings), {'france', 'japan', 'peru'})
+        self.assertEqual(set(listings[0][1][0]), {
+            'reddit_id', 'title', 'score', 'permalink', 'num_comments', 'author', 'created_utc',
+        })
+
+
+class SlidingWindowLimiterTests(SimpleTestCase):
+    def test_allows_limit_hits_per_window(self):
+        limiter = SlidingWindowLimiter(limit=2, window=60)
+
+        self.assertEqual(limiter.hit('a'), 0.0)
+        self.assertEqual(limiter.hit('a'), 0.0)
+        self.assertTrue(0 < limiter.hit('a') <= 60)
+        self.assertEqual(limiter.hit('b'), 0.0)
+
+    def test_hits_slide_out_of_the_window(self):
+        limiter = SlidingWindowLimiter(limit=1, window=60)
+        with mock.patch('moodapp.ratelimit.time.monotonic', return_value=1000.0):
+            limiter.hit('a')
+        with mock.patch('moodapp.ratelimit.time.monotonic', return_value=1030.0):
+            self.assertEqual(limiter.hit('a'), 30.0)
+        with mock.patch('moodapp.ratelimit.time.monotonic', return_value=1060.0):
+            self.assertEqual(limiter.hit('a'), 0.0)
+
+    def test_refund_and_forgetting_quiet_keys(self):
+        limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=2)
+        limiter.hit('a')
+        limiter.refund('a')
+        self.assertEqual(limiter.hit('a'), 0.0)
+
+        limiter.hit('b')
+        limiter.hit('c')
+        self.assertEqual(list(limiter.hits), ['b', 'c'])
+
+
+class CacheRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def at(self, moment):
+        return mock.patch('moodapp.ratelimit.time.time', return_value=moment)
+
+    def test_limits_within_a_window_and_refunds(self):
+        limiter = CacheRateLimiter(limit=2, window=60)
+        with self.at(6000.0):
+            self.assertEqual(limiter.hit('a'), 0.0)
+            self.assertEqual(limiter.hit('a'), 0.0)
+            self.assertEqual(limiter.hit('a'), 60.0)
+            limiter.refund('a')
+            self.assertEqual(limiter.hit('a'), 0.0)
+
+    def test_previous_window_still_counts_while_it_overlaps(self):
+        limiter = CacheRateLimiter(limit=2, window=60)
+        with self.at(6030.0):
+            limiter.hit('a')
+            limiter.hit('a')
+        # Three quarters into the next window, a quarter of the previous hits still count
+        with self.at(6105.0):
+            self.assertEqual(limiter.hit('a'), 0.0)
+            self.assertGreater(limiter.hit('a'), 0.0)
+
+
+class GetLimiterTests(SimpleTestCase):
+    def setUp(self):
+        ratelimit._limiters.clear()
+        self.addCleanup(ratelimit._limiters.clear)
+
+    @override_settings(RATE_LIMIT_BACKEND='cache', RATE_LIMITS={'vote': {'limit': 3, 'window': 10}})
+    def test_builds_each_limiter_once(self):
+        limiter = ratelimit.get_limiter('vote')
+        self.assertIsInstance(limiter, CacheRateLimiter)
+        self.assertEqual((limiter.limit, limiter.window, limiter.prefix), (3, 10.0, 'ratelimit:vote'))
+        self.assertIs(ratelimit.get_limiter('vote'), limiter)
+
+    @override_settings(RATE_LIMIT_BACKEND='redis', RATE_LIMITS={'vote': {'limit': 3, 'window': 10}})
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ratelimit.get_limiter('vote')
+
+
+@override_settings(
+    RATE_LIMIT_BACKEND='local',
+    RATE_LIMITS={'submit_user_mood': {'limit': 1, 'window': 60}, 'submit_comment': {'limit': 1, 'window': 60}},
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        ratelimit._limiters.clear()
+        self.addCleanup(ratelimit._limiters.clear)
+        Country.objects.create(name='France', subreddit='france')
+
+    def submit(self, mood, ip='10.0.0.1'):
+        return self.client.post(
+            '/submit-user-mood/', json.dumps({'country': 'France', 'mood': mood}),
+            content_type='application/json', REMOTE_ADDR=ip,
+        )
+
+    def test_second_request_gets_429_with_retry_after(self):
+        self.assertEqual(self.submit(5).status_code, 200)
+
+        response = self.submit(6)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['status'], 'rate_limited')
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+    def test_limit_is_per_client(self):
+        self.assertEqual(self.submit(5, ip='10.0.0.1').status_code, 200)
+        self.assertEqual(self.submit(5, ip='10.0.0.2').status_code, 200)
+
+    def test_rejected_requests_are_not_charged(self):
+        self.assertEqual(self.submit(42).status_code, 400)
+        self.assertEqual(self.submit(5).status_code, 200)
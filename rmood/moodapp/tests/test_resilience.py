@@ -0,0 +1,111 @@
+import contextvars
+import threading
+import time
+from unittest import mock
+from django.test import SimpleTestCase
+from moodapp.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyTracker, hedged_call
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def failing(error):
+    def call():
+        raise error
+    return call
+
+
+def slow(value, seconds):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_repeated_failures_and_fails_fast(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(failing(ConnectionError('down')))
+
+        func = mock.Mock()
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(func)
+        func.assert_not_called()
+
+    def test_one_trial_call_after_the_reset_timeout(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=60)
+        with mock.patch('moodapp.resilience.time.monotonic', return_value=100.0):
+            with self.assertRaises(ConnectionError):
+                breaker.call(failing(ConnectionError('down')))
+
+        with mock.patch('moodapp.resilience.time.monotonic', return_value=160.0):
+            # The trial fails, so the circuit opens for another reset_timeout
+            with self.assertRaises(ConnectionError):
+                breaker.call(failing(ConnectionError('still down')))
+            self.assertFalse(breaker.allow())
+
+        with mock.patch('moodapp.resilience.time.monotonic', return_value=220.0):
+            self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual((breaker.state, breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def test_only_failure_types_count(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=60, failure_types=(ConnectionError,))
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                breaker.call(failing(ValueError('unreadable reply')))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        with self.assertRaises(ConnectionError):
+            breaker.call(failing(ConnectionError('down')))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class HedgedCallTests(SimpleTestCase):
+    def test_fast_primary_needs_no_hedge(self):
+        hedge = mock.Mock()
+        self.assertEqual(hedged_call(lambda: 'primary', deadline=1, hedge=hedge, hedge_after=0.5), 'primary')
+        hedge.assert_not_called()
+
+    def test_slow_primary_is_hedged(self):
+        result = hedged_call(slow('primary', 0.5), deadline=2, hedge=lambda: 'hedge', hedge_after=0.01)
+        self.assertEqual(result, 'hedge')
+
+    def test_failed_primary_starts_the_hedge_at_once(self):
+        started = time.monotonic()
+        result = hedged_call(failing(ConnectionError('down')), deadline=2, hedge=lambda: 'hedge', hedge_after=1)
+        self.assertEqual(result, 'hedge')
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_last_error_when_every_call_failed(self):
+        with self.assertRaisesMessage(ValueError, 'hedge'):
+            hedged_call(failing(ConnectionError('primary')), deadline=2, hedge=failing(ValueError('hedge')), hedge_after=1)
+        with self.assertRaises(ConnectionError):
+            hedged_call(failing(ConnectionError('primary')), deadline=2)
+
+    def test_deadline(self):
+        with self.assertRaises(DeadlineExceeded):
+            hedged_call(slow('primary', 0.5), deadline=0.05)
+
+    def test_calls_share_the_process_workers_and_see_the_caller_context(self):
+        def primary():
+            return threading.current_thread().name, request_id.get()
+
+        request_id.set('abc')
+        first = hedged_call(primary, deadline=1)
+        second = hedged_call(primary, deadline=1)
+
+        self.assertTrue(first[0].startswith('hedged-call'))
+        self.assertEqual((first[1], second[1]), ('abc', 'abc'))
+
+
+class LatencyTrackerTests(SimpleTestCase):
+    def test_percentile_once_enough_samples(self):
+        tracker = LatencyTracker(size=100, min_samples=10)
+        for i in range(9):
+            tracker.record(i)
+        self.assertIsNone(tracker.percentile(95))
+
+        for i in range(9, 100):
+            tracker.record(i)
+        self.assertEqual(tracker.percentile(95), 95)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from prawcore.exceptions import NotFound
+from moodapp.models import Country
+from moodapp.scheduler import (
+    can_measure_activity, fold_score_change, is_dead_subreddit, refresh_interval, schedule_failure, schedule_success,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+@override_settings(
+    SCHEDULER_MIN_INTERVAL=300, SCHEDULER_MAX_INTERVAL=3600, SCHEDULER_VELOCITY_SCALE=2.0,
+    SCHEDULER_VOLATILITY_SCALE=1.0, SCHEDULER_DEAD_BACKOFF=3600, SCHEDULER_MAX_BACKOFF=4 * 3600,
+)
+class SchedulerTests(SimpleTestCase):
+    def country(self, **fields):
+        return Country(name='France', subreddit='france', **fields)
+
+    def test_busy_and_volatile_countries_are_refreshed_sooner(self):
+        self.assertEqual(refresh_interval(self.country()), 3600)
+        self.assertEqual(refresh_interval(self.country(post_velocity=2.0)), 1800)
+        self.assertEqual(refresh_interval(self.country(post_velocity=2.0, score_volatility=1.0)), 1200)
+        self.assertEqual(refresh_interval(self.country(post_velocity=1000.0)), 300)
+
+    def test_first_success_comes_back_soon(self):
+        country = self.country(consecutive_failures=2)
+
+        schedule_success(country, new_posts=25, previous_updated=None, now=NOW)
+
+        self.assertEqual(country.post_velocity, 0.0)
+        self.assertEqual(country.consecutive_failures, 0)
+        self.assertEqual(country.next_refresh_at, NOW + timedelta(seconds=300))
+
+    def test_success_folds_new_posts_per_hour_into_the_velocity(self):
+        country = self.country(post_velocity=1.0)
+
+        schedule_success(country, new_posts=10, previous_updated=NOW - timedelta(hours=2), now=NOW)
+
+        self.assertAlmostEqual(country.post_velocity, 1.0 + 0.3 * (5.0 - 1.0))
+        self.assertEqual(country.next_refresh_at, NOW + timedelta(seconds=refresh_interval(country)))
+
+    def test_velocity_is_not_measured_across_failures(self):
+        country = self.country(post_velocity=1.0, consecutive_failures=1, last_updated=NOW)
+        self.assertFalse(can_measure_activity(country))
+
+        schedule_success(country, new_posts=100, previous_updated=NOW - timedelta(hours=1), now=NOW)
+
+        self.assertEqual(country.post_velocity, 1.0)
+        self.assertTrue(can_measure_activity(country))
+
+    def test_score_changes_fold_into_the_volatility(self):
+        country = self.country(emotion_score=8, score_volatility=1.0)
+        fold_score_change(country, previous_score=4)
+        self.assertAlmostEqual(country.score_volatility, 1.0 + 0.3 * (4 - 1.0))
+
+    def test_failures_back_off_exponentially_up_to_the_cap(self):
+        country = self.country()
+        delays = []
+        for _ in range(4):
+            schedule_failure(country, ConnectionError('timeout'), NOW)
+            delays.append((country.next_refresh_at - NOW).total_seconds())
+        self.assertEqual(delays, [300, 600, 1200, 2400])
+
+        dead = self.country()
+        delays = []
+        for _ in range(4):
+            schedule_failure(dead, mock.Mock(spec=NotFound), NOW)
+            delays.append((dead.next_refresh_at - NOW).total_seconds())
+        self.assertEqual(delays, [3600, 7200, 14400, 14400])
+
+    def test_dead_subreddit_errors(self):
+        self.assertTrue(is_dead_subreddit(mock.Mock(spec=NotFound)))
+        self.assertFalse(is_dead_subreddit(ConnectionError('timeout')))
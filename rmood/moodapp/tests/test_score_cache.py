@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from moodapp import score_cache
+from moodapp.models import ScoreCacheEntry
+
+TITLES = ['Sunny day in Paris', 'Trains on strike', 'New bakery opens', 'Rent keeps rising', 'Team wins the cup']
+
+
+class ScoreListingsTests(TestCase):
+    def score(self, title_sets, batch_scores=None, title_scores=None):
+        batch = mock.Mock(side_effect=lambda sets, default: {country: (batch_scores or {}).get(country) for country in sets})
+        titles = mock.Mock(return_value=title_scores)
+        with mock.patch('moodapp.score_cache.check_emotions_batch', batch), \
+                mock.patch('moodapp.score_cache.score_titles', titles):
+            results = score_cache.score_listings(title_sets, default=None)
+        return results, batch, titles
+
+    def test_unchanged_listing_is_answered_from_the_cache(self):
+        results, batch, titles = self.score({'France': TITLES}, batch_scores={'France': 7})
+        self.assertEqual(results, {'France': 7})
+
+        # Same titles in another order and case
+        reordered = [title.upper() for title in reversed(TITLES)]
+        results, batch, titles = self.score({'France': reordered})
+
+        self.assertEqual(results, {'France': 7})
+        batch.assert_not_called()
+        titles.assert_not_called()
+        self.assertEqual(score_cache.cache_stats()['listing_hits'], 1)
+
+    def test_listing_scores_are_not_cached_per_title(self):
+        self.score({'France': TITLES}, batch_scores={'France': 7})
+
+        self.assertFalse(ScoreCacheEntry.objects.filter(kind=ScoreCacheEntry.TITLE).exists())
+
+        # A small change needs the whole listing scored again
+        results, batch, titles = self.score({'France': TITLES[:4] + ['Museum reopens']}, batch_scores={'France': 6})
+        self.assertEqual(results, {'France': 6})
+        titles.assert_not_called()
+
+    def test_mostly_cached_titles_are_rescored_incrementally(self):
+        score_cache.store(ScoreCacheEntry.TITLE, {score_cache.title_key(title): 8 for title in TITLES[:4]})
+
+        results, batch, titles = self.score({'France': TITLES}, title_scores=[3])
+
+        titles.assert_called_once_with([TITLES[4]])
+        batch.assert_not_called()
+        self.assertEqual(results, {'France': round((8 * 4 + 3) / 5)})
+        self.assertTrue(ScoreCacheEntry.objects.filter(key=score_cache.title_key(TITLES[4]), score=3).exists())
+        self.assertTrue(ScoreCacheEntry.objects.filter(key=score_cache.listing_key(TITLES)).exists())
+
+    def test_failed_title_scoring_falls_back_to_the_listing(self):
+        score_cache.store(ScoreCacheEntry.TITLE, {score_cache.title_key(title): 8 for title in TITLES[:4]})
+
+        results, batch, titles = self.score({'France': TITLES}, batch_scores={'France': 4}, title_scores=None)
+
+        self.assertEqual(results, {'France': 4})
+
+    def test_unscored_listings_get_the_default_and_are_not_cached(self):
+        results, batch, titles = self.score({'France': TITLES, 'Japan': []})
+
+        self.assertEqual(results, {'France': None, 'Japan': None})
+        self.assertFalse(ScoreCacheEntry.objects.exists())
+
+
+class EvictTests(TestCase):
+    @override_settings(EMOTION_CACHE_TTL=60, EMOTION_CACHE_MAX_ENTRIES=2)
+    def test_drops_expired_then_least_recently_used(self):
+        now = timezone.now()
+        for i in range(4):
+            ScoreCacheEntry.objects.create(
+                key=f'fresh{i}', kind=ScoreCacheEntry.TITLE, score=5, created_at=now,
+                last_used_at=now - timedelta(seconds=i),
+            )
+        ScoreCacheEntry.objects.create(
+            key='expired', kind=ScoreCacheEntry.LISTING, score=5, created_at=now - timedelta(seconds=120),
+        )
+
+        self.assertEqual(score_cache.evict(), 3)
+        self.assertEqual(set(ScoreCacheEntry.objects.values_list('key', flat=True)), {'fresh0', 'fresh1'})
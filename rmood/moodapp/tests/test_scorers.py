@@ -0,0 +1,112 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from moodapp import scorers
+from moodapp.lexicon import LexiconEngine
+
+
+class LexiconEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.engine = LexiconEngine()
+
+    def test_positive_listings_score_above_negative_ones(self):
+        scores = self.engine.score({
+            'happy': ['Wonderful festival in town', 'Team wins the gold medal'],
+            'sad': ['Earthquake kills dozens', 'Terrible flooding destroyed homes'],
+        })
+        self.assertGreater(scores['happy'], 7)
+        self.assertLess(scores['sad'], 3)
+
+    def test_a_negator_flips_the_next_word(self):
+        scores = self.engine.score({'plain': ['good'], 'negated': ['not good']})
+        self.assertGreater(scores['plain'], 5.5)
+        self.assertLess(scores['negated'], 5.5)
+
+    def test_titles_without_sentiment_are_left_out(self):
+        scores = self.engine.score({'mixed': ['great news', 'the parliament met on tuesday'], 'none': ['the parliament met']})
+        self.assertEqual(scores['mixed'], self.engine.score({'only': ['great news']})['only'])
+        self.assertIsNone(scores['none'])
+
+    def test_scores_stay_on_the_scale(self):
+        scores = self.engine.score({'worst': ['murder massacre genocide'], 'best': ['wonderful amazing awesome']})
+        self.assertEqual(min(scores.values()), 1.0)
+        self.assertLessEqual(max(scores.values()), 10.0)
+
+    def test_empty_input(self):
+        self.assertEqual(self.engine.score({}), {})
+        self.assertEqual(self.engine.score({'none': []}), {'none': None})
+
+
+class ScorerTests(SimpleTestCase):
+    def test_score_many_must_be_implemented(self):
+        class Incomplete(scorers.Scorer):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_lexicon_scorer_rounds_and_uses_the_default(self):
+        scorer = scorers.get_scorer('lexicon')
+        scores = scorer.score_many({'happy': ['wonderful day'], 'none': ['the parliament met']}, default=None)
+        self.assertIsInstance(scores['happy'], int)
+        self.assertIsNone(scores['none'])
+
+    def test_unknown_scorer(self):
+        with self.assertRaises(ValueError):
+            scorers.get_scorer('telepathy')
+
+
+class FakeScorer(scorers.Scorer):
+    name = 'fake'
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = []
+
+    def score_many(self, title_sets, default=None):
+        self.calls.append(set(title_sets))
+        return {country: self.scores.get(country, default) for country in title_sets}
+
+
+@override_settings(EMOTION_SCORER='fake', EMOTION_FALLBACK_SCORER='backup', EMOTION_PREFILTER_DELTA=None)
+class ScoreCountriesTests(SimpleTestCase):
+    def use_scorers(self, primary, fallback):
+        instances = {'fake': primary, 'backup': fallback}
+        patcher = mock.patch('moodapp.scorers.get_scorer', side_effect=instances.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fallback_scores_what_the_primary_could_not(self):
+        primary, fallback = FakeScorer({'France': 8}), FakeScorer({'Japan': 3})
+        self.use_scorers(primary, fallback)
+
+        scores = scorers.score_countries({'France': ['a'], 'Japan': ['b']})
+
+        self.assertEqual(scores, {'France': 8, 'Japan': 3})
+        self.assertEqual(fallback.calls, [{'Japan'}])
+
+    def test_countries_nobody_could_score_are_none(self):
+        self.use_scorers(FakeScorer({}), FakeScorer({}))
+        self.assertEqual(scorers.score_countries({'France': ['a']}), {'France': None})
+
+    @override_settings(EMOTION_PREFILTER_DELTA=0.5)
+    def test_prefilter_keeps_scores_the_lexicon_sees_unchanged(self):
+        primary = FakeScorer({'France': 2, 'Japan': 2})
+        self.use_scorers(primary, FakeScorer({}))
+
+        with mock.patch('moodapp.scorers.unchanged_by_lexicon', return_value={'France'}):
+            scores = scorers.score_countries(
+                {'France': ['a'], 'Japan': ['b']}, previous={'France': (['a'], 7), 'Japan': (['c'], 4)},
+            )
+
+        self.assertEqual(scores, {'France': 7, 'Japan': 2})
+        self.assertEqual(primary.calls, [{'Japan'}])
+
+
+class UnchangedByLexiconTests(SimpleTestCase):
+    def test_compares_old_and_new_listings(self):
+        unchanged = scorers.unchanged_by_lexicon(
+            {'France': ['great day'], 'Japan': ['great day'], 'Peru': ['great day']},
+            {'France': ['great day again'], 'Japan': ['terrible murder']},
+            threshold=0.5,
+        )
+        self.assertEqual(unchanged, {'France'})
@@ -0,0 +1,45 @@
+import os
+import socket
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from moodapp.models import Country
+from moodapp.state import IDLE_STATUS, FetchStateStore, lease_owner_id
+
+
+class FetchStateStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = FetchStateStore(alias='default')
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def test_idle_until_something_is_fetched(self):
+        self.assertEqual(self.store.get_status(), IDLE_STATUS)
+
+    def test_set_status_keeps_the_last_country(self):
+        self.store.set_status(Country(name='France', subreddit='france'), is_fetching=True)
+        self.assertEqual(
+            self.store.get_status(), {'next_country': 'France', 'next_subreddit': 'france', 'is_fetching': True},
+        )
+
+        self.store.set_status(is_fetching=False)
+        self.assertEqual(self.store.get_status()['next_country'], 'France')
+        self.assertFalse(self.store.get_status()['is_fetching'])
+
+    async def test_async_reads_see_the_same_status(self):
+        await self.store.cache.aset(FetchStateStore.STATUS_KEY, {'next_country': 'Japan'})
+        self.assertEqual(await self.store.aget_status(), {'next_country': 'Japan'})
+
+    def test_reset(self):
+        self.store.set_status(Country(name='France', subreddit='france'), is_fetching=True)
+
+        self.store.reset()
+        self.assertEqual(self.store.get_status(), IDLE_STATUS)
+
+        ready = {'next_country': 'Ready', 'next_subreddit': '', 'is_fetching': False}
+        self.store.reset(ready)
+        self.assertEqual(self.store.get_status(), ready)
+
+
+class LeaseOwnerTests(SimpleTestCase):
+    def test_names_host_and_process(self):
+        self.assertEqual(lease_owner_id(), f"{socket.gethostname()}:{os.getpid()}")
@@ -0,0 +1,119 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from moodapp import metrics
+from moodapp.models import Country, RedditPost, UserComment, UserMood
+
+
+class WorldSnapshotTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france', last_updated=timezone.now())
+
+    def test_unchanged_world_revalidates_to_304(self):
+        etag = self.client.get('/world-snapshot/')['ETag']
+
+        response = self.client.get('/world-snapshot/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_score_change_changes_the_etag(self):
+        etag = self.client.get('/world-snapshot/')['ETag']
+        Country.objects.filter(pk=self.country.pk).update(emotion_score=9, scored_at=timezone.now())
+
+        response = self.client.get('/world-snapshot/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['countries']['France']['emotion_score'], 9)
+
+    def test_new_country_changes_the_etag(self):
+        etag = self.client.get('/world-snapshot/')['ETag']
+        Country.objects.create(name='Japan', subreddit='japan')
+
+        response = self.client.get('/world-snapshot/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['countries']), {'France', 'Japan'})
+
+
+class CommentCursorTests(TestCase):
+    def setUp(self):
+        self.comments = [
+            UserComment.objects.create(mood_score=5, comment_text=f'Comment {i}', ip_address='10.0.0.1')
+            for i in range(60)
+        ]
+
+    def test_without_cursor_returns_newest(self):
+        data = self.client.get('/get-comments/').json()
+
+        self.assertEqual(len(data['comments']), 50)
+        self.assertEqual(data['cursor'], self.comments[-1].id)
+        self.assertEqual(data['comments'][-1]['id'], self.comments[10].id)
+
+    def test_cursor_pages_forward_without_gaps(self):
+        cursor = self.comments[4].id
+        seen = []
+        while True:
+            data = self.client.get('/get-comments/', {'since_id': cursor}).json()
+            seen.extend(comment['id'] for comment in data['comments'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+
+        self.assertEqual(sorted(seen), [comment.id for comment in self.comments[5:]])
+        self.assertEqual(cursor, self.comments[-1].id)
+        self.assertEqual(self.client.get('/get-comments/', {'since_id': cursor}).json()['comments'], [])
+
+    def test_rejects_bad_cursor(self):
+        self.assertEqual(self.client.get('/get-comments/', {'since_id': 'abc'}).status_code, 400)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.country = Country.objects.create(name='France', subreddit='france', emotion_score=7)
+        RedditPost.objects.create(
+            country=self.country, title='Post', permalink='https://reddit.com/r/france/a', author='someone',
+            created_utc=datetime(2026, 1, 1, tzinfo=dt_timezone.utc), reddit_id='a', score=12,
+        )
+        UserMood.objects.create(country=self.country, mood_score=8, ip_address='10.0.0.1')
+
+    async def test_country_data(self):
+        data = (await self.async_client.get('/get-country-data/', {'country': 'France'})).json()
+
+        self.assertEqual([post['title'] for post in data['posts']], ['Post'])
+        self.assertEqual((data['emotion_score'], data['user_mood_avg'], data['user_mood_count']), (7, 8.0, 1))
+        self.assertEqual((data['recent_mood_avg'], data['recent_mood_count']), (8.0, 1))
+
+    async def test_unknown_and_missing_country(self):
+        data = (await self.async_client.get('/get-country-data/', {'country': 'Japan'})).json()
+        self.assertEqual((data['count'], data['emotion_score'], data['recent_mood_count']), (0, 5, 0))
+
+        self.assertEqual((await self.async_client.get('/get-country-data/')).status_code, 400)
+
+    async def test_queries_of_async_views_are_counted(self):
+        before = metrics.http_request_queries.values.get(('get_country_data',), {'count': 0, 'sum': 0})
+        before = dict(before)
+
+        await self.async_client.get('/get-country-data/', {'country': 'France'})
+
+        after = metrics.http_request_queries.values[('get_country_data',)]
+        self.assertEqual(after['count'], before['count'] + 1)
+        self.assertGreaterEqual(after['sum'] - before['sum'], 3)
+
+
+class FetchStatusTests(TestCase):
+    async def test_current_status(self):
+        status = {'next_country': 'France', 'next_subreddit': 'france', 'is_fetching': True}
+        with mock.patch('moodapp.views.fetch_state.aget_status', mock.AsyncMock(return_value=status)):
+            response = await self.async_client.get('/get-fetch-status/')
+
+        self.assertEqual(response.json(), status)
+
+    async def test_unreadable_status_is_logged(self):
+        with mock.patch('moodapp.views.fetch_state.aget_status', mock.AsyncMock(side_effect=ConnectionError('down'))), \
+                mock.patch('moodapp.views.logger') as logger:
+            response = await self.async_client.get('/get-fetch-status/')
+
+        self.assertEqual(response.json()['next_country'], 'Error')
+        logger.exception.assert_called_once()
@@ -1,249 +1,67 @@
-import praw
 from django.shortcuts import render
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models import Count, Avg
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.db import transaction
+from django.db.models import Count, Max
+import hashlib
 import json
-from pathlib import Path
-from datetime import timedelta, datetime
-import pytz
-import requests
-from .models import Country, RedditPost, FetchQueue, FetchStatus, UserMood, UserComment
-
-def check_emotion(titles, country):
-    api_key = settings.OPENROUTER_API_KEY
-    all_titles = " ".join(titles)
-    prompt = f"ONLY GIVE ME ONE NUMBER BETWEEN 1 AND 10 THAT REPRESENTS THE OVERALL EMOTION OF THE FOLLOWING TEXTS: {all_titles} PLEASE STOP BEING NEUTRAL AND CHOOSING 5, CHOOSE OTHER NUMBERS TOO YOU CAN ALSO CHOOSE DECIMALS LIKE 6.5 OR 7.2 IF YOU WANT TO BE MORE PRECISE"
-
-    url = "https://openrouter.ai/api/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:8000",  # Optional: your site URL
-        "X-Title": "Reddit Mood Analyzer",  # Optional: your app name
-    }
-
-    data = {
-        "model": "google/gemini-2.5-flash-lite",  # Free Gemini model via OpenRouter
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.7,
-        "max_tokens": 10,  # We only need a single number
-    }
+import logging
+from datetime import timedelta
+from . import clients, events, history, metrics
+from .geo import get_country_index, subreddit_for
+from .models import Country, UserMood, UserComment
+from .moods import arecent_mood
+from .ratelimit import client_ip, rate_limit
+from .state import fetch_state
 
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response_json = response.json()
-        
-        # Debug: print the full response
-        print(f"OpenRouter API response for {country}: {response_json}")
-        
-        # Check for error in response
-        if "error" in response_json:
-            print(f"OpenRouter API error: {response_json['error']}")
-            return 5  # Default neutral score
-        
-        # Check if choices exist
-        if "choices" not in response_json or not response_json["choices"]:
-            print(f"No choices in OpenRouter response for {country}")
-            return 5  # Default neutral score
-        
-        # Extract the text
-        text_output = response_json["choices"][0]["message"]["content"].strip()
-        
-        # Try to extract just the number
-        import re
-        numbers = re.findall(r'\d+', text_output)
-        if numbers:
-            score = int(numbers[0])
-            # Clamp between 1 and 10
-            return max(1, min(10, score))
-        else:
-            print(f"Could not parse number from: {text_output}")
-            return 5
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Network error calling OpenRouter API: {e}")
-        return 5
-    except (KeyError, IndexError, ValueError) as e:
-        print(f"Error parsing OpenRouter response: {e}")
-        return 5
-    except Exception as e:
-        print(f"Unexpected error in check_emotion: {e}")
-        return 5
+logger = logging.getLogger(__name__)
 
 def dubai_posts(request):
-    reddit = praw.Reddit(
-        client_id=settings.REDDIT_CLIENT_ID,
-        client_secret=settings.REDDIT_CLIENT_SECRET,
-        user_agent=settings.REDDIT_USER_AGENT
-    )
-    
-    subreddit = reddit.subreddit('dubai')
     posts = []
     
-    for submission in subreddit.new(limit=10):
-        posts.append({
-            'title': submission.title,
-            'author': str(submission.author),
-            'score': submission.score,
-            'url': submission.url,
-            'permalink': f"https://reddit.com{submission.permalink}",
-            'created_utc': submission.created_utc,
-            'num_comments': submission.num_comments
-        })
+    with clients.reddit() as reddit:
+        for submission in reddit.subreddit('dubai').new(limit=10):
+            posts.append({
+                'title': submission.title,
+                'author': str(submission.author),
+                'score': submission.score,
+                'url': submission.url,
+                'permalink': f"https://reddit.com{submission.permalink}",
+                'created_utc': submission.created_utc,
+                'num_comments': submission.num_comments
+            })
     
     return render(request, 'dubai_posts.html', {'posts': posts})
 
 def globe_countries(request):
-    geojson_path = Path(__file__).resolve().parent / 'templates' / 'ne_110m_admin_0_countries.geojson'
-    with open(geojson_path, 'r', encoding='utf-8') as f:
-        geojson_data = json.load(f)
-    
-    country_to_subreddit = {
-        'United States of America': 'UnitedStates',
-        'United Kingdom': 'UnitedKingdom',
-        'United Arab Emirates': 'dubai',
-        'Australia': 'australia',
-        'Canada': 'canada',
-        'Germany': 'germany',
-        'France': 'france',
-        'India': 'india',
-        'Japan': 'japan',
-        'China': 'china',
-        'Brazil': 'brazil',
-        'Mexico': 'mexico',
-        'Italy': 'italy',
-        'Spain': 'spain',
-        'South Korea': 'korea',
-        'Netherlands': 'thenetherlands',
-        'Switzerland': 'switzerland',
-        'Sweden': 'sweden',
-        'Norway': 'norway',
-        'Denmark': 'denmark',
-        'Finland': 'finland',
-        'Poland': 'poland',
-        'Belgium': 'belgium',
-        'Austria': 'austria',
-        'Greece': 'greece',
-        'Portugal': 'portugal',
-        'Ireland': 'ireland',
-        'New Zealand': 'newzealand',
-        'Singapore': 'singapore',
-        'Thailand': 'thailand',
-        'Vietnam': 'vietnam',
-        'Philippines': 'philippines',
-        'Indonesia': 'indonesia',
-        'Malaysia': 'malaysia',
-        'Turkey': 'turkey',
-        'Russia': 'russia',
-        'South Africa': 'southafrica',
-        'Egypt': 'egypt',
-        'Argentina': 'argentina',
-        'Chile': 'chile',
-        'Colombia': 'colombia',
-        'Peru': 'peru',
-        'Pakistan': 'pakistan',
-        'Bangladesh': 'bangladesh',
-        'Saudi Arabia': 'saudiarabia',
-    }
-    
-    country_coords = {}
-    
-    for feature in geojson_data['features']:
-        country_name = feature['properties']['ADMIN']
-        iso_a2 = feature['properties']['ISO_A2']
-        
-        if iso_a2 == 'AQ':
-            continue
-        
-        geometry = feature['geometry']
-        
-        if geometry['type'] == 'Polygon':
-            coords = geometry['coordinates'][0]
-        elif geometry['type'] == 'MultiPolygon':
-            coords = geometry['coordinates'][0][0]
-        else:
-            continue
-        
-        lats = [c[1] for c in coords]
-        lngs = [c[0] for c in coords]
-        
-        centroid_lat = sum(lats) / len(lats)
-        centroid_lng = sum(lngs) / len(lngs)
-        
-        country_coords[country_name] = {
-            'lat': centroid_lat,
-            'lng': centroid_lng
-        }
-        
-        subreddit_name = country_to_subreddit.get(country_name, country_name.replace(' ', '').lower())
-        
-        Country.objects.get_or_create(
-            name=country_name,
-            defaults={'subreddit': subreddit_name}
-        )
-    
-    fetch_queue, created = FetchQueue.objects.get_or_create(id=1)
-    if created:
-        # Initialize with a time that allows immediate fetching
-        fetch_queue.is_fetching = False
-        fetch_queue.last_fetch_time = timezone.now() - timedelta(seconds=10)
-        fetch_queue.save()
-    elif fetch_queue.is_fetching:
-        # If it was stuck in fetching state, reset it
-        time_since_last_fetch = (timezone.now() - fetch_queue.last_fetch_time).total_seconds()
-        if time_since_last_fetch > 60:
-            fetch_queue.is_fetching = False
-            fetch_queue.save()
-    
-    FetchStatus.objects.get_or_create(
-        pk=1,
-        defaults={
-            'current_country': 'Waiting...',
-            'current_subreddit': '',
-            'is_fetching': False
-        }
-    )
-    
-    country_subreddit_mapping = {}
-    for feature in geojson_data['features']:
-        country_name = feature['properties']['ADMIN']
-        iso_a2 = feature['properties']['ISO_A2']
-        
-        if iso_a2 == 'AQ':
-            continue
-        
-        subreddit_name = country_to_subreddit.get(country_name, country_name.replace(' ', '').lower())
-        country_subreddit_mapping[country_name] = subreddit_name
-    
+    # Countries are seeded by `manage.py sync_countries` / run_ingest, so the
+    # page only needs the in-memory index: no file I/O and no queries
+    index = get_country_index()
+
     return render(request, 'globe_countries.html', {
-        'country_subreddit_mapping': json.dumps(country_subreddit_mapping),
-        'country_coords': json.dumps(country_coords)
+        'country_subreddit_mapping': index.subreddit_mapping_json,
+        'country_coords': index.coords_json
     })
 
-def get_country_data(request):
+async def get_country_data(request):
     country_name = request.GET.get('country')
     
     if not country_name:
         return JsonResponse({'error': 'Missing country parameter'}, status=400)
     
     try:
-        country = Country.objects.get(name=country_name)
-        posts = country.posts.all()[:50]
+        country = await Country.objects.aget(name=country_name)
+        posts = [post async for post in country.posts.all()[:50]]
         
-        # Get user mood statistics
-        user_moods = country.user_moods.all()
-        user_mood_avg = user_moods.aggregate(Avg('mood_score'))['mood_score__avg']
-        user_mood_count = user_moods.count()
+        user_mood_avg = country.user_mood_avg
+        recent_mood_avg, recent_mood_count = await arecent_mood(country)
         
         return JsonResponse({
             'country': country.name,
@@ -255,11 +73,13 @@ def get_country_data(request):
                 'num_comments': post.num_comments,
                 'author': post.author,
             } for post in posts],
-            'count': posts.count(),
+            'count': len(posts),
             'last_updated': country.last_updated.isoformat() if country.last_updated else None,
             'emotion_score': country.emotion_score,
             'user_mood_avg': round(user_mood_avg, 1) if user_mood_avg else None,
-            'user_mood_count': user_mood_count,
+            'user_mood_count': country.user_mood_count,
+            'recent_mood_avg': round(recent_mood_avg, 1) if recent_mood_avg else None,
+            'recent_mood_count': recent_mood_count,
         })
     except Country.DoesNotExist:
         return JsonResponse({
@@ -271,176 +91,143 @@ def get_country_data(request):
             'emotion_score': 5,
             'user_mood_avg': None,
             'user_mood_count': 0,
+            'recent_mood_avg': None,
+            'recent_mood_count': 0,
         })
 
+async def world_snapshot_etag():
+    # Every change to the snapshot moves one of these: a refresh bumps
+    # last_updated, its scoring scored_at and every mood vote user_mood_updated_at
+    countries = await Country.objects.aaggregate(
+        count=Count('id'), last_updated=Max('last_updated'), last_scored=Max('scored_at'),
+        last_mood=Max('user_mood_updated_at'),
+    )
+    version = f"{countries['count']}:{countries['last_updated']}:{countries['last_scored']}:{countries['last_mood']}"
+    return quote_etag(hashlib.md5(version.encode('utf-8')).hexdigest())
+
 @require_http_methods(["GET"])
-def get_fetch_status(request):
+@cache_control(no_cache=True)
+async def world_snapshot(request):
+    # condition() can't await an ETag function, so answer If-None-Match here
+    etag = await world_snapshot_etag()
+    response = get_conditional_response(request, etag=etag)
+
+    if response is None:
+        response = JsonResponse({
+            'countries': {
+                country.name: {
+                    'subreddit': country.subreddit,
+                    'emotion_score': country.emotion_score,
+                    'last_updated': country.last_updated.isoformat() if country.last_updated else None,
+                    'scored_at': country.scored_at.isoformat() if country.scored_at else None,
+                    'post_count': country.post_count,
+                    'user_mood_avg': round(country.user_mood_avg, 1) if country.user_mood_avg else None,
+                    'user_mood_count': country.user_mood_count,
+                } async for country in Country.objects.order_by()
+            },
+        })
+
+    response.headers.setdefault('ETag', etag)
+    return response
+
+@require_http_methods(["GET"])
+def country_history(request):
+    country_name = request.GET.get('country')
+    resolution = request.GET.get('resolution', 'auto')
+
+    if not country_name:
+        return JsonResponse({'error': 'Missing country parameter'}, status=400)
+
+    if resolution != 'auto' and resolution not in history.RESOLUTIONS:
+        return JsonResponse({'error': f"Resolution must be one of auto, {', '.join(history.RESOLUTIONS)}"}, status=400)
+
     try:
-        status = FetchStatus.objects.first()
-        if status:
-            return JsonResponse({
-                'next_country': status.current_country,
-                'next_subreddit': status.current_subreddit,
-                'is_fetching': status.is_fetching
-            })
-        else:
-            return JsonResponse({
-                'next_country': 'Waiting...',
-                'next_subreddit': '',
-                'is_fetching': False
-            })
-    except Exception as e:
+        end = history.parse_moment(request.GET['to']) if request.GET.get('to') else timezone.now()
+        start = history.parse_moment(request.GET['from']) if request.GET.get('from') else end - timedelta(days=7)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if start >= end:
+        return JsonResponse({'error': "'from' must be before 'to'"}, status=400)
+
+    if resolution == 'auto':
+        resolution = history.choose_resolution(start, end)
+
+    country = Country.objects.filter(name=country_name).first()
+
+    return JsonResponse({
+        'country': country_name,
+        'resolution': resolution,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'points': history.country_history(country, resolution, start, end) if country else [],
+    })
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    # The peer address, not X-Forwarded-For: clients can set that header themselves
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponse(status=404)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@require_http_methods(["GET"])
+async def get_fetch_status(request):
+    try:
+        return JsonResponse(await fetch_state.aget_status())
+    except Exception:
+        logger.exception("Error reading fetch status")
         return JsonResponse({
             'next_country': 'Error',
             'next_subreddit': '',
             'is_fetching': False
         })
 
-def fetch_next_country(request):
-    from django.db import transaction
-    
-    try:
-        with transaction.atomic():
-            fetch_queue = FetchQueue.objects.select_for_update().get(id=1)
-            
-            now = timezone.now()
-            time_since_last_fetch = (now - fetch_queue.last_fetch_time).total_seconds()
-            
-            # Enforce minimum 3 second delay between fetches to avoid rate limits
-            min_delay = 3.0
-            if time_since_last_fetch < min_delay:
-                return JsonResponse({
-                    'status': 'rate_limited',
-                    'wait_time': round(min_delay - time_since_last_fetch, 2),
-                    'message': 'Rate limit protection active'
-                })
-            
-            if fetch_queue.is_fetching:
-                if time_since_last_fetch > 60:
-                    fetch_queue.is_fetching = False
-                    fetch_queue.save()
-                else:
-                    return JsonResponse({
-                        'status': 'already_fetching',
-                        'message': 'Another request is currently being processed'
-                    })
-            
-            fetch_queue.is_fetching = True
-            fetch_queue.last_fetch_time = now
-            fetch_queue.save()
-        
-        fetch_status = FetchStatus.objects.get(pk=1)
-        
-        try:
-            country = Country.objects.order_by('last_updated', 'name').first()
-            
-            if not country:
-                return JsonResponse({'status': 'no_countries'})
-            
-            fetch_status.current_country = country.name
-            fetch_status.current_subreddit = country.subreddit
-            fetch_status.is_fetching = True
-            fetch_status.save()
-            
-            print(f"Fetching data for {country.name} (r/{country.subreddit})...")
-            
-            reddit = praw.Reddit(
-                client_id=settings.REDDIT_CLIENT_ID,
-                client_secret=settings.REDDIT_CLIENT_SECRET,
-                user_agent=settings.REDDIT_USER_AGENT,
-                check_for_async=False,
-            )
-            
-            posts_data = []
-            titles = []
-            error_msg = None
-            
-            try:
-                subreddit = reddit.subreddit(country.subreddit)
-                
-                for submission in subreddit.hot(limit=50):
-                    created_dt = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
-                    
-                    posts_data.append({
-                        'reddit_id': submission.id,
-                        'title': submission.title,
-                        'score': submission.score,
-                        'permalink': f"https://reddit.com{submission.permalink}",
-                        'num_comments': submission.num_comments,
-                        'author': str(submission.author),
-                        'created_utc': created_dt,
-                    })
-                    
-                    titles.append(submission.title)
-                
-                print(f"Found {len(posts_data)} posts for {country.name}")
-                
-                emotion_score = check_emotion(titles, country.name)
-                print(f"Emotion score for {country.name}: {emotion_score}")
-                
-                with transaction.atomic():
-                    country.posts.all().delete()
-                    
-                    for post_data in posts_data:
-                        RedditPost.objects.create(
-                            country=country,
-                            reddit_id=post_data['reddit_id'],
-                            title=post_data['title'],
-                            score=post_data['score'],
-                            permalink=post_data['permalink'],
-                            num_comments=post_data['num_comments'],
-                            author=post_data['author'],
-                            created_utc=post_data['created_utc'],
-                        )
-                    
-                    country.last_updated = timezone.now()
-                    country.post_count = len(posts_data)
-                    country.emotion_score = emotion_score
-                    country.save()
-                    
-                    print(f"Replaced with {len(posts_data)} new posts. Emotion: {emotion_score}/10")
-                
-                fetch_status.is_fetching = False
-                fetch_status.save()
-                
-                return JsonResponse({
-                    'status': 'success',
-                    'country': country.name,
-                    'subreddit': country.subreddit,
-                    'posts_fetched': len(posts_data),
-                    'total_posts': country.post_count,
-                    'emotion_score': emotion_score,
-                })
-            
-            except Exception as e:
-                error_msg = str(e)
-                print(f"Error fetching r/{country.subreddit}: {error_msg}")
-                
-                country.last_updated = timezone.now()
-                country.save()
-                
-                fetch_status.is_fetching = False
-                fetch_status.save()
-                
-                return JsonResponse({
-                    'status': 'error',
-                    'country': country.name,
-                    'subreddit': country.subreddit,
-                    'error': error_msg
-                })
-        
-        finally:
-            fetch_queue = FetchQueue.objects.get(id=1)
-            fetch_queue.is_fetching = False
-            fetch_queue.save()
-    
-    except Exception as e:
-        print(f"Critical error in fetch_next_country: {str(e)}")
-        return JsonResponse({
-            'status': 'error',
-            'error': str(e)
-        })
+@require_http_methods(["GET"])
+async def fetch_status_stream(request):
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            events.broadcaster.stream(last_event_id),
+            content_type='text/event-stream',
+        )
+    else:
+        # A WSGI worker can't hold the stream open, so send the current state
+        # and let EventSource reconnect after the retry delay
+        status = await events.read_status()
+        country = await events.read_latest_country()
+        body = f"retry: {settings.STATUS_STREAM_RETRY_MS}\n\n"
+        body += events.format_event('snapshot', 'status', status)
+        if country is not None:
+            body += events.format_event('snapshot', 'country', country)
+        response = HttpResponse(body, content_type='text/event-stream')
+
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@require_http_methods(["GET"])
+async def fetch_next_country(request):
+    # Ingestion runs in the run_ingest management command; this only reports
+    # the most recently refreshed country so clients can pick up new data.
+    country = await Country.objects.filter(last_updated__isnull=False).order_by('-last_updated').afirst()
+
+    if not country:
+        return JsonResponse({'status': 'no_countries'})
+
+    return JsonResponse({
+        'status': 'success',
+        'country': country.name,
+        'subreddit': country.subreddit,
+        'total_posts': country.post_count,
+        'emotion_score': country.emotion_score,
+        'last_updated': country.last_updated.isoformat(),
+        'is_fetching': (await fetch_state.aget_status())['is_fetching'],
+    })
+
 @require_http_methods(["POST"])
+@rate_limit('submit_user_mood')
 def submit_user_mood(request):
     try:
         data = json.loads(request.body)
@@ -453,65 +240,51 @@ def submit_user_mood(request):
         if not isinstance(mood_score, int) or mood_score < 1 or mood_score > 10:
             return JsonResponse({'status': 'error', 'error': 'Mood must be between 1 and 10'}, status=400)
         
-        # Get user's IP address
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0]
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
+        if country_name not in get_country_index():
+            return JsonResponse({'status': 'error', 'error': 'Unknown country'}, status=400)
         
-        # Check for rate limiting - 5 seconds between ANY submissions from same IP
-        last_submission = UserMood.objects.filter(
-            ip_address=ip_address
-        ).order_by('-submitted_at').first()
+        ip_address = client_ip(request)
         
-        if last_submission:
-            time_since_last = (timezone.now() - last_submission.submitted_at).total_seconds()
-            if time_since_last < 5:
-                wait_time = 5 - time_since_last
-                return JsonResponse({
-                    'status': 'rate_limited',
-                    'error': f'Please wait {wait_time:.1f} more seconds before submitting again',
-                    'wait_time': wait_time
-                }, status=429)
-        
-        country, created = Country.objects.get_or_create(
-            name=country_name,
-            defaults={'subreddit': country_name.replace(' ', '').lower()}
-        )
-        
-        # Check if user has submitted mood for this country recently (within 24 hours)
-        recent_submission = UserMood.objects.filter(
-            country=country,
-            ip_address=ip_address,
-            submitted_at__gte=timezone.now() - timedelta(hours=24)
-        ).first()
-        
-        if recent_submission:
-            # Update existing submission
-            recent_submission.mood_score = mood_score
-            recent_submission.submitted_at = timezone.now()
-            recent_submission.save()
-        else:
-            # Create new submission
-            UserMood.objects.create(country=country, mood_score=mood_score, ip_address=ip_address)
-        
-        user_moods = country.user_moods.all()
-        user_mood_avg = user_moods.aggregate(Avg('mood_score'))['mood_score__avg']
-        user_mood_count = user_moods.count()
+        # The vote and the aggregates its signal moves are saved together
+        with transaction.atomic():
+            country, created = Country.objects.get_or_create(
+                name=country_name,
+                defaults={'subreddit': subreddit_for(country_name)}
+            )
+
+            # Check if user has submitted mood for this country recently (within 24 hours)
+            recent_submission = UserMood.objects.filter(
+                country=country,
+                ip_address=ip_address,
+                submitted_at__gte=timezone.now() - timedelta(hours=24)
+            ).first()
+
+            if recent_submission:
+                # Update existing submission
+                recent_submission.mood_score = mood_score
+                recent_submission.submitted_at = timezone.now()
+                recent_submission.save()
+            else:
+                # Create new submission
+                UserMood.objects.create(country=country, mood_score=mood_score, ip_address=ip_address)
+        
+        # The vote moved the running totals; read them back in one small query
+        country.refresh_from_db(fields=['user_mood_sum', 'user_mood_count'])
+        user_mood_avg = country.user_mood_avg
         
         return JsonResponse({
             'status': 'success',
             'country': country.name,
             'mood_score': mood_score,
             'user_mood_avg': round(user_mood_avg, 1) if user_mood_avg else None,
-            'user_mood_count': user_mood_count,
+            'user_mood_count': country.user_mood_count,
         })
     except Exception as e:
-        print(f"Error submitting user mood: {str(e)}")
+        logger.exception("Error submitting user mood")
         return JsonResponse({'status': 'error', 'error': str(e)}, status=500)
 
 @require_http_methods(["POST"])
+@rate_limit('submit_comment', action='commenting')
 def submit_comment(request):
     try:
         data = json.loads(request.body)
@@ -528,44 +301,28 @@ def submit_comment(request):
         if len(comment_text) > 500:
             return JsonResponse({'status': 'error', 'error': 'Comment too long (max 500 characters)'}, status=400)
         
-        # Get user's IP address
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0]
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
-        
-        # Check for rate limiting - 10 seconds between comment submissions
-        last_comment = UserComment.objects.filter(
-            ip_address=ip_address
-        ).order_by('-submitted_at').first()
+        if country_name and country_name not in get_country_index():
+            return JsonResponse({'status': 'error', 'error': 'Unknown country'}, status=400)
         
-        if last_comment:
-            time_since_last = (timezone.now() - last_comment.submitted_at).total_seconds()
-            if time_since_last < 10:
-                wait_time = 10 - time_since_last
-                return JsonResponse({
-                    'status': 'rate_limited',
-                    'error': f'Please wait {wait_time:.1f} more seconds before commenting again',
-                    'wait_time': wait_time
-                }, status=429)
+        ip_address = client_ip(request)
         
-        # Get country if provided
-        country = None
-        if country_name:
-            country, created = Country.objects.get_or_create(
-                name=country_name,
-                defaults={'subreddit': country_name.replace(' ', '').lower()}
+        with transaction.atomic():
+            # Get country if provided
+            country = None
+            if country_name:
+                country, created = Country.objects.get_or_create(
+                    name=country_name,
+                    defaults={'subreddit': subreddit_for(country_name)}
+                )
+
+            # Create comment
+            comment = UserComment.objects.create(
+                country=country,
+                mood_score=mood_score,
+                comment_text=comment_text,
+                ip_address=ip_address
             )
         
-        # Create comment
-        comment = UserComment.objects.create(
-            country=country,
-            mood_score=mood_score,
-            comment_text=comment_text,
-            ip_address=ip_address
-        )
-        
         return JsonResponse({
             'status': 'success',
             'comment_id': comment.id,
@@ -575,44 +332,51 @@ def submit_comment(request):
         })
         
     except Exception as e:
-        print(f"Error submitting comment: {str(e)}")
+        logger.exception("Error submitting comment")
         return JsonResponse({'status': 'error', 'error': str(e)}, status=500)
 
 @require_http_methods(["GET"])
-def get_comments(request):
+@cache_control(public=True, max_age=settings.COMMENTS_CACHE_SECONDS)
+async def get_comments(request):
+    # Clients pass the newest id they have as since_id and get the oldest 50
+    # that came after it, paging forward while has_more is set. Without a
+    # cursor they get the newest 50. Comments are listed newest first either
+    # way; timestamps are sent as-is so every client sees the same bytes
+    try:
+        since_id = int(request.GET.get('since_id') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'error': 'since_id must be an integer'}, status=400)
+
     try:
-        # Get the last 50 comments
-        comments = UserComment.objects.all()[:50]
+        comments = UserComment.objects.select_related('country')
+        if since_id:
+            comments = comments.filter(id__gt=since_id).order_by('id')
+        else:
+            comments = comments.order_by('-id')
+
+        country_name = request.GET.get('country')
+        if country_name == 'Global':
+            comments = comments.filter(country__isnull=True)
+        elif country_name:
+            comments = comments.filter(country__name=country_name)
+
+        comments = [comment async for comment in comments[:50]]
+        has_more = bool(since_id) and len(comments) == 50
+        if since_id:
+            comments.reverse()
         
         return JsonResponse({
             'status': 'success',
+            'cursor': comments[0].id if comments else since_id,
+            'has_more': has_more,
             'comments': [{
                 'id': comment.id,
                 'country': comment.country.name if comment.country else 'Global',
                 'mood_score': comment.mood_score,
                 'comment_text': comment.comment_text,
                 'submitted_at': comment.submitted_at.isoformat(),
-                'time_ago': get_time_ago(comment.submitted_at)
             } for comment in comments]
         })
     except Exception as e:
-        print(f"Error getting comments: {str(e)}")
+        logger.exception("Error getting comments")
         return JsonResponse({'status': 'error', 'error': str(e)}, status=500)
-
-def get_time_ago(dt):
-    """Helper function to get human-readable time difference"""
-    now = timezone.now()
-    diff = now - dt
-    
-    seconds = diff.total_seconds()
-    if seconds < 60:
-        return 'just now'
-    elif seconds < 3600:
-        minutes = int(seconds / 60)
-        return f'{minutes}m ago'
-    elif seconds < 86400:
-        hours = int(seconds / 3600)
-        return f'{hours}h ago'
-    else:
-        days = int(seconds / 86400)
-        return f'{days}d ago'
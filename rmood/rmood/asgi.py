@@ -2,6 +2,9 @@
 ASGI config for rmood project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server such as ``uvicorn rmood.asgi:application``: the
+read endpoints and the status stream are async views, so idle clients hold
+no thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'moodapp.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -132,6 +133,202 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REDDIT_CLIENT_ID = '***REMOVED***'
 REDDIT_CLIENT_SECRET = '***REMOVED***'
 REDDIT_USER_AGENT = '***REMOVED***'
+REDDIT_URL = 'https://www.reddit.com'
+REDDIT_OAUTH_URL = 'https://oauth.reddit.com'
 
 # OpenRouter API Configuration
+OPENROUTER_URL = 'https://openrouter.ai/api/v1/chat/completions'
 OPENROUTER_API_KEY = '***REMOVED***'  # Replace with your actual OpenRouter API key
+# Approximate prompt tokens packed into one batched scoring request
+EMOTION_BATCH_TOKEN_BUDGET = 8000
+# Title tokens scored per listing: larger listings are sampled down to this,
+# favouring upvoted and discussed posts. Titles are cut to EMOTION_MAX_TITLE_TOKENS
+EMOTION_LISTING_TOKEN_BUDGET = 3000
+EMOTION_MAX_TITLE_TOKENS = 60
+# Listings over this many tokens are scored in chunks, EMOTION_CHUNK_WORKERS
+# at a time, and the chunk scores averaged
+EMOTION_CHUNK_TOKEN_BUDGET = 1000
+EMOTION_CHUNK_WORKERS = 4
+# Seconds an OpenRouter scoring call may take in total, hedging included
+EMOTION_DEADLINE = 30
+# Optional second model asked when the primary one is slower than its usual
+# EMOTION_HEDGE_PERCENTILE latency (EMOTION_HEDGE_AFTER seconds until enough
+# calls were seen), e.g. 'meta-llama/llama-3.1-8b-instruct'; None disables it
+EMOTION_HEDGE_MODEL = None
+EMOTION_HEDGE_PERCENTILE = 95
+EMOTION_HEDGE_AFTER = 10
+# Failures in a row that stop OpenRouter calls, and seconds before trying again;
+# meanwhile listings go to EMOTION_FALLBACK_SCORER
+EMOTION_BREAKER_FAILURES = 5
+EMOTION_BREAKER_RESET = 120
+# Used to estimate how much the score cache saves
+OPENROUTER_PRICE_PER_MILLION_TOKENS = 0.10
+
+# Emotion scorer backends: 'openrouter' (LLM) or 'lexicon' (offline word valences).
+# The fallback scores listings the primary scorer could not; None disables it.
+EMOTION_SCORER = 'openrouter'
+EMOTION_FALLBACK_SCORER = 'lexicon'
+# When set, countries whose lexicon score moved less than this since the last
+# refresh keep their previous score without calling the primary scorer
+EMOTION_PREFILTER_DELTA = None
+
+# Emotion score cache: seconds an entry stays valid, entries kept per kind
+# (both enforced by run_ingest every EMOTION_ROLLUP_INTERVAL), and the share
+# of cached titles needed to re-score a listing incrementally
+EMOTION_CACHE_TTL = 6 * 60 * 60
+EMOTION_CACHE_MAX_ENTRIES = 20000
+EMOTION_TITLE_CACHE_MIN_COVERAGE = 0.8
+
+# Hours of user mood votes in the rolling window shown next to the all-time
+# average; None disables the hourly buckets. run_ingest prunes older buckets
+# every EMOTION_ROLLUP_INTERVAL
+USER_MOOD_WINDOW_HOURS = 24
+
+# Per-IP limits on POST endpoints, as `limit` requests per `window` seconds.
+# 'local' keeps a bounded table in each process; 'cache' shares the counts
+# through RATE_LIMIT_CACHE so every worker enforces the same limit.
+RATE_LIMITS = {
+    'submit_user_mood': {'limit': 1, 'window': 5},
+    'submit_comment': {'limit': 1, 'window': 10},
+}
+RATE_LIMIT_BACKEND = 'local'
+RATE_LIMIT_CACHE = 'default'
+# Clients remembered by the 'local' backend before the least recent are dropped
+RATE_LIMIT_MAX_KEYS = 10000
+
+# Emotion score history: smoothing factor of the EMA kept in rollups, days of
+# raw snapshots and hourly rollups kept by compact_emotion_history, and
+# seconds between rollups done by the ingestion daemon
+EMOTION_EMA_ALPHA = 0.2
+EMOTION_SNAPSHOT_RETENTION_DAYS = 7
+EMOTION_HOURLY_RETENTION_DAYS = 90
+EMOTION_ROLLUP_INTERVAL = 300
+
+# FetchRun traces (moodapp.fetch_runs): buffered rows are written once this
+# many are pending or the oldest is this many seconds old, and deleted after
+# FETCH_RUN_RETENTION_DAYS (checked by run_ingest with every rollup)
+FETCH_RUN_FLUSH_SIZE = 100
+FETCH_RUN_FLUSH_INTERVAL = 60
+FETCH_RUN_RETENTION_DAYS = 30
+
+# Seconds browsers and proxies may reuse a /get-comments/ response
+COMMENTS_CACHE_SECONDS = 5
+
+# Ingestion daemon (manage.py run_ingest)
+# Minimum seconds between two refresh cycles
+INGEST_MIN_INTERVAL = 3.0
+# Countries refreshed per cycle
+INGEST_BATCH_SIZE = 20
+
+# Scoring stage: stored listings wait in a queue of SCORING_QUEUE_SIZE (fetching
+# pauses while it is full) and are scored by SCORING_WORKERS threads, each
+# taking up to SCORING_BATCH_SIZE listings or what arrived within
+# SCORING_BATCH_WAIT seconds
+SCORING_WORKERS = 2
+SCORING_BATCH_SIZE = 20
+SCORING_QUEUE_SIZE = 100
+SCORING_BATCH_WAIT = 2.0
+# Refresh scheduler: seconds between refreshes of the busiest and the quietest
+# countries, post velocity (new posts/hour) and score volatility (points per
+# refresh) that halve the interval, and the exponential backoff after
+# failures, starting higher for subreddits that don't exist or are private
+SCHEDULER_MIN_INTERVAL = 5 * 60
+SCHEDULER_MAX_INTERVAL = 6 * 60 * 60
+SCHEDULER_VELOCITY_SCALE = 2.0
+SCHEDULER_VOLATILITY_SCALE = 1.0
+SCHEDULER_DEAD_BACKOFF = 6 * 60 * 60
+SCHEDULER_MAX_BACKOFF = 7 * 24 * 60 * 60
+# Refresh jobs (moodapp.jobs): seconds a worker's claim lasts without a
+# heartbeat (it sends one every third of that), and failures in a row of a
+# subreddit that doesn't exist (or is private or banned) before its job is
+# dead-lettered until requeued from the admin; other failures keep backing off
+FETCH_JOB_LEASE_SECONDS = 120
+FETCH_JOB_MAX_ATTEMPTS = 5
+
+# Caches. Live fetch state (current country and is_fetching)
+# lives in FETCH_STATE_CACHE rather than the database. The daemon runs in its
+# own process, so that cache must be shared: the file cache works on a single
+# host; point it at memcached or redis when running on several. 'default'
+# (per-process memory) is enough when everything runs in one process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fetch_state': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'fetch_state',
+    },
+}
+FETCH_STATE_CACHE = 'fetch_state'
+# Derived data cached on disk, e.g. country centroids computed from the GeoJSON.
+# Kept out of STATICFILES_DIRS so collectstatic doesn't publish it
+FILE_CACHE_DIR = BASE_DIR / '.cache'
+
+# Server-Sent Events stream of fetch status (/fetch-status-stream/, needs ASGI)
+# Seconds between status reads shared by all connected clients
+STATUS_STREAM_POLL_INTERVAL = 0.5
+# Seconds between heartbeat comments on an idle stream
+STATUS_STREAM_HEARTBEAT = 15
+# Events remembered for clients reconnecting with Last-Event-ID
+STATUS_STREAM_HISTORY = 200
+# Reconnect delay suggested to EventSource clients
+STATUS_STREAM_RETRY_MS = 3000
+
+# Reddit OAuth clients may make 100 requests per minute. The bucket is per
+# process: divide by the number of run_ingest workers sharing the credentials
+REDDIT_QPS = 100 / 60
+REDDIT_BURST = 5
+# Subreddit listings fetched concurrently; also the number of pooled Reddit clients
+REDDIT_FETCH_WORKERS = 8
+# Hot posts fetched per listing
+REDDIT_LISTING_SIZE = 50
+
+# HTTP clients (moodapp.clients): connect and read timeouts in seconds, and
+# keep-alive connections kept open to OpenRouter
+REDDIT_CONNECT_TIMEOUT = 5
+REDDIT_READ_TIMEOUT = 20
+OPENROUTER_CONNECT_TIMEOUT = 5
+OPENROUTER_READ_TIMEOUT = 30
+OPENROUTER_POOL_SIZE = 4
+# Seconds between client pool stats printed by run_ingest
+CLIENT_STATS_LOG_INTERVAL = 600
+
+# Port where run_ingest serves its own metrics; None to not serve them. The
+# web process serves them at /metrics/, only to the peer addresses in
+# METRICS_ALLOWED_IPS (None lets anyone scrape them)
+INGEST_METRICS_PORT = None
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Structured JSON logs from moodapp. DEBUG records (full OpenRouter replies,
+# per-listing details) are sampled at this rate; INFO and above are all kept
+LOG_DEBUG_SAMPLE_RATE = 0.05
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'moodapp.logs.StructuredFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'moodapp.logs.SamplingFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
+    'handlers': {
+        'structured': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+            'filters': ['sampling'],
+        },
+    },
+    'loggers': {
+        'moodapp': {
+            'handlers': ['structured'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+    },
+}
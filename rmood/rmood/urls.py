@@ -21,7 +21,11 @@ from moodapp import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('get-country-data/', views.get_country_data, name='get_country_data'),
+    path('world-snapshot/', views.world_snapshot, name='world_snapshot'),
+    path('country-history/', views.country_history, name='country_history'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('get-fetch-status/', views.get_fetch_status, name='get_fetch_status'),
+    path('fetch-status-stream/', views.fetch_status_stream, name='fetch_status_stream'),
     path('fetch-next-country/', views.fetch_next_country, name='fetch_next_country'),
     path('submit-user-mood/', views.submit_user_mood, name='submit_user_mood'),
     path('submit-comment/', views.submit_comment, name='submit_comment'),